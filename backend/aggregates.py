@@ -0,0 +1,153 @@
+import json
+import math
+import os
+import pandas as pd
+from run_report import step
+
+state_path = "./files/agregados_estado.json"
+columns_aggregated = [
+    "RazaoSocial",
+    "UF",
+    "TotalExpensives",
+    "TrimestralMean",
+    "Deviation",
+]
+
+
+def quarter_totals(df_clean):
+    with step("aggregate", rows_in=len(df_clean)):
+        return group_quarters(df_clean)
+
+
+def group_quarters(df_clean):
+    cents = (
+        (pd.to_numeric(df_clean["ValorDespesas"], errors="coerce").fillna(0) * 100)
+        .round()
+        .astype("int64")
+    )
+    grouped = cents.groupby(
+        [df_clean["RegistroANS"], df_clean["Trimestre"]], sort=True
+    ).agg(["sum", "size"])
+
+    df_names = df_clean[["RegistroANS", "RazaoSocial", "UF"]].drop_duplicates(
+        subset=["RegistroANS"], keep="last"
+    )
+    names = {
+        str(registro): (
+            None if pd.isna(name) else name,
+            None if pd.isna(uf) else uf,
+        )
+        for registro, name, uf in df_names.itertuples(index=False)
+    }
+
+    totals = {}
+    for (registro, trimestre), total, rows in zip(
+        grouped.index, grouped["sum"].tolist(), grouped["size"].tolist()
+    ):
+        registro = str(registro)
+        if registro not in totals:
+            name, uf = names[registro]
+            totals[registro] = {"name": name, "uf": uf, "quarters": {}}
+        totals[registro]["quarters"][str(trimestre)] = [total, rows]
+    return totals
+
+
+class AggregateStore:
+    def __init__(self, inputs=None, operators=None):
+        self.inputs = inputs or {}
+        self.operators = operators or {}
+
+    @classmethod
+    def load(cls, path=state_path):
+        if not os.path.exists(path):
+            return cls()
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+            return cls(state["inputs"], state["operators"])
+        except (OSError, ValueError, KeyError):
+            print("Estado dos agregados ilegível, os agregados serão refeitos.")
+            return cls()
+
+    def save(self, path=state_path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        path_tmp = path + ".tmp"
+        with open(path_tmp, "w", encoding="utf-8") as file:
+            json.dump({"inputs": self.inputs, "operators": self.operators}, file)
+        os.replace(path_tmp, path)
+
+    def contains(self, input_file, fingerprint):
+        return self.inputs.get(input_file, {}).get("sha256") == fingerprint
+
+    def fold(self, totals, sign=1):
+        for registro, contribution in totals.items():
+            operator = self.operators.setdefault(
+                registro, {"quarters": {}, "count": 0, "sum": 0, "squares": 0}
+            )
+            if sign > 0:
+                operator["name"] = contribution["name"]
+                operator["uf"] = contribution["uf"]
+
+            for trimestre, (total, rows) in contribution["quarters"].items():
+                old_total, old_rows = operator["quarters"].get(trimestre, [0, 0])
+                new_total, new_rows = old_total + sign * total, old_rows + sign * rows
+                if old_rows:
+                    operator["count"] -= 1
+                    operator["sum"] -= old_total
+                    operator["squares"] -= old_total * old_total
+                if new_rows:
+                    operator["count"] += 1
+                    operator["sum"] += new_total
+                    operator["squares"] += new_total * new_total
+                    operator["quarters"][trimestre] = [new_total, new_rows]
+                else:
+                    operator["quarters"].pop(trimestre, None)
+
+            if not operator["quarters"]:
+                del self.operators[registro]
+
+    def remove(self, input_file):
+        entry = self.inputs.pop(input_file, None)
+        if entry:
+            self.fold(entry["operators"], sign=-1)
+
+    def replace(self, input_file, fingerprint, totals):
+        self.remove(input_file)
+        self.fold(totals)
+        self.inputs[input_file] = {"sha256": fingerprint, "operators": totals}
+
+    def to_frame(self):
+        with step("aggregate") as record:
+            df_calculations = self.calculations()
+            record.rows_out += len(df_calculations)
+        return df_calculations
+
+    def calculations(self):
+        rows = []
+        for operator in self.operators.values():
+            count, total = operator["count"], operator["sum"]
+            deviation = 0.0
+            if count > 1:
+                variance = (count * operator["squares"] - total * total) / (
+                    count * (count - 1)
+                )
+                deviation = math.sqrt(variance) / 100
+            rows.append(
+                (
+                    operator["name"],
+                    operator["uf"],
+                    total / 100,
+                    round(total / count) / 100,
+                    deviation,
+                )
+            )
+
+        df_calculations = pd.DataFrame(rows, columns=columns_aggregated)
+        df_calculations = df_calculations.sort_values(
+            by=["TotalExpensives", "RazaoSocial"],
+            ascending=[False, True],
+            kind="stable",
+        ).reset_index(drop=True)
+        df_calculations["Deviation"] = df_calculations["Deviation"].round(2)
+        return df_calculations
@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dotenv import load_dotenv
+from run_report import etl_config, run_report
+
+load_dotenv()
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+benchmark_schema = "benchmark_etl"
+stages = ["etapa1", "etapa2", "etapa3"]
+metrics = ["seconds", "peak_rss_mb"]
+
+
+def stage_runner(stage):
+    if stage == "etapa1":
+        import etapa1_process_file
+
+        return etapa1_process_file.read_files, "./files/consolidado_despesas.csv"
+
+    if stage == "etapa2":
+        import etapa2_validatingData
+
+        return etapa2_validatingData.enrichmentData, "./files/despesas_agregadas.csv"
+
+    import etapa3_integratingDB
+    from sqlalchemy import func, select
+
+    def load():
+        etapa3_integratingDB.recreate_tables()
+        etapa3_integratingDB.read_files()
+        with etapa3_integratingDB.db.connect() as connection:
+            total = connection.scalar(
+                select(func.count()).select_from(etapa3_integratingDB.Despesa)
+            )
+        if not total:
+            raise SystemExit("Etapa 3 não carregou nenhuma despesa.")
+
+    return load, None
+
+
+def run_stage(stage, output):
+    runner, expected = stage_runner(stage)
+    with run_report(stage) as report:
+        runner()
+    if expected and not os.path.exists(expected):
+        raise SystemExit(f"{stage} não gerou {expected}.")
+
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "seconds": report.result["wall_seconds"],
+                "peak_rss_mb": report.result["peak_rss_mb"],
+                "workers_peak_rss_mb": report.result["workers_peak_rss_mb"],
+                "steps": report.result["steps"],
+            },
+            file,
+        )
+
+
+def count_rows(path_csv):
+    with open(path_csv, "rb") as file:
+        return sum(1 for _ in file) - 1
+
+
+def benchmark_url(url):
+    from sqlalchemy.engine import make_url
+
+    url = make_url(url).update_query_dict(
+        {"options": f"-csearch_path={benchmark_schema}"}
+    )
+    return url.render_as_string(hide_password=False)
+
+
+def reset_schema(url, create=True):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP SCHEMA IF EXISTS {benchmark_schema} CASCADE"))
+        if create:
+            connection.execute(text(f"CREATE SCHEMA {benchmark_schema}"))
+    engine.dispose()
+
+
+def stage_environment():
+    env = dict(os.environ, ETL_INCREMENTAL="0", ETAPA3_SWAP="0")
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (backend_dir, env.get("PYTHONPATH")) if path
+    )
+    if env.get("DATABASE_URL"):
+        env["DATABASE_URL"] = benchmark_url(env["DATABASE_URL"])
+    return env
+
+
+def run_subprocess(stage, workdir, env):
+    output = os.path.join(workdir, f"benchmark_{stage}.json")
+    path_log = os.path.join(workdir, f"benchmark_{stage}.log")
+    with open(path_log, "w", encoding="utf-8") as log:
+        process = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--run-stage", stage, output],
+            cwd=workdir,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    if process.returncode != 0:
+        with open(path_log, encoding="utf-8", errors="replace") as log:
+            print(log.read()[-4000:])
+        raise SystemExit(f"Falha na {stage} (log em {path_log}).")
+
+    with open(output, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def prepare_dataset(workdir, scale, quarters, seed):
+    from synthetic_data import generate
+
+    path_summary = os.path.join(workdir, "synthetic.json")
+    params = {"scale": scale, "quarters": quarters, "seed": seed}
+    if os.path.exists(path_summary):
+        with open(path_summary, encoding="utf-8") as file:
+            summary = json.load(file)
+        if summary.get("params") == params:
+            print("Reaproveitando a base sintética já gerada.")
+            return summary
+
+    print(f"Gerando base sintética (escala {scale}x, {quarters} trimestres)...")
+    started = time.perf_counter()
+    summary = generate(os.path.join(workdir, "assets"), scale, quarters, seed)
+    summary["params"] = params
+    with open(path_summary, "w", encoding="utf-8") as file:
+        json.dump(summary, file, indent=2)
+    seconds = time.perf_counter() - started
+    print(f"Base gerada em {seconds:.1f}s: {summary['rows']} linhas.")
+    return summary
+
+
+def run_benchmark(workdir, scale, quarters, seed, selected, repeat):
+    summary = prepare_dataset(workdir, scale, quarters, seed)
+    env = stage_environment()
+    if "etapa3" in selected and not env.get("DATABASE_URL"):
+        print("DATABASE_URL não configurada: a etapa 3 não será medida.")
+        selected = [stage for stage in selected if stage != "etapa3"]
+
+    results = {
+        "scale": scale,
+        "quarters": quarters,
+        "seed": seed,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "config": etl_config(),
+        "stages": {},
+    }
+
+    if "etapa3" in selected:
+        reset_schema(os.environ["DATABASE_URL"])
+    try:
+        for stage in selected:
+            runs = sorted(
+                (run_subprocess(stage, workdir, env) for _ in range(repeat)),
+                key=lambda run: run["seconds"],
+            )
+            result = runs[len(runs) // 2]
+            peaks = [run["peak_rss_mb"] for run in runs if run["peak_rss_mb"]]
+            result["peak_rss_mb"] = max(peaks, default=None)
+            result["rows"] = (
+                summary["rows"]
+                if stage == "etapa1"
+                else count_rows(
+                    os.path.join(workdir, "files", "consolidado_despesas.csv")
+                )
+            )
+            result["rows_per_second"] = result["rows"] / result["seconds"]
+            results["stages"][stage] = result
+            memory = (
+                f"{result['peak_rss_mb']:.0f} MB"
+                if result["peak_rss_mb"] is not None
+                else "indisponível"
+            )
+            print(
+                f"{stage}: {result['seconds']:.2f}s, "
+                f"{result['rows_per_second']:,.0f} linhas/s, "
+                f"pico de memória {memory}"
+            )
+    finally:
+        if "etapa3" in selected:
+            reset_schema(os.environ["DATABASE_URL"], create=False)
+
+    return results
+
+
+def baseline_key(results):
+    return f"{results['scale']}x{results['quarters']}t"
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def compare(results, baseline, tolerance):
+    if baseline.get("config") != results["config"]:
+        print("Atenção: configuração do ETL diferente da linha de base.")
+
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for metric in metrics:
+            if not current.get(metric) or not previous.get(metric):
+                continue
+            change = current[metric] / previous[metric] - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  <- REGRESSÃO"
+                regressions.append(f"{stage}.{metric}")
+            print(
+                f"{stage} {metric}: {previous[metric]:.2f} -> "
+                f"{current[metric]:.2f} ({change:+.1%}){flag}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mede as etapas do ETL sobre uma base sintética."
+    )
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--quarters", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", default=",".join(stages))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--workdir")
+    parser.add_argument("--baseline", default="benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    parser.add_argument("--json")
+    parser.add_argument("--run-stage", nargs=2, metavar=("ETAPA", "SAIDA"))
+    args = parser.parse_args()
+
+    if args.run_stage:
+        run_stage(*args.run_stage)
+        return 0
+
+    selected = [stage for stage in args.stages.split(",") if stage in stages]
+    workdir = args.workdir or tempfile.mkdtemp(prefix="benchmark_etl_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        results = run_benchmark(
+            workdir, args.scale, args.quarters, args.seed, selected, args.repeat
+        )
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    baselines = load_baselines(args.baseline)
+    key = baseline_key(results)
+    regressions = []
+    if args.save_baseline:
+        baselines[key] = results
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baselines, file, indent=2)
+        print(f"Linha de base '{key}' salva em {args.baseline}.")
+    elif key in baselines:
+        regressions = compare(results, baselines[key], args.tolerance)
+    else:
+        print(f"Sem linha de base '{key}' em {args.baseline} (use --save-baseline).")
+
+    if regressions:
+        print(f"Regressões acima de {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+import io
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import text
+from run_report import step
+
+load_dotenv()
+
+chunk_rows = int(os.getenv("BULK_LOAD_CHUNK_ROWS", "100000"))
+load_workers = int(os.getenv("BULK_LOAD_WORKERS", "1"))
+
+
+class FrameStream:
+    def __init__(self, df, chunk_size):
+        self.chunks = (
+            df.iloc[start : start + chunk_size]
+            for start in range(0, len(df), chunk_size)
+        )
+        self.current = io.StringIO()
+
+    def read(self, size=-1):
+        data = self.current.read(size)
+        while not data:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return ""
+            self.current = io.StringIO(chunk.to_csv(index=False, header=False))
+            data = self.current.read(size)
+        return data
+
+
+def quote_columns(columns):
+    return ", ".join(f'"{column}"' for column in columns)
+
+
+def copy_frame(dbapi_connection, df, table_name, chunk_size=None):
+    statement = (
+        f'COPY "{table_name}" ({quote_columns(df.columns)}) '
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(statement, FrameStream(df, chunk_size or chunk_rows))
+    return len(df)
+
+
+def reserve_ids(connection, table, df):
+    column = table.autoincrement_column
+    if column is None or column.name in df.columns:
+        return df
+
+    sequence = text("SELECT pg_get_serial_sequence(:table, :column)")
+    name = connection.execute(
+        sequence, {"table": f'"{table.name}"', "column": column.name}
+    ).scalar()
+    first = connection.execute(
+        text("SELECT nextval(CAST(:name AS regclass))"), {"name": name}
+    ).scalar()
+    connection.execute(
+        text("SELECT setval(CAST(:name AS regclass), :last)"),
+        {"name": name, "last": first + len(df) - 1},
+    )
+    return df.assign(**{column.name: np.arange(first, first + len(df))})
+
+
+def load_part(engine, table_name, df):
+    with engine.begin() as connection:
+        copy_frame(connection.connection, df, table_name)
+
+
+def copy_parallel(connection, table, df, workers):
+    df = reserve_ids(connection, table, df)
+    parts = [df.iloc[rows] for rows in np.array_split(np.arange(len(df)), workers)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(
+            executor.map(
+                load_part, [connection.engine] * workers, [table.name] * workers, parts
+            )
+        )
+
+
+def copy_table(connection, table, df, workers=1):
+    start = time.perf_counter()
+
+    with step("load", rows_in=len(df)) as record:
+        if workers > 1 and len(df) >= workers:
+            copy_parallel(connection, table, df, workers)
+        else:
+            copy_frame(connection.connection, df, table.name)
+        record.rows_out += len(df)
+
+    elapsed = max(time.perf_counter() - start, 1e-6)
+    print(
+        f"{table.name}: {len(df)} linhas em {elapsed:.2f}s "
+        f"({len(df) / elapsed:,.0f} linhas/s)"
+    )
+    return len(df)
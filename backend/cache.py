@@ -0,0 +1,157 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+
+class CachedResponse:
+    def __init__(self, response):
+        self.body = response.body
+        self.status_code = response.status_code
+        self.media_type = response.media_type
+
+    def response(self):
+        return Response(
+            content=self.body, status_code=self.status_code, media_type=self.media_type
+        )
+
+
+def freeze(value):
+    if isinstance(value, Response):
+        return CachedResponse(value)
+    return jsonable_encoder(value)
+
+
+def thaw(value):
+    if isinstance(value, CachedResponse):
+        return value.response()
+    return value
+
+
+class ResponseCache:
+    def __init__(
+        self, maxsize=1024, ttl=None, version_loader=None, version_interval=2.0
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_loader = version_loader
+        self.version_interval = version_interval
+        self.version = None
+        self.version_checked = None
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version_due(self):
+        now = time.monotonic()
+        if self.version_loader is None or (
+            self.version_checked is not None
+            and now - self.version_checked < self.version_interval
+        ):
+            return False
+
+        self.version_checked = now
+        return True
+
+    def update_version(self, version):
+        with self.lock:
+            if version != self.version:
+                if self.entries:
+                    self.invalidations += 1
+                self.entries.clear()
+                self.version = version
+        return version
+
+    def current_version(self):
+        if self.version_due():
+            return self.update_version(self.version_loader())
+        return self.version
+
+    async def current_version_async(self):
+        if self.version_due():
+            return self.update_version(await self.version_loader())
+        return self.version
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires is None or expires > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self.entries[key]
+            self.misses += 1
+            return False, None
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (expires, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / requests, 4) if requests else 0,
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "ttl": self.ttl,
+                "dataset_version": self.version,
+            }
+
+    def cached(self, name, ignore=("session",)):
+        def make_key(version, args, kwargs):
+            params = sorted(item for item in kwargs.items() if item[0] not in ignore)
+            return (name, version, args, tuple(params))
+
+        def decorator(endpoint):
+            if inspect.iscoroutinefunction(endpoint):
+
+                @functools.wraps(endpoint)
+                async def async_wrapper(*args, **kwargs):
+                    version = await self.current_version_async()
+                    key = make_key(version, args, kwargs)
+                    found, value = self.get(key)
+                    if not found:
+                        value = freeze(await endpoint(*args, **kwargs))
+                        self.set(key, value)
+                    return thaw(value)
+
+                return async_wrapper
+
+            @functools.wraps(endpoint)
+            def wrapper(*args, **kwargs):
+                version = self.current_version()
+                key = make_key(version, args, kwargs)
+                found, value = self.get(key)
+                if not found:
+                    value = freeze(endpoint(*args, **kwargs))
+                    self.set(key, value)
+                return thaw(value)
+
+            return wrapper
+
+        return decorator
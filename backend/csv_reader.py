@@ -0,0 +1,238 @@
+import codecs
+import csv
+import io
+import os
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa_csv = None
+
+sample_size = 1024 * 1024
+block_size = 64 * 1024
+csv_engine = os.getenv("CSV_ENGINE", "c").lower()
+
+schema_demonstracoes = {
+    "columns": {
+        "DATA": "str",
+        "REG_ANS": "str",
+        "DESCRICAO": "str",
+        "VL_SALDO_FINAL": "float64",
+    },
+    "options": {"thousands": ".", "decimal": ","},
+}
+schema_cadop = {
+    "columns": {
+        "REGISTRO_OPERADORA": "str",
+        "CNPJ": "str",
+        "Razao_Social": "str",
+        "Nome_Fantasia": "str",
+        "Modalidade": "str",
+        "UF": "str",
+        "Cidade": "str",
+        "Data_Registro_ANS": "str",
+    },
+    "options": {"on_bad_lines": "skip"},
+}
+schema_consolidado = {
+    "columns": {
+        "RegistroANS": "str",
+        "CNPJ": "str",
+        "RazaoSocial": "str",
+        "Trimestre": "Int64",
+        "Ano": "Int64",
+        "ValorDespesas": "float64",
+        "DESCRICAO": "str",
+    },
+    "options": {"decimal": ","},
+}
+schema_relatorio = {
+    "columns": {
+        **schema_consolidado["columns"],
+        "Modalidade": "str",
+        "UF": "str",
+        "Status_Validacao": "str",
+    },
+    "options": {"decimal": ","},
+}
+schema_agregados = {
+    "columns": {
+        "RazaoSocial": "str",
+        "UF": "str",
+        "TotalExpensives": "float64",
+        "TrimestralMean": "float64",
+        "Deviation": "float64",
+    },
+    "options": {"decimal": ",", "on_bad_lines": "skip"},
+}
+
+
+@contextmanager
+def open_binary(source):
+    if callable(source):
+        with source() as file:
+            yield file
+    elif isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            yield file
+    else:
+        source.seek(0)
+        yield source
+        source.seek(0)
+
+
+class CsvStream(io.RawIOBase):
+    def __init__(self, raw, encoding=None):
+        self.raw = raw
+        self.fallback = encoding is None
+        self.source_encoding = encoding or "utf-8"
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = b""
+        self.pending = b""
+        self.started = False
+        self.eof = False
+        self.columns = None
+
+    def readable(self):
+        return True
+
+    def convert(self, block):
+        if not self.started:
+            self.started = True
+            if block.startswith(codecs.BOM_UTF8):
+                block = block[len(codecs.BOM_UTF8) :]
+
+        if self.source_encoding in ("utf-8", "utf-8-sig"):
+            data = self.pending + block
+            try:
+                self.decoder.decode(block, final=not block)
+            except UnicodeDecodeError:
+                if not self.fallback:
+                    raise
+                self.source_encoding = "latin1"
+                self.pending, block = b"", data
+            else:
+                keep = len(self.decoder.getstate()[0])
+                self.pending = data[len(data) - keep :]
+                return data[: len(data) - keep]
+
+        return block.decode(self.source_encoding).encode("utf-8")
+
+    def fill(self, size=None):
+        while not self.eof and (size is None or len(self.buffer) < size):
+            wanted = block_size if size is None else size - len(self.buffer)
+            block = self.raw.read(max(wanted, block_size))
+            self.eof = not block
+            self.buffer += self.convert(block)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            self.fill()
+            size = len(self.buffer)
+        else:
+            self.fill(size)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def peek(self, size):
+        self.fill(size)
+        return self.buffer[:size]
+
+    def header(self):
+        if self.columns is None:
+            while b"\n" not in self.buffer and not self.eof:
+                self.fill(len(self.buffer) + block_size)
+            line = self.buffer.split(b"\n", 1)[0].decode("utf-8").rstrip("\r")
+            self.columns = next(csv.reader([line], delimiter=";"), [])
+        return self.columns
+
+
+@contextmanager
+def open_csv(source, encoding=None):
+    if isinstance(source, CsvStream):
+        yield source
+        return
+
+    with open_binary(source) as file:
+        yield CsvStream(file, encoding)
+
+
+def has_columns(source, schema, columns=None):
+    with open_csv(source) as file:
+        header = file.header()
+    return all(column in header for column in columns or schema["columns"])
+
+
+def parse_options(header, schema, columns):
+    wanted = columns or schema["columns"]
+    usecols = [
+        column for column in header if column in wanted and column in schema["columns"]
+    ]
+    dtype = {column: schema["columns"][column] for column in usecols}
+
+    options = dict(schema["options"])
+    options.update(sep=";", encoding="utf-8", usecols=usecols, dtype=dtype)
+    return options
+
+
+def skip_row(row):
+    return "skip"
+
+
+def read_arrow(file, options):
+    invalid_row_handler = None
+    if options.get("on_bad_lines") == "skip":
+        invalid_row_handler = skip_row
+
+    table = pa_csv.read_csv(
+        file,
+        read_options=pa_csv.ReadOptions(encoding=options["encoding"]),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=";", invalid_row_handler=invalid_row_handler
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=options["usecols"],
+            column_types={column: pa.string() for column in options["usecols"]},
+            strings_can_be_null=True,
+        ),
+    )
+    df = table.to_pandas()
+
+    for column, dtype in options["dtype"].items():
+        if dtype == "str":
+            continue
+        values = df[column]
+        if options.get("thousands"):
+            values = values.str.replace(options["thousands"], "", regex=False)
+        if options.get("decimal"):
+            values = values.str.replace(options["decimal"], ".", regex=False)
+        df[column] = pd.to_numeric(values).astype(dtype)
+
+    return df
+
+
+def read_csv(source, schema, columns=None, encoding=None, engine=None, nrows=None):
+    engine = engine or csv_engine
+    if pa_csv is None or nrows is not None:
+        engine = "c"
+
+    with open_csv(source, encoding) as file:
+        options = parse_options(file.header(), schema, columns)
+        if engine == "pyarrow":
+            return read_arrow(file, options)
+        return pd.read_csv(file, nrows=nrows, **options)
+
+
+def read_csv_chunks(source, schema, chunksize, columns=None, encoding=None):
+    with open_csv(source, encoding) as file:
+        options = parse_options(file.header(), schema, columns)
+        with pd.read_csv(file, chunksize=chunksize, **options) as reader:
+            yield from reader
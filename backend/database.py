@@ -0,0 +1,185 @@
+import os
+from dotenv import load_dotenv
+from sqlalchemy import (
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    String,
+    create_engine,
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+from metrics import instrument_engine
+
+load_dotenv()
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+db = None
+Session = None
+async_db = None
+AsyncSessionLocal = None
+Base = declarative_base()
+SummaryBase = declarative_base()
+
+
+class Operadora(Base):
+    __tablename__ = "operadoras"
+    __table_args__ = (
+        Index(
+            "ix_operadoras_razao_social_registro_ans", "razao_social", "registro_ans"
+        ),
+    )
+
+    registro_ans = Column(String(6), primary_key=True)
+    cnpj = Column(String(14), nullable=False, index=True)
+    razao_social = Column(String, nullable=False)
+    nome_fantasia = Column(String)
+    modalidade = Column(String)
+    uf = Column(String(2))
+    cidade = Column(String)
+    data_registro_ans = Column(Date)
+
+
+class Despesa(Base):
+    __tablename__ = "despesas"
+    __table_args__ = (
+        Index(
+            "ix_despesas_registro_ans_ano_trimestre",
+            "registro_ans",
+            "ano",
+            "trimestre",
+            postgresql_include=["valor_despesas"],
+        ),
+        Index("ix_despesas_ano_trimestre", "ano", "trimestre"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    registro_ans = Column(
+        String(6), ForeignKey("operadoras.registro_ans"), nullable=False
+    )
+    trimestre = Column(Integer, nullable=False)
+    ano = Column(Integer, nullable=False)
+    valor_despesas = Column(Numeric(30, 2), nullable=False)
+    descricao = Column(String)
+
+
+class Agregado(Base):
+    __tablename__ = "agregados"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    razao_social = Column(String, nullable=False)
+    uf = Column(String(2))
+    valorTotal_despesas = Column(Numeric(30, 2), nullable=False)
+    media_trimestre = Column(Numeric(30, 2))
+    desvio_padrao = Column(Numeric(30, 2))
+
+
+class ResumoGeral(SummaryBase):
+    __tablename__ = "resumo_geral"
+
+    id = Column(Integer, primary_key=True)
+    total_despesas = Column(Numeric(30, 2))
+    media_despesas = Column(Numeric)
+    qtd_despesas = Column(Integer, nullable=False)
+
+
+class ResumoTrimestre(SummaryBase):
+    __tablename__ = "resumo_trimestres"
+
+    registro_ans = Column(String(6), primary_key=True)
+    ano = Column(Integer, primary_key=True)
+    trimestre = Column(Integer, primary_key=True)
+    total_despesas = Column(Numeric(30, 2), nullable=False)
+
+
+class ResumoOperadora(SummaryBase):
+    __tablename__ = "resumo_operadoras"
+
+    registro_ans = Column(String(6), primary_key=True)
+    razao_social = Column(String, nullable=False)
+    uf = Column(String(2))
+    total_despesas = Column(Numeric(30, 2), nullable=False)
+    qtd_acima_media = Column(Integer, nullable=False)
+
+
+class ResumoUF(SummaryBase):
+    __tablename__ = "resumo_uf"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    uf = Column(String(2))
+    total_despesas = Column(Numeric(30, 2), nullable=False)
+    qtd_operadoras = Column(Integer, nullable=False)
+
+
+class ResumoCrescimento(SummaryBase):
+    __tablename__ = "resumo_crescimento"
+
+    registro_ans = Column(String(6), primary_key=True)
+    razao_social = Column(String, nullable=False)
+    total_inicial = Column(Numeric(30, 2), nullable=False)
+    total_final = Column(Numeric(30, 2), nullable=False)
+    crescimento_percentual = Column(Numeric)
+
+
+class VersaoDados(SummaryBase):
+    __tablename__ = "versao_dados"
+
+    id = Column(Integer, primary_key=True)
+    versao = Column(Integer, nullable=False)
+    atualizado_em = Column(DateTime, nullable=False)
+
+
+def get_db():
+    global db, Session
+
+    if db is None:
+        db = create_engine(DATABASE_URL)
+        instrument_engine(db, "etl", log_slow=False)
+        Session = sessionmaker(bind=db)
+    return db
+
+
+def async_url(url):
+    url = make_url(url)
+    return url.set(drivername=f"{url.get_backend_name()}+asyncpg")
+
+
+def create_async_db(url=DATABASE_URL, search_path=None):
+    server_settings = {}
+    statement_timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "10000"))
+    if statement_timeout > 0:
+        server_settings["statement_timeout"] = str(statement_timeout)
+    if search_path:
+        server_settings["search_path"] = search_path
+
+    engine = create_async_engine(
+        async_url(url),
+        pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "1") == "1",
+        connect_args={"server_settings": server_settings},
+    )
+    instrument_engine(engine, "api")
+    return engine
+
+
+def async_sessions():
+    global async_db, AsyncSessionLocal
+
+    if AsyncSessionLocal is None:
+        async_db = create_async_db()
+        AsyncSessionLocal = async_sessionmaker(async_db, expire_on_commit=False)
+    return AsyncSessionLocal
+
+
+async def get_session():
+    async with async_sessions()() as session:
+        yield session
@@ -2,6 +2,52 @@ import pandas as pd
 import glob
 import zipfile
 import os
+from contextlib import contextmanager
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import io
+from functools import partial
+from dotenv import load_dotenv
+from csv_reader import (
+    has_columns,
+    open_csv,
+    read_csv,
+    read_csv_chunks,
+    sample_size,
+    schema_demonstracoes,
+)
+from intermediate import ColumnarWriter, assemble_columnar
+from manifest import (
+    assemble_csv,
+    file_hash,
+    is_unchanged,
+    load_manifest,
+    partial_path,
+    partials_dir,
+    remove_outputs,
+    save_manifest,
+)
+from run_report import collect_steps, merge_steps, run_report, step, timed
+
+load_dotenv()
+
+finalColumns = [
+    "RegistroANS",
+    "CNPJ",
+    "RazaoSocial",
+    "Trimestre",
+    "Ano",
+    "ValorDespesas",
+    "DESCRICAO",
+]
+memory_factor = 4
+split_mb = float(os.getenv("ETAPA1_SPLIT_MB", "64"))
+
+generated_files = [
+    "consolidado_despesas.csv",
+    "despesas_agregadas.csv",
+    "relatorio_final.csv",
+]
 
 
 def unzipFile():
@@ -21,7 +67,7 @@ def unzipFile():
     for zip_file in zips_file:
         print(f"Descompactando: {zip_file}")
         try:
-            with zipfile.ZipFile(zip_file, "r") as zip_ref:
+            with step("unzip"), zipfile.ZipFile(zip_file, "r") as zip_ref:
                 zip_ref.extractall("./files")
                 print(f"Sucesso: {zip_file} extraído.")
         except zipfile.BadZipFile:
@@ -31,7 +77,7 @@ def unzipFile():
 def zipFile():
     print("Compactando arquivo")
     try:
-        with zipfile.ZipFile(
+        with step("zip"), zipfile.ZipFile(
             "./files/consolidado_despesas.zip", "w", zipfile.ZIP_DEFLATED
         ) as zipf:
             zipf.write(
@@ -42,47 +88,88 @@ def zipFile():
         print(f"Erro ao criar ZIP final: {err}")
 
 
-def read_files():
-    unzipFile()
-    dados_consolidados = []
+def list_sources():
+    sources = []
+    zips_file = sorted(set(glob.glob("*.zip") + glob.glob("./assets/*.zip")))
 
-    files = glob.glob("**/*.csv", recursive=True)
+    for zip_file in zips_file:
+        try:
+            with zipfile.ZipFile(zip_file, "r") as zip_ref:
+                members = [
+                    member
+                    for member in zip_ref.namelist()
+                    if member.lower().endswith(".csv")
+                ]
+        except zipfile.BadZipFile:
+            print(f"Erro: O arquivo {zip_file} parece estar corrompido.")
+            continue
+        sources.extend((zip_file, member) for member in sorted(members))
 
-    generated_files = [
-        "consolidado_despesas.csv",
-        "despesas_agregadas.csv",
-        "relatorio_final.csv",
-    ]
-    input_files = [
-        file for file in files if os.path.basename(file) not in generated_files
-    ]
+    streamed_members = {os.path.basename(member) for _, member in sources}
+    files = sorted(set(glob.glob("**/*.csv", recursive=True)))
+    for file in files:
+        file_name = os.path.basename(file)
+        if file_name in generated_files or file_name in streamed_members:
+            continue
+        if os.path.normpath(os.path.dirname(file)) == os.path.normpath(partials_dir):
+            continue
+        sources.append((None, file))
 
-    input_files = list(set(input_files))
+    return sources
 
-    for file in input_files:
-        try:
-            df = pd.read_csv(
-                file, sep=";", encoding="utf-8", thousands=".", decimal=","
-            )
-        except:
-            df = pd.read_csv(
-                file, sep=";", encoding="latin1", thousands=".", decimal=","
-            )
 
-        if "DESCRICAO" not in df.columns:
-            continue
+@contextmanager
+def open_source(source):
+    zip_file, member = source
+
+    if zip_file is None:
+        with open(member, "rb") as file:
+            yield file
+    else:
+        with zipfile.ZipFile(zip_file, "r") as zip_ref:
+            with zip_ref.open(member) as file:
+                yield file
+
+
+def has_needed_columns(source):
+    return has_columns(partial(open_source, source), schema_demonstracoes)
+
+
+def iter_source(source, max_memory_mb=None):
+    with open_csv(partial(open_source, source)) as file:
+        if not has_columns(file, schema_demonstracoes):
+            return
+
+        if not max_memory_mb:
+            with step("parse") as record:
+                df = read_csv(file, schema_demonstracoes)
+                record.rows_out += len(df)
+            yield df
+            return
+
+        chunksize = chunk_rows(file, max_memory_mb)
+        yield from timed(
+            "parse", read_csv_chunks(file, schema_demonstracoes, chunksize)
+        )
+
+
+def read_source(source):
+    return list(iter_source(source))
+
 
+def filter_expenses(df):
+    with step("filter", rows_in=len(df)) as record:
         filter_term = df["DESCRICAO"].str.contains(
             "EVENTOS|SINISTROS", case=False, na=False
         )
         df_filtered = df[filter_term].copy()
 
         if df_filtered.empty:
-            continue
+            return None
 
         df_filtered["DATA"] = pd.to_datetime(df_filtered["DATA"], errors="coerce")
-        df_filtered["Ano"] = df_filtered["DATA"].dt.year
-        df_filtered["Trimestre"] = df_filtered["DATA"].dt.quarter
+        df_filtered["Ano"] = df_filtered["DATA"].dt.year.astype("Int64")
+        df_filtered["Trimestre"] = df_filtered["DATA"].dt.quarter.astype("Int64")
         df_filtered["ValorDespesas"] = pd.to_numeric(
             df_filtered["VL_SALDO_FINAL"], errors="coerce"
         )
@@ -91,33 +178,281 @@ def read_files():
         df_filtered["CNPJ"] = ""
         df_filtered["RazaoSocial"] = ""
 
-        finalColumns = [
-            "RegistroANS",
-            "CNPJ",
-            "RazaoSocial",
-            "Trimestre",
-            "Ano",
-            "ValorDespesas",
-            "DESCRICAO",
-        ]
-        dados_consolidados.append(df_filtered[finalColumns])
-
-    if dados_consolidados:
-        df_final = pd.concat(dados_consolidados, ignore_index=True)
-
-        df_final.to_csv(
-            "./files/consolidado_despesas.csv",
-            index=False,
-            sep=";",
-            decimal=",",
-            encoding="utf-8-sig",
-        )
-        print("Arquivo 'consolidado_despesas.csv' gerado com sucesso!")
+        record.rows_out += len(df_filtered)
+        return df_filtered[finalColumns]
 
-        zipFile()
-    else:
+
+def chunk_rows(file, max_memory_mb):
+    sample = file.peek(sample_size)
+    sample = sample[: sample.rfind(b"\n") + 1]
+    sample = read_csv(io.BytesIO(sample), schema_demonstracoes, nrows=1000)
+
+    if sample.empty:
+        return 1000
+
+    bytes_per_row = sample.memory_usage(deep=True).sum() / len(sample)
+    budget_rows = max_memory_mb * 1024 * 1024 / (bytes_per_row * memory_factor)
+    return max(1, int(budget_rows))
+
+
+def write_source_chunked(source, handle, max_memory_mb, sink=None):
+    rows = 0
+
+    for chunk in iter_source(source, max_memory_mb):
+        rows += write_frame(handle, filter_expenses(chunk), sink)
+
+    return rows
+
+
+def write_frame(handle, df_filtered, sink=None):
+    if df_filtered is None:
+        return 0
+
+    name = "collect" if handle is None else "write"
+    with step(name, rows_in=len(df_filtered)) as record:
+        if handle is not None:
+            df_filtered.to_csv(
+                handle, index=False, header=False, sep=";", decimal=","
+            )
+        if sink is not None:
+            sink.write(df_filtered)
+        record.rows_out += len(df_filtered)
+    return len(df_filtered)
+
+
+def finish_consolidated(path_csv, total_rows):
+    if total_rows == 0:
+        if os.path.exists(path_csv):
+            os.remove(path_csv)
         print("Nenhum dado de sinistro encontrado.")
+        return
+
+    print("Arquivo 'consolidado_despesas.csv' gerado com sucesso!")
+    zipFile()
+
+
+def split_tasks(sources, split_bytes):
+    tasks = []
+
+    for source in sources:
+        if not has_needed_columns(source):
+            continue
+
+        if source[0] is not None:
+            tasks.append((source, 0, None))
+            continue
+
+        size = os.path.getsize(source[1])
+        for start in range(0, max(size, 1), split_bytes):
+            tasks.append((source, start, min(start + split_bytes, size)))
+
+    return tasks
+
+
+def read_range(source, start, end):
+    with open_source(source) as file:
+        header = file.readline()
+
+        if start > 0:
+            file.seek(start - 1)
+            file.readline()
+
+        position = file.tell()
+        if position >= end:
+            return header, b""
+
+        data = file.read(end - position)
+        if data and not data.endswith(b"\n"):
+            data += file.readline()
+
+    return header, data
+
+
+def process_member(source, max_memory_mb=None):
+    chunks = iter_source(source, max_memory_mb)
+    frames = [df for df in map(filter_expenses, chunks) if df is not None]
+    if not frames:
+        return None
+    return pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+
+
+def process_range(task, max_memory_mb=None):
+    source, start, end = task
+    if end is None:
+        return process_member(source, max_memory_mb)
+
+    header, data = read_range(source, start, end)
+
+    if not data.strip():
+        return None
+
+    with step("parse") as record:
+        df = read_csv(io.BytesIO(header + data), schema_demonstracoes)
+        record.rows_out += len(df)
+    return filter_expenses(df)
+
+
+def write_sources_parallel(sources, handle, workers, max_memory_mb=None, sink=None):
+    split_bytes = int(split_mb * 1024 * 1024)
+    worker_memory_mb = None
+    if max_memory_mb:
+        worker_memory_mb = max_memory_mb / workers
+        memory_bytes = worker_memory_mb * 1024 * 1024 / memory_factor
+        split_bytes = max(1, min(split_bytes, int(memory_bytes)))
+
+    tasks = split_tasks(sources, split_bytes)
+    print(f"Processando {len(tasks)} partes em {workers} processos")
+
+    def write_result(future):
+        df, steps = future.result()
+        merge_steps(steps)
+        return write_frame(handle, df, sink)
+
+    total_rows = 0
+    process = partial(collect_steps, process_range, max_memory_mb=worker_memory_mb)
+    with step("parallel") as record, ProcessPoolExecutor(
+        max_workers=workers
+    ) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(process, task))
+            if len(pending) >= workers:
+                total_rows += write_result(pending.popleft())
+        while pending:
+            total_rows += write_result(pending.popleft())
+        record.rows_out += total_rows
+
+    return total_rows
+
+
+def process_sources(sources, handle=None, max_memory_mb=None, workers=1, sink=None):
+    if workers > 1:
+        return write_sources_parallel(sources, handle, workers, max_memory_mb, sink)
+
+    total_rows = 0
+    for source in sources:
+        zip_file, member = source
+        print(f"Lendo: {zip_file}:{member}" if zip_file else f"Lendo: {member}")
+
+        if max_memory_mb:
+            total_rows += write_source_chunked(source, handle, max_memory_mb, sink)
+            continue
+
+        for df in read_source(source):
+            total_rows += write_frame(handle, filter_expenses(df), sink)
+
+    return total_rows
+
+
+def write_sources(
+    sources, path_csv, max_memory_mb=None, workers=1, encoding="utf-8-sig"
+):
+    with ColumnarWriter(path_csv) as sink, open(
+        path_csv, "w", encoding=encoding, newline=""
+    ) as handle:
+        pd.DataFrame(columns=finalColumns).to_csv(handle, index=False, sep=";")
+        return process_sources(sources, handle, max_memory_mb, workers, sink)
+
+
+class FrameCollector:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, df):
+        self.frames.append(df)
+
+    def frame(self):
+        if not self.frames:
+            return pd.DataFrame(columns=finalColumns)
+        return pd.concat(self.frames, ignore_index=True)
+
+
+def consolidate(sources=None, max_memory_mb=None, workers=None):
+    max_memory_mb, workers = processing_options(max_memory_mb, workers)
+    if sources is None:
+        sources = list_sources()
+
+    collector = FrameCollector()
+    process_sources(sources, None, max_memory_mb, workers, collector)
+    return collector.frame()
+
+
+def read_files_incremental(sources, path_csv, max_memory_mb=None, workers=1):
+    manifest = load_manifest()
+    stage = manifest.setdefault("etapa1", {})
+
+    inputs = {}
+    for source in sources:
+        zip_file, member = source
+        inputs.setdefault(zip_file or member, []).append(source)
+
+    os.makedirs(partials_dir, exist_ok=True)
+    partials = []
+    total_rows = 0
+
+    for input_file, input_sources in inputs.items():
+        with step("hash"):
+            sha = file_hash(input_file)
+        path_partial = partial_path(input_file)
+
+        if is_unchanged(stage.get(input_file), sha):
+            print(f"Inalterado: {input_file}")
+        else:
+            rows = write_sources(
+                input_sources, path_partial, max_memory_mb, workers, encoding="utf-8"
+            )
+            stage[input_file] = {"sha256": sha, "outputs": [path_partial], "rows": rows}
+
+        if stage[input_file]["rows"]:
+            partials.append(path_partial)
+            total_rows += stage[input_file]["rows"]
+
+    for removed in set(stage) - set(inputs):
+        print(f"Removido: {removed}")
+        remove_outputs(stage.pop(removed))
+
+    save_manifest(manifest)
+
+    if total_rows:
+        with step("assemble") as record:
+            assemble_csv(partials, path_csv)
+            assemble_columnar(partials, path_csv)
+            record.rows_out += total_rows
+    return total_rows
+
+
+def processing_options(max_memory_mb=None, workers=None):
+    if max_memory_mb is None and os.getenv("ETAPA1_MAX_MEMORY_MB"):
+        max_memory_mb = float(os.getenv("ETAPA1_MAX_MEMORY_MB"))
+    if workers is None:
+        workers = int(os.getenv("ETAPA1_WORKERS", "1"))
+    return max_memory_mb, workers
+
+
+def read_files(extract=None, max_memory_mb=None, workers=None, incremental=None):
+    if extract is None:
+        extract = os.getenv("ETAPA1_EXTRACT", "0") == "1"
+    max_memory_mb, workers = processing_options(max_memory_mb, workers)
+    if incremental is None:
+        incremental = os.getenv("ETL_INCREMENTAL", "0") == "1"
+
+    if not os.path.exists("./files"):
+        os.makedirs("./files")
+
+    if extract:
+        unzipFile()
+
+    sources = list_sources()
+    path_csv = "./files/consolidado_despesas.csv"
+
+    if incremental:
+        total_rows = read_files_incremental(sources, path_csv, max_memory_mb, workers)
+    else:
+        total_rows = write_sources(sources, path_csv, max_memory_mb, workers)
+
+    finish_consolidated(path_csv, total_rows)
 
 
 if __name__ == "__main__":
-    read_files()
+    with run_report("etapa1"):
+        read_files()
@@ -1,14 +1,32 @@
 import pandas as pd
 import glob
-import re
+import numpy as np
 import zipfile
+import os
+from dotenv import load_dotenv
+from aggregates import AggregateStore, quarter_totals
+from csv_reader import read_csv, schema_cadop, schema_consolidado, schema_relatorio
+from intermediate import assemble_columnar, read_columnar, write_columnar
+from manifest import (
+    assemble_csv,
+    combine_hashes,
+    file_hash,
+    is_unchanged,
+    load_manifest,
+    partial_path,
+    remove_outputs,
+    save_manifest,
+)
+from run_report import run_report, step
+
+load_dotenv()
 
 
 def zipFile():
     print("Compactando arquivo")
 
     try:
-        with zipfile.ZipFile(
+        with step("zip"), zipfile.ZipFile(
             "./files/Teste_Gustavo_Luiz.zip", "w", zipfile.ZIP_DEFLATED
         ) as zipf:
             zipf.write(
@@ -19,85 +37,119 @@ def zipFile():
         print(f"Erro ao criar ZIP final: {err}")
 
 
-def cnpj_validation(cnpj):
-    cnpj = re.sub(r"\D", "", str(cnpj))
+FLAG_CNPJ_AUSENTE = 1
+FLAG_CNPJ_INVALIDO = 2
+FLAG_RAZAO_VAZIA = 4
+FLAG_VALOR_NEGATIVO = 8
 
-    cnpj = cnpj.zfill(14)
-    if len(cnpj) != 14 or len(set(cnpj)) == 1:
-        return False
+flag_messages = [
+    (FLAG_CNPJ_AUSENTE, "CNPJ Ausente"),
+    (FLAG_CNPJ_INVALIDO, "CNPJ Inválido"),
+    (FLAG_RAZAO_VAZIA, "Razão Social Vazia"),
+    (FLAG_VALOR_NEGATIVO, "Valor Negativo"),
+]
 
-    firstDigit = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-    sum1 = sum(int(a) * b for a, b in zip(cnpj[:12], firstDigit))
-    digit1 = 11 - (sum1 % 11)
-    if digit1 >= 10:
-        digit1 = 0
+firstDigit = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+secondDigit = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
 
-    secondDigit = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-    sum2 = sum(int(a) * b for a, b in zip(cnpj[:13], secondDigit))
-    digit2 = 11 - (sum2 % 11)
-    if digit2 >= 10:
-        digit2 = 0
 
-    return cnpj[-2:] == f"{digit1}{digit2}"
+def check_digit(digits, weights):
+    digit = 11 - (digits @ weights) % 11
+    digit[digit >= 10] = 0
+    return digit
 
 
-def general_validation(row):
-    errors = []
+def cnpj_validation_batch(cnpjs):
+    codes, uniques = pd.factorize(pd.Series(cnpjs, dtype=object).astype(str))
+    if len(uniques) == 0:
+        return np.zeros(len(codes), dtype=bool)
+
+    cnpj = pd.Series(uniques).str.replace(r"[^0-9]", "", regex=True).str.zfill(14)
+    valid_size = (cnpj.str.len() == 14).to_numpy()
+    cnpj = cnpj.where(valid_size, "0" * 14)
+
+    digits = np.frombuffer("".join(cnpj).encode("ascii"), dtype=np.uint8)
+    digits = digits.reshape(-1, 14).astype(np.int64) - ord("0")
+
+    equal_digits = (digits == digits[:, :1]).all(axis=1)
+    digit1 = check_digit(digits[:, :12], firstDigit)
+    digit2 = check_digit(digits[:, :13], secondDigit)
+
+    valid = (
+        valid_size
+        & ~equal_digits
+        & (digits[:, 12] == digit1)
+        & (digits[:, 13] == digit2)
+    )
+    return valid[codes]
+
+
+def validation_flags(df):
+    cnpj = df["CNPJ"]
+    missing_cnpj = (cnpj.isna() | (cnpj == "")).to_numpy()
 
-    if pd.isna(row["CNPJ"]) or row["CNPJ"] == "":
-        errors.append("CNPJ Ausente")
-    elif not cnpj_validation(row["CNPJ"]):
-        errors.append("CNPJ Inválido")
+    flags = np.zeros(len(df), dtype=np.uint8)
+    flags[missing_cnpj] |= FLAG_CNPJ_AUSENTE
 
-    if pd.isna(row["RazaoSocial"]) or str(row["RazaoSocial"]).strip() == "":
-        errors.append("Razão Social Vazia")
+    present = ~missing_cnpj
+    invalid_cnpj = np.zeros(len(df), dtype=bool)
+    invalid_cnpj[present] = ~cnpj_validation_batch(cnpj[present])
+    flags[invalid_cnpj] |= FLAG_CNPJ_INVALIDO
 
-    floatValueExpenses = float(row["ValorDespesas"])
-    if floatValueExpenses < 0:
-        errors.append("Valor Negativo")
+    razao_social = df["RazaoSocial"]
+    blank_razao = razao_social.isna() | (razao_social.astype(str).str.strip() == "")
+    flags[blank_razao.to_numpy()] |= FLAG_RAZAO_VAZIA
 
+    negative = pd.to_numeric(df["ValorDespesas"], errors="coerce") < 0
+    flags[negative.to_numpy()] |= FLAG_VALOR_NEGATIVO
+
+    return flags
+
+
+def status_message(flag):
+    errors = [message for bit, message in flag_messages if flag & bit]
     if not errors:
         return "Válido"
     else:
         return "Inválido: " + ", ".join(errors)
 
 
-def enrichmentData():
-    try:
-        df_expenses = pd.read_csv(
-            "./files/consolidado_despesas.csv",
-            sep=";",
-            decimal=",",
-            encoding="utf-8-sig",
-            dtype={"RegistroANS": str},
-        )
-    except:
-        print("Erro: arquivo 'consolidado_despesas.csv' não encontrado.")
-        return
+def render_status(flags):
+    flags = pd.Series(flags)
+    return flags.map({flag: status_message(flag) for flag in flags.unique()})
+
+
+def cnpj_validation(cnpj):
+    return bool(cnpj_validation_batch([cnpj])[0])
+
+
+def general_validation(row):
+    return status_message(validation_flags(pd.DataFrame([row]))[0])
+
 
+def read_expenses(path_csv):
+    with step("parse") as record:
+        df_expenses = read_columnar(path_csv)
+        if df_expenses is None:
+            df_expenses = read_csv(path_csv, schema_consolidado)
+        record.rows_out += len(df_expenses)
+    return df_expenses
+
+
+def find_cadop():
     files_cadop = glob.glob("*Relatorio_cadop*.csv") + glob.glob(
         "./assets/*Relatorio_cadop.csv"
     )
     if not files_cadop:
         print("Relatorio de dados cadastrais das operadoras ativas não encontrado!")
-        return
+        return None
+    return files_cadop[0]
 
-    try:
-        df_cadop = pd.read_csv(
-            files_cadop[0],
-            sep=";",
-            encoding="utf-8",
-            dtype={"REGISTRO_OPERADORA": str, "CNPJ": str},
-            on_bad_lines="skip",
-        )
-    except:
-        df_cadop = pd.read_csv(
-            files_cadop[0],
-            sep=";",
-            encoding="latin1",
-            dtype={"REGISTRO_OPERADORA": str, "CNPJ": str},
-            on_bad_lines="skip",
-        )
+
+def read_cadop(file_cadop):
+    with step("parse") as record:
+        df_cadop = read_csv(file_cadop, schema_cadop)
+        record.rows_out += len(df_cadop)
 
     columns_cadop_toRename = {
         "REGISTRO_OPERADORA": "RegistroANS",
@@ -110,12 +162,14 @@ def enrichmentData():
     isColumnExisting = [
         column for column in columns_cadop_selected if column in df_cadop.columns
     ]
-    copyColumn = (
-        df_cadop[isColumnExisting].copy().drop_duplicates(subset=["RegistroANS"])
-    )
+    return df_cadop[isColumnExisting].copy().drop_duplicates(subset=["RegistroANS"])
 
+
+def enrich(df_expenses, df_cadop):
     df_expenses = df_expenses.drop(columns=["CNPJ", "RazaoSocial"], errors="ignore")
-    df_merged = pd.merge(df_expenses, copyColumn, on="RegistroANS", how="left")
+    with step("merge", rows_in=len(df_expenses)) as record:
+        df_merged = pd.merge(df_expenses, df_cadop, on="RegistroANS", how="left")
+        record.rows_out += len(df_merged)
 
     mismatches = df_merged["CNPJ"].isna().sum()
     total = len(df_merged)
@@ -127,49 +181,151 @@ def enrichmentData():
     df_merged["ValorDespesas"] = pd.to_numeric(
         df_merged["ValorDespesas"], errors="coerce"
     ).fillna(0)
-    df_merged["Status_Validacao"] = df_merged.apply(general_validation, axis=1)
+    with step("validate", rows_in=len(df_merged)) as record:
+        df_merged["Flags_Validacao"] = validation_flags(df_merged)
+        record.rows_out += int((df_merged["Flags_Validacao"] == 0).sum())
 
+    summary = df_merged["Flags_Validacao"].value_counts()
+    summary.index = pd.Index(render_status(summary.index), name="Status_Validacao")
     print("\nResumo da Validação:")
-    print(df_merged["Status_Validacao"].value_counts())
-
-    df_merged.to_csv(
-        "./files/relatorio_final.csv",
-        index=False,
-        sep=";",
-        decimal=",",
-        encoding="utf-8-sig",
-    )
-    print("Arquivo 'relatorio_final.csv' gerado com sucesso.")
+    print(summary)
 
-    df_clean = df_merged[df_merged["Status_Validacao"] == "Válido"].copy()
+    return df_merged
 
-    df_aggregated_sum = (
-        df_clean.groupby(["RazaoSocial", "UF", "Trimestre"])["ValorDespesas"]
-        .sum()
-        .reset_index()
-    )
-    df_calculations = (
-        df_aggregated_sum.groupby(["RazaoSocial", "UF"])["ValorDespesas"]
-        .agg(TotalExpensives="sum", TrimestralMean="mean", Deviation="std")
-        .reset_index()
-    )
 
-    df_calculations = df_calculations.sort_values(by="TotalExpensives", ascending=False)
-    df_calculations["Deviation"] = df_calculations["Deviation"].fillna(0)
-    df_calculations["TrimestralMean"] = df_calculations["TrimestralMean"].round(2)
-    df_calculations["Deviation"] = df_calculations["Deviation"].round(2)
-
-    df_calculations.to_csv(
-        "./files/despesas_agregadas.csv",
-        index=False,
-        sep=";",
-        decimal=",",
-        encoding="utf-8-sig",
-    )
+def report(df_merged):
+    df_report = df_merged.drop(columns=["Flags_Validacao"])
+    df_report["Status_Validacao"] = render_status(
+        df_merged["Flags_Validacao"].to_numpy()
+    ).to_numpy()
+    return df_report
+
+
+def validate_expenses(df_expenses, df_cadop):
+    df_merged = enrich(df_expenses, df_cadop)
+    df_clean = df_merged[df_merged["Flags_Validacao"] == 0]
+    return report(df_merged), aggregate(df_clean)
+
+
+def aggregate(df_clean):
+    store = AggregateStore()
+    store.fold(quarter_totals(df_clean))
+    return store.to_frame()
+
+
+def write_csv(df, path_csv, encoding="utf-8-sig"):
+    with step("write", rows_in=len(df)) as record:
+        df.to_csv(path_csv, index=False, sep=";", decimal=",", encoding=encoding)
+        write_columnar(df, path_csv)
+        record.rows_out += len(df)
+
+
+def write_aggregated(df_calculations):
+    write_csv(df_calculations, "./files/despesas_agregadas.csv")
     print("Arquivo 'despesas_agregadas.csv' gerado com sucesso!")
 
     zipFile()
 
 
+def read_report(path_report, columns):
+    with step("parse") as record:
+        df_report = read_columnar(path_report, columns)
+        if df_report is None:
+            df_report = read_csv(path_report, schema_relatorio, columns)
+        record.rows_out += len(df_report)
+    return df_report
+
+
+def enrichmentData_incremental(file_cadop):
+    manifest = load_manifest()
+    stage1 = manifest.get("etapa1", {})
+    stage = manifest.setdefault("etapa2", {})
+
+    inputs = {
+        input_file: entry for input_file, entry in stage1.items() if entry.get("rows")
+    }
+    if not inputs:
+        print("Nenhuma despesa no manifesto da etapa 1 (rode-a com ETL_INCREMENTAL=1).")
+        return
+
+    sha_cadop = file_hash(file_cadop)
+    df_cadop = None
+    partials = []
+    store = AggregateStore.load()
+    columns_aggregate = [
+        "RegistroANS",
+        "RazaoSocial",
+        "UF",
+        "Trimestre",
+        "ValorDespesas",
+        "Status_Validacao",
+    ]
+
+    for input_file, entry in inputs.items():
+        fingerprint = combine_hashes(entry["sha256"], sha_cadop)
+        path_report = partial_path(input_file, prefix="relatorio_")
+
+        if is_unchanged(stage.get(input_file), fingerprint):
+            print(f"Inalterado: {input_file}")
+            if not store.contains(input_file, fingerprint):
+                df_report = read_report(path_report, columns_aggregate)
+                df_clean = df_report[df_report["Status_Validacao"] == "Válido"]
+                store.replace(input_file, fingerprint, quarter_totals(df_clean))
+        else:
+            if df_cadop is None:
+                df_cadop = read_cadop(file_cadop)
+            df_merged = enrich(read_expenses(entry["outputs"][0]), df_cadop)
+            write_csv(report(df_merged), path_report, encoding="utf-8")
+            df_clean = df_merged[df_merged["Flags_Validacao"] == 0]
+            store.replace(input_file, fingerprint, quarter_totals(df_clean))
+            stage[input_file] = {"sha256": fingerprint, "outputs": [path_report]}
+
+        partials.append(path_report)
+
+    for removed in set(stage) - set(inputs):
+        remove_outputs(stage.pop(removed))
+    for removed in set(store.inputs) - set(inputs):
+        store.remove(removed)
+
+    store.save()
+    save_manifest(manifest)
+
+    with step("assemble"):
+        assemble_csv(partials, "./files/relatorio_final.csv")
+        assemble_columnar(partials, "./files/relatorio_final.csv")
+    print("Arquivo 'relatorio_final.csv' gerado com sucesso.")
+
+    write_aggregated(store.to_frame())
+
+
+def enrichmentData(incremental=None):
+    if incremental is None:
+        incremental = os.getenv("ETL_INCREMENTAL", "0") == "1"
+
+    if incremental:
+        file_cadop = find_cadop()
+        if file_cadop:
+            enrichmentData_incremental(file_cadop)
+        return
+
+    try:
+        df_expenses = read_expenses("./files/consolidado_despesas.csv")
+    except:
+        print("Erro: arquivo 'consolidado_despesas.csv' não encontrado.")
+        return
+
+    file_cadop = find_cadop()
+    if not file_cadop:
+        return
+
+    df_report, df_aggregated = validate_expenses(df_expenses, read_cadop(file_cadop))
+
+    write_csv(df_report, "./files/relatorio_final.csv")
+    print("Arquivo 'relatorio_final.csv' gerado com sucesso.")
+
+    write_aggregated(df_aggregated)
+
+
 if __name__ == "__main__":
-    enrichmentData()
+    with run_report("etapa2"):
+        enrichmentData()
@@ -1,212 +1,549 @@
 from sqlalchemy import (
-    create_engine,
     Column,
-    String,
-    Integer,
     text,
-    Date,
     ForeignKey,
-    Numeric,
+    Index,
+    MetaData,
+    Table,
+    delete,
+    func,
+    inspect,
+    select,
+    tuple_,
 )
-from sqlalchemy.orm import declarative_base, sessionmaker
 import pandas as pd
 import glob
 import os
 from dotenv import load_dotenv
+from bulk_load import copy_table, load_workers
+from csv_reader import read_csv, schema_agregados, schema_cadop, schema_consolidado
+from database import (
+    Base,
+    SummaryBase,
+    Operadora,
+    Despesa,
+    Agregado,
+    ResumoGeral,
+    VersaoDados,
+    get_db,
+)
+from intermediate import read_columnar
+from manifest import combine_hashes, file_hash, load_manifest, save_manifest
+from run_report import run_report, step
 
 load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-db = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=db)
-session = Session()
-Base = declarative_base()
-
-
-class Operadora(Base):
-    __tablename__ = "operadoras"
+db = get_db()
 
-    registro_ans = Column(String(6), primary_key=True)
-    cnpj = Column(String(14), nullable=False)
-    razao_social = Column(String, nullable=False)
-    nome_fantasia = Column(String)
-    modalidade = Column(String)
-    uf = Column(String(2))
-    cidade = Column(String)
-    data_registro_ans = Column(Date)
 
+summary_statements = [
+    """
+    INSERT INTO resumo_geral (id, total_despesas, media_despesas, qtd_despesas)
+    SELECT 1, SUM(valor_despesas), AVG(valor_despesas), COUNT(*) FROM {despesas}
+    """,
+    """
+    INSERT INTO resumo_trimestres (registro_ans, ano, trimestre, total_despesas)
+    SELECT registro_ans, ano, trimestre, SUM(valor_despesas)
+    FROM {despesas}
+    GROUP BY registro_ans, ano, trimestre
+    """,
+    """
+    INSERT INTO resumo_operadoras
+        (registro_ans, razao_social, uf, total_despesas, qtd_acima_media)
+    SELECT
+        op.registro_ans,
+        op.razao_social,
+        op.uf,
+        SUM(d.valor_despesas),
+        COUNT(*) FILTER (
+            WHERE d.valor_despesas > (SELECT media_despesas FROM resumo_geral)
+        )
+    FROM {despesas} d
+    JOIN {operadoras} op ON d.registro_ans = op.registro_ans
+    GROUP BY op.registro_ans, op.razao_social, op.uf
+    """,
+    """
+    INSERT INTO resumo_uf (uf, total_despesas, qtd_operadoras)
+    SELECT uf, SUM(total_despesas), COUNT(*)
+    FROM resumo_operadoras
+    GROUP BY uf
+    """,
+    """
+    WITH limites AS (
+        SELECT MIN(ano * 10 + trimestre) AS primeiro, MAX(ano * 10 + trimestre) AS ultimo
+        FROM resumo_trimestres
+    ),
+    inicial AS (
+        SELECT registro_ans, total_despesas AS total_inicial
+        FROM resumo_trimestres, limites
+        WHERE ano * 10 + trimestre = primeiro AND total_despesas > 0
+    ),
+    final AS (
+        SELECT registro_ans, total_despesas AS total_final
+        FROM resumo_trimestres, limites
+        WHERE ano * 10 + trimestre = ultimo
+    )
+    INSERT INTO resumo_crescimento
+        (registro_ans, razao_social, total_inicial, total_final, crescimento_percentual)
+    SELECT
+        op.registro_ans,
+        op.razao_social,
+        i.total_inicial,
+        f.total_final,
+        ROUND(((f.total_final - i.total_inicial) / i.total_inicial) * 100, 2)
+    FROM inicial i
+    JOIN final f ON i.registro_ans = f.registro_ans
+    JOIN {operadoras} op ON i.registro_ans = op.registro_ans
+    """,
+]
+
+
+def refresh_summaries(connection, operadoras="operadoras", despesas="despesas"):
+    with step("summaries"):
+        SummaryBase.metadata.create_all(bind=connection)
+        for table in reversed(SummaryBase.metadata.sorted_tables):
+            if table is not VersaoDados.__table__:
+                connection.execute(delete(table))
+        for statement in summary_statements:
+            connection.execute(
+                text(statement.format(operadoras=operadoras, despesas=despesas))
+            )
+    print("Tabelas de resumo atualizadas.")
+    bump_dataset_version(connection)
+
+
+def bump_dataset_version(connection):
+    version = connection.execute(
+        text(
+            """
+        INSERT INTO versao_dados (id, versao, atualizado_em) VALUES (1, 1, now())
+        ON CONFLICT (id) DO UPDATE
+        SET versao = versao_dados.versao + 1, atualizado_em = now()
+        RETURNING versao
+        """
+        )
+    ).scalar()
+    print(f"Versão dos dados: {version}")
+    return version
 
-class Despesa(Base):
-    __tablename__ = "despesas"
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    registro_ans = Column(
-        String(6), ForeignKey("operadoras.registro_ans"), nullable=False
-    )
-    trimestre = Column(Integer, nullable=False)
-    ano = Column(Integer, nullable=False)
-    valor_despesas = Column(Numeric(30, 2), nullable=False)
-    descricao = Column(String)
+def add_to_db(df_expenses, df_aggregated, df_cadop):
+    try:
+        with db.begin() as connection:
+            copy_table(connection, Operadora.__table__, df_cadop)
+            copy_table(connection, Despesa.__table__, df_expenses)
+            copy_table(connection, Agregado.__table__, df_aggregated)
+            refresh_summaries(connection)
+        print("Sucesso! Banco populado.")
+        return True
+    except Exception as err:
+        print(f"Erro ao inserir no banco: {err}")
+        return False
+
+
+def ensure_indexes(connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def staging_name(name):
+    return f"{name}_staging"
+
+
+def staging_metadata():
+    metadata = MetaData()
+    for table in Base.metadata.sorted_tables:
+        Table(
+            staging_name(table.name),
+            metadata,
+            *[
+                Column(
+                    column.name,
+                    column.type,
+                    *[
+                        ForeignKey(
+                            f"{staging_name(fk.column.table.name)}.{fk.column.name}"
+                        )
+                        for fk in column.foreign_keys
+                    ],
+                    primary_key=column.primary_key,
+                    nullable=column.nullable,
+                    autoincrement=column.autoincrement,
+                )
+                for column in table.columns
+            ],
+        )
+    return metadata
+
+
+def staging_indexes(metadata):
+    indexes = []
+    for table in Base.metadata.sorted_tables:
+        staging = metadata.tables[staging_name(table.name)]
+        for index in table.indexes:
+            indexes.append(
+                Index(
+                    staging_name(index.name),
+                    *[staging.c[column.name] for column in index.columns],
+                    unique=index.unique,
+                    **index.dialect_kwargs,
+                )
+            )
+    return indexes
+
+
+def validate_staging(connection, metadata, frames):
+    for name, df in frames.items():
+        staging = metadata.tables[staging_name(name)]
+        total = connection.execute(select(func.count()).select_from(staging)).scalar()
+        if total != len(df) or total == 0:
+            raise ValueError(
+                f"Tabela {staging.name} com {total} linhas, esperado {len(df)}"
+            )
+
+
+def rename_staging_objects(connection, table_name):
+    constraints = connection.execute(
+        text("SELECT conname FROM pg_constraint WHERE conrelid = CAST(:t AS regclass)"),
+        {"t": table_name},
+    ).scalars().all()
+    for name in constraints:
+        if "_staging" in name:
+            connection.execute(
+                text(
+                    f'ALTER TABLE "{table_name}" RENAME CONSTRAINT "{name}" '
+                    f'TO "{name.replace("_staging", "")}"'
+                )
+            )
+
+    relations = connection.execute(
+        text(
+            """
+        SELECT relname, relkind FROM pg_class WHERE oid IN (
+            SELECT indexrelid FROM pg_index WHERE indrelid = CAST(:t AS regclass)
+            UNION
+            SELECT objid FROM pg_depend
+            WHERE refobjid = CAST(:t AS regclass)
+              AND classid = CAST('pg_class' AS regclass) AND deptype = 'a'
+        )
+        """
+        ),
+        {"t": table_name},
+    ).all()
+    for name, kind in relations:
+        if "_staging" in name:
+            kind = "SEQUENCE" if kind == "S" else "INDEX"
+            connection.execute(
+                text(
+                    f'ALTER {kind} "{name}" RENAME TO "{name.replace("_staging", "")}"'
+                )
+            )
+
+
+def swap_tables(connection):
+    connection.execute(text("SET LOCAL lock_timeout = '30s'"))
+    for table in reversed(Base.metadata.sorted_tables):
+        connection.execute(text(f'DROP TABLE IF EXISTS "{table.name}"'))
+
+    for table in Base.metadata.sorted_tables:
+        connection.execute(
+            text(f'ALTER TABLE "{staging_name(table.name)}" RENAME TO "{table.name}"')
+        )
+        rename_staging_objects(connection, table.name)
 
 
-class Agregado(Base):
-    __tablename__ = "agregados"
+def drop_staging(metadata):
+    try:
+        with db.begin() as connection:
+            metadata.drop_all(bind=connection)
+    except Exception as err:
+        print(f"Erro ao remover as tabelas de staging: {err}")
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
-    razao_social = Column(String, nullable=False)
-    uf = Column(String(2))
-    valorTotal_despesas = Column(Numeric(30, 2), nullable=False)
-    media_trimestre = Column(Numeric(30, 2))
-    desvio_padrao = Column(Numeric(30, 2))
 
+def swap_to_db(df_expenses, df_aggregated, df_cadop):
+    metadata = staging_metadata()
+    frames = {
+        Operadora.__tablename__: df_cadop,
+        Despesa.__tablename__: df_expenses,
+        Agregado.__tablename__: df_aggregated,
+    }
 
-def add_to_db(df_expenses, df_aggregated, df_cadop):
     try:
-        df_cadop.to_sql("operadoras", db, if_exists="append", index=False)
-        df_expenses.to_sql("despesas", db, if_exists="append", index=False)
-        df_aggregated.to_sql("agregados", db, if_exists="append", index=False)
-        print("Sucesso! Banco populado.")
+        with db.begin() as connection:
+            metadata.drop_all(bind=connection)
+            metadata.create_all(bind=connection)
+        for table in Base.metadata.sorted_tables:
+            workers = load_workers if table.name == Despesa.__tablename__ else 1
+            with db.begin() as connection:
+                copy_table(
+                    connection,
+                    metadata.tables[staging_name(table.name)],
+                    frames[table.name],
+                    workers,
+                )
+
+        with db.begin() as connection:
+            for index in staging_indexes(metadata):
+                index.create(connection)
+            for staging in metadata.sorted_tables:
+                connection.execute(text(f'ANALYZE "{staging.name}"'))
+
+            validate_staging(connection, metadata, frames)
+            refresh_summaries(
+                connection,
+                staging_name(Operadora.__tablename__),
+                staging_name(Despesa.__tablename__),
+            )
+            swap_tables(connection)
+        print("Sucesso! Banco populado e tabelas trocadas.")
+        return True
     except Exception as err:
         print(f"Erro ao inserir no banco: {err}")
-        return
+        return False
+    finally:
+        drop_staging(metadata)
+
+
+cols_expenses = ["RegistroANS", "Trimestre", "Ano", "ValorDespesas", "DESCRICAO"]
+cols_cadop = [
+    "REGISTRO_OPERADORA",
+    "CNPJ",
+    "Razao_Social",
+    "Nome_Fantasia",
+    "Modalidade",
+    "UF",
+    "Cidade",
+    "Data_Registro_ANS",
+]
+
+columns_expenses_toRename = {
+    "RegistroANS": "registro_ans",
+    "Trimestre": "trimestre",
+    "Ano": "ano",
+    "ValorDespesas": "valor_despesas",
+    "DESCRICAO": "descricao",
+}
+columns_aggregated_toRename = {
+    "RazaoSocial": "razao_social",
+    "UF": "uf",
+    "TotalExpensives": "valorTotal_despesas",
+    "TrimestralMean": "media_trimestre",
+    "Deviation": "desvio_padrao",
+}
+columns_cadop_toRename = {
+    "REGISTRO_OPERADORA": "registro_ans",
+    "Razao_Social": "razao_social",
+    "Nome_Fantasia": "nome_fantasia",
+    "Modalidade": "modalidade",
+    "UF": "uf",
+    "Cidade": "cidade",
+    "Data_Registro_ANS": "data_registro_ans",
+    "CNPJ": "cnpj",
+}
+
+
+def read_expenses(path_csv):
+    with step("parse") as record:
+        df_expenses = read_columnar(path_csv, cols_expenses)
+        if df_expenses is None:
+            df_expenses = read_csv(path_csv, schema_consolidado, cols_expenses)
+        record.rows_out += len(df_expenses)
+    return expenses_frame(df_expenses)
+
+
+def expenses_frame(df_expenses):
+    return df_expenses[cols_expenses].rename(columns=columns_expenses_toRename)
+
+
+def read_aggregated(path_csv):
+    with step("parse") as record:
+        df_aggregated = read_columnar(path_csv)
+        if df_aggregated is None:
+            df_aggregated = read_csv(path_csv, schema_agregados)
+        record.rows_out += len(df_aggregated)
+    return aggregated_frame(df_aggregated)
+
+
+def aggregated_frame(df_aggregated):
+    return df_aggregated.rename(columns=columns_aggregated_toRename)
+
+
+def read_cadop(path_csv):
+    with step("parse") as record:
+        df_cadop = read_csv(path_csv, schema_cadop, cols_cadop)
+        record.rows_out += len(df_cadop)
+    df_cadop.rename(columns=columns_cadop_toRename, inplace=True)
+    df_cadop["data_registro_ans"] = pd.to_datetime(
+        df_cadop["data_registro_ans"], errors="coerce"
+    )
+    df_cadop.dropna(subset=["registro_ans", "cnpj", "razao_social"], inplace=True)
+    df_cadop.drop_duplicates(subset=["registro_ans"], inplace=True)
+    return df_cadop
 
 
-def read_files():
+def read_files(swap=False):
     file_expenses = glob.glob("./files/consolidado_despesas.csv")
     file_aggregated = glob.glob("./files/despesas_agregadas.csv")
     file_cadop = glob.glob("./assets/Relatorio_cadop*.csv")
 
     if not file_expenses or not file_aggregated or not file_cadop:
         print("Alguns arquivos não foram encontrados.")
-        return
+        return False
 
-    cols_expenses = ["RegistroANS", "Trimestre", "Ano", "ValorDespesas", "DESCRICAO"]
-    cols_cadop = [
-        "REGISTRO_OPERADORA",
-        "CNPJ",
-        "Razao_Social",
-        "Nome_Fantasia",
-        "Modalidade",
-        "UF",
-        "Cidade",
-        "Data_Registro_ANS",
-    ]
+    return load_frames(
+        read_expenses(file_expenses[0]),
+        read_aggregated(file_aggregated[0]),
+        read_cadop(file_cadop[0]),
+        swap,
+    )
 
-    try:
-        df_expenses = pd.read_csv(
-            file_expenses[0],
-            sep=";",
-            encoding="utf-8",
-            decimal=",",
-            usecols=cols_expenses,
-            dtype={"RegistroANS": str},
-            on_bad_lines="skip",
-        )
-        df_aggregated = pd.read_csv(
-            file_aggregated[0],
-            sep=";",
-            encoding="utf-8",
-            decimal=",",
-            on_bad_lines="skip",
-        )
-        df_cadop = pd.read_csv(
-            file_cadop[0],
-            sep=";",
-            encoding="utf-8",
-            usecols=cols_cadop,
-            dtype=str,
-            on_bad_lines="skip",
-        )
-    except:
-        df_expenses = pd.read_csv(
-            file_expenses[0],
-            sep=";",
-            encoding="latin1",
-            decimal=",",
-            usecols=cols_expenses,
-            dtype={"RegistroANS": str},
-            on_bad_lines="skip",
-        )
-        df_aggregated = pd.read_csv(
-            file_aggregated[0],
-            sep=";",
-            encoding="latin1",
-            decimal=",",
-            on_bad_lines="skip",
-        )
-        df_cadop = pd.read_csv(
-            file_cadop[0],
-            sep=";",
-            encoding="latin1",
-            usecols=cols_cadop,
-            dtype=str,
-            on_bad_lines="skip",
-        )
 
-    columns_expenses_toRename = {
-        "RegistroANS": "registro_ans",
-        "Trimestre": "trimestre",
-        "Ano": "ano",
-        "ValorDespesas": "valor_despesas",
-        "DESCRICAO": "descricao",
-    }
-    columns_aggregated_toRename = {
-        "RazaoSocial": "razao_social",
-        "UF": "uf",
-        "TotalExpensives": "valorTotal_despesas",
-        "TrimestralMean": "media_trimestre",
-        "Deviation": "desvio_padrao",
-    }
-    columns_cadop_toRename = {
-        "REGISTRO_OPERADORA": "registro_ans",
-        "Razao_Social": "razao_social",
-        "Nome_Fantasia": "nome_fantasia",
-        "Modalidade": "modalidade",
-        "UF": "uf",
-        "Cidade": "cidade",
-        "Data_Registro_ANS": "data_registro_ans",
-        "CNPJ": "cnpj",
+def load_frames(df_expenses, df_aggregated, df_cadop, swap=False):
+    with step("filter", rows_in=len(df_expenses)) as record:
+        operadoras_validas = set(df_cadop["registro_ans"])
+        df_expenses = df_expenses[
+            df_expenses["registro_ans"].isin(operadoras_validas)
+        ]
+        record.rows_out += len(df_expenses)
+
+    if swap:
+        return swap_to_db(df_expenses, df_aggregated, df_cadop)
+    return add_to_db(df_expenses, df_aggregated, df_cadop)
+
+
+def recreate_tables():
+    Base.metadata.drop_all(bind=db)
+    Base.metadata.create_all(bind=db)
+
+
+def quarters_of(df_expenses):
+    pairs = df_expenses[["ano", "trimestre"]].dropna().drop_duplicates()
+    return sorted((int(ano), int(trimestre)) for ano, trimestre in pairs.values)
+
+
+def in_quarters(df_expenses, quarters):
+    keys = pd.MultiIndex.from_frame(df_expenses[["ano", "trimestre"]])
+    return df_expenses[keys.isin(quarters)]
+
+
+def load_incremental():
+    manifest = load_manifest()
+    stage1 = manifest.get("etapa1", {})
+    stage = manifest.setdefault("etapa3", {})
+
+    file_aggregated = glob.glob("./files/despesas_agregadas.csv")
+    file_cadop = glob.glob("./assets/Relatorio_cadop*.csv")
+    inputs = {
+        input_file: entry for input_file, entry in stage1.items() if entry.get("rows")
     }
 
-    df_expenses.rename(columns=columns_expenses_toRename, inplace=True)
-    df_aggregated.rename(columns=columns_aggregated_toRename, inplace=True)
-    df_cadop.rename(columns=columns_cadop_toRename, inplace=True)
-    df_cadop["data_registro_ans"] = pd.to_datetime(
-        df_cadop["data_registro_ans"], errors="coerce"
+    if not inputs or not file_aggregated or not file_cadop:
+        print("Alguns arquivos não foram encontrados.")
+        return
+
+    sha_cadop = file_hash(file_cadop[0])
+    sha_aggregated = file_hash(file_aggregated[0])
+    full_reload = stage.get("cadop") != sha_cadop or not inspect(db).has_table(
+        "despesas"
     )
-    df_cadop.dropna(subset=["registro_ans", "cnpj", "razao_social"], inplace=True)
-    df_cadop.drop_duplicates(subset=["registro_ans"], inplace=True)
 
+    df_cadop = read_cadop(file_cadop[0])
     operadoras_validas = set(df_cadop["registro_ans"])
-    df_expenses = df_expenses[df_expenses["registro_ans"].isin(operadoras_validas)]
+    loaded = {} if full_reload else stage.get("partials", {})
+
+    changed = {}
+    quarters = set()
+    for input_file, entry in inputs.items():
+        fingerprint = combine_hashes(entry["sha256"], sha_cadop)
+        previous = loaded.get(input_file)
+        if previous and previous["sha256"] == fingerprint:
+            continue
+
+        df_expenses = read_expenses(entry["outputs"][0])
+        df_expenses = df_expenses[df_expenses["registro_ans"].isin(operadoras_validas)]
+        changed[input_file] = (fingerprint, df_expenses)
+        quarters.update(quarters_of(df_expenses))
+        if previous:
+            quarters.update(tuple(quarter) for quarter in previous["quarters"])
+
+    for removed in set(loaded) - set(inputs):
+        quarters.update(tuple(quarter) for quarter in loaded[removed]["quarters"])
+
+    to_insert = {input_file: data[1] for input_file, data in changed.items()}
+    for input_file, previous in loaded.items():
+        if input_file in inputs and input_file not in changed:
+            if quarters & {tuple(quarter) for quarter in previous["quarters"]}:
+                df_expenses = read_expenses(inputs[input_file]["outputs"][0])
+                to_insert[input_file] = df_expenses[
+                    df_expenses["registro_ans"].isin(operadoras_validas)
+                ]
+
+    try:
+        with db.begin() as connection:
+            if full_reload:
+                print("Cadastro de operadoras alterado: recarga completa.")
+                Base.metadata.drop_all(bind=connection)
+                Base.metadata.create_all(bind=connection)
+                copy_table(connection, Operadora.__table__, df_cadop)
+            else:
+                ensure_indexes(connection)
+                if quarters:
+                    connection.execute(
+                        delete(Despesa).where(
+                            tuple_(Despesa.ano, Despesa.trimestre).in_(
+                                sorted(quarters)
+                            )
+                        )
+                    )
+
+            for input_file, df_expenses in to_insert.items():
+                print(f"Carregando despesas de {input_file}")
+                copy_table(
+                    connection, Despesa.__table__, in_quarters(df_expenses, quarters)
+                )
+
+            if full_reload or stage.get("agregados") != sha_aggregated:
+                connection.execute(delete(Agregado))
+                copy_table(
+                    connection, Agregado.__table__, read_aggregated(file_aggregated[0])
+                )
+
+            if (
+                full_reload
+                or quarters
+                or not inspect(connection).has_table(ResumoGeral.__tablename__)
+            ):
+                refresh_summaries(connection)
+    except Exception as err:
+        print(f"Erro ao inserir no banco: {err}")
+        return
+
+    partials = {
+        input_file: previous
+        for input_file, previous in loaded.items()
+        if input_file in inputs
+    }
+    for input_file, (fingerprint, df_expenses) in changed.items():
+        partials[input_file] = {
+            "sha256": fingerprint,
+            "quarters": quarters_of(df_expenses),
+        }
+
+    stage.update(cadop=sha_cadop, agregados=sha_aggregated, partials=partials)
+    save_manifest(manifest)
 
-    add_to_db(df_expenses, df_aggregated, df_cadop)
+    if quarters:
+        print(f"Trimestres recarregados: {sorted(quarters)}")
+    else:
+        print("Nenhum trimestre alterado.")
+    print("Sucesso! Banco atualizado.")
 
 
 def query1():
     querySQL = text(
         """
-    WITH despesas_t1 AS (
-        SELECT registro_ans, SUM(valor_despesas) as total_inicial
-        FROM despesas 
-        WHERE trimestre = 1
-        GROUP BY registro_ans
-        HAVING SUM(valor_despesas) > 0
-    ),
-    despesas_t3 AS (
-        SELECT registro_ans, SUM(valor_despesas) as total_final
-        FROM despesas 
-        WHERE trimestre = 3
-        GROUP BY registro_ans
-    )
-    
-    SELECT 
-        op.razao_social,
-        t1.total_inicial,
-        t3.total_final,
-        ROUND(((t3.total_final - t1.total_inicial) / t1.total_inicial) * 100, 2) as crescimento_percentual
-    FROM despesas_t1 t1
-    JOIN despesas_t3 t3 ON t1.registro_ans = t3.registro_ans 
-    JOIN operadoras op ON t1.registro_ans = op.registro_ans  
+    SELECT razao_social, total_inicial, total_final, crescimento_percentual
+    FROM resumo_crescimento
     ORDER BY crescimento_percentual DESC
     LIMIT 5;
     """
@@ -225,13 +562,11 @@ def query2():
     querySQL = text(
         """
     SELECT 
-        op.uf,
-        SUM(despesas.valor_despesas) as despesa_total,
-        COUNT(DISTINCT op.registro_ans) as qtd_operadoras,
-        (SUM(despesas.valor_despesas) / COUNT(DISTINCT op.registro_ans)) as media_por_operadora
-    FROM despesas
-    JOIN operadoras op ON despesas.registro_ans = op.registro_ans
-    GROUP BY op.uf
+        uf,
+        total_despesas as despesa_total,
+        qtd_operadoras,
+        (total_despesas / qtd_operadoras) as media_por_operadora
+    FROM resumo_uf
     ORDER BY despesa_total DESC
     LIMIT 5;
     """
@@ -247,22 +582,7 @@ def query2():
 def query3():
     querySQL = text(
         """
-    WITH media AS (
-        SELECT AVG(valor_despesas) as valor_media FROM despesas
-    ),
-    despesas_acima_media AS (
-        SELECT registro_ans, trimestre
-        FROM despesas, media
-        WHERE despesas.valor_despesas > media.valor_media
-    ),
-    operadoras_relacionadas AS (
-        SELECT registro_ans
-        FROM despesas_acima_media
-        GROUP BY registro_ans
-        HAVING COUNT(trimestre) >= 2 
-    )
-
-    SELECT COUNT(*) FROM operadoras_relacionadas;
+    SELECT COUNT(*) FROM resumo_operadoras WHERE qtd_acima_media >= 2;
     """
     )
 
@@ -275,16 +595,22 @@ def query3():
 
 def analitics_queriesSQL():
     try:
-        query1()
-        query2()
-        query3()
+        with step("queries"):
+            query1()
+            query2()
+            query3()
     except Exception as err:
         print(f"Erro ao rodar as queries: {err}")
         return
 
 
 if __name__ == "__main__":
-    Base.metadata.drop_all(bind=db)
-    Base.metadata.create_all(bind=db)
-    read_files()
-    analitics_queriesSQL()
+    with run_report("etapa3"):
+        if os.getenv("ETL_INCREMENTAL", "0") == "1":
+            load_incremental()
+        elif os.getenv("ETAPA3_SWAP", "0") == "1":
+            read_files(swap=True)
+        else:
+            recreate_tables()
+            read_files()
+        analitics_queriesSQL()
@@ -0,0 +1,119 @@
+import csv
+import importlib.util
+import io
+import zlib
+from schemas import DespesaExportOut
+from pydantic import TypeAdapter
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+FIELDS = list(DespesaExportOut.model_fields)
+
+rows_adapter = TypeAdapter(list[DespesaExportOut])
+row_adapter = TypeAdapter(DespesaExportOut)
+
+
+def csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (int, str)):
+        return value
+    return str(value).replace(".", ",")
+
+
+async def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";", lineterminator="\n")
+    writer.writerow(FIELDS)
+    async for rows in batches:
+        writer.writerows([csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def ndjson_chunks(batches):
+    async for rows in batches:
+        items = rows_adapter.validate_python(rows, from_attributes=True)
+        yield b"".join(row_adapter.dump_json(item) + b"\n" for item in items)
+
+
+class StreamSink(io.RawIOBase):
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def parquet_schema(pa):
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("registro_ans", pa.string()),
+            ("cnpj", pa.string()),
+            ("razao_social", pa.string()),
+            ("uf", pa.string()),
+            ("ano", pa.int32()),
+            ("trimestre", pa.int32()),
+            ("valor_despesas", pa.decimal128(30, 2)),
+            ("descricao", pa.string()),
+        ]
+    )
+
+
+async def parquet_chunks(batches, compression="snappy"):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema(pa)
+    sink = StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        async for rows in batches:
+            columns = [list(column) for column in zip(*rows)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(batches, format, gzip=False):
+    if format == "parquet":
+        return parquet_chunks(batches, compression="gzip" if gzip else "snappy")
+
+    chunks = csv_chunks(batches) if format == "csv" else ndjson_chunks(batches)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,106 @@
+import os
+import pandas as pd
+
+intermediate_format = os.getenv("ETL_INTERMEDIATE_FORMAT", "csv").lower()
+extensions = {"parquet": ".parquet", "arrow": ".arrow"}
+dictionary_columns = {"DESCRICAO", "Modalidade", "UF", "Status_Validacao"}
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    if intermediate_format in extensions:
+        print("pyarrow não instalado: usando apenas CSV entre as etapas.")
+
+
+def columnar_enabled():
+    return pa is not None and intermediate_format in extensions
+
+
+def columnar_path(path_csv):
+    return os.path.splitext(path_csv)[0] + extensions.get(intermediate_format, "")
+
+
+def arrow_schema(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    fields = []
+    for field in table.schema:
+        if field.name in dictionary_columns:
+            field = field.with_type(pa.dictionary(pa.int32(), pa.string()))
+        elif pa.types.is_null(field.type) or pa.types.is_large_string(field.type):
+            field = field.with_type(pa.string())
+        fields.append(field)
+    return pa.schema(fields, metadata=table.schema.metadata)
+
+
+class ColumnarWriter:
+    def __init__(self, path_csv):
+        self.path = columnar_path(path_csv) if columnar_enabled() else None
+        self.schema = None
+        self.writer = None
+
+    def write(self, df):
+        if self.path is None or df is None:
+            return
+
+        if self.writer is None:
+            self.schema = arrow_schema(df)
+            if intermediate_format == "parquet":
+                self.writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self.writer = pa.ipc.new_stream(self.path, self.schema)
+
+        table = pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        elif self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_columnar(df, path_csv):
+    with ColumnarWriter(path_csv) as writer:
+        writer.write(df)
+
+
+def read_table(path):
+    if intermediate_format == "parquet":
+        return pq.read_table(path)
+    with pa.ipc.open_stream(path) as reader:
+        return reader.read_all()
+
+
+def read_columnar(path_csv, columns=None):
+    if not columnar_enabled():
+        return None
+
+    path = columnar_path(path_csv)
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(path_csv) and os.path.getmtime(path) < os.path.getmtime(path_csv):
+        return None
+
+    df = read_table(path).to_pandas()
+    return df[columns] if columns else df
+
+
+def assemble_columnar(partials_csv, path_csv):
+    if not columnar_enabled():
+        return
+
+    paths = [columnar_path(path_partial) for path_partial in partials_csv]
+    if not all(os.path.exists(path) for path in paths):
+        return
+
+    with ColumnarWriter(path_csv) as writer:
+        for path in paths:
+            writer.write(read_table(path).to_pandas())
@@ -1,13 +1,53 @@
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import func, desc, or_
-from etapa3_integratingDB import Session, Operadora, Despesa
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func, desc, select, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from cache import ResponseCache
+from export import FORMATS, export_chunks, parquet_available
+from metrics import MetricsMiddleware, content_type, render_metrics
+from search import OperatorSearch
+import database
+from database import (
+    get_session,
+    Operadora,
+    Despesa,
+    ResumoGeral,
+    ResumoOperadora,
+    ResumoTrimestre,
+    ResumoUF,
+    VersaoDados,
+)
+from schemas import (
+    DespesaExportOut,
+    DespesaOut,
+    EstatisticasOut,
+    GraficoOut,
+    OperadoraOut,
+    OperadorasPage,
+    SugestaoOut,
+    VisaoGeralOut,
+)
+import base64
+import functools
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    if database.async_db is not None:
+        await database.async_db.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 
@@ -23,161 +63,496 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+async def dataset_version():
+    try:
+        async with database.async_sessions()() as session:
+            return await session.scalar(select(VersaoDados.versao))
+    except SQLAlchemyError:
+        return None
+
+
+MAX_OVERVIEW_BATCH = int(os.getenv("API_OVERVIEW_MAX_BATCH", "100"))
+EXPORT_BATCH_SIZE = int(os.getenv("API_EXPORT_BATCH_SIZE", "5000"))
+
+cache = ResponseCache(
+    maxsize=int(os.getenv("API_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("API_CACHE_TTL", "0")) or None,
+    version_loader=dataset_version,
+    version_interval=float(os.getenv("API_CACHE_VERSION_INTERVAL", "2")),
+)
+
+
+operator_columns = [getattr(Operadora, field) for field in OperadoraOut.model_fields]
+expense_columns = [getattr(Despesa, field) for field in DespesaOut.model_fields]
+export_columns = [
+    getattr(Operadora if field in ("cnpj", "razao_social", "uf") else Despesa, field)
+    for field in DespesaExportOut.model_fields
+]
+
+
+@functools.lru_cache
+def adapter(response_type):
+    return TypeAdapter(response_type)
+
+
+def json_response(response_type, data):
+    serializer = adapter(response_type)
+    content = serializer.dump_json(
+        serializer.validate_python(data, from_attributes=True)
+    )
+    return Response(content=content, media_type="application/json")
+
+
+def encode_cursor(operator):
+    payload = json.dumps([operator.razao_social, operator.registro_ans])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        razao_social, registro_ans = json.loads(base64.urlsafe_b64decode(cursor))
+        return str(razao_social), str(registro_ans)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+async def count_operators(session):
+    key = ("operadoras_total", await cache.current_version_async())
+    found, total = cache.get(key)
+    if not found:
+        total = await session.scalar(select(func.count()).select_from(Operadora))
+        cache.set(key, total)
+    return total
+
 
+async def load_search_rows(session):
+    rows = await session.execute(
+        select(
+            Operadora.registro_ans,
+            Operadora.cnpj,
+            Operadora.razao_social,
+            Operadora.nome_fantasia,
+        )
+    )
+    return rows.all()
+
+
+operator_search = OperatorSearch(load_search_rows)
+
+
+async def search_operators(session, query_search, limit=None):
+    version = await cache.current_version_async()
+    index = await operator_search.get(version, session)
+    return index.search(query_search, limit)
+
+
+async def searched_page(session, query_search, page, limit, cursor):
+    matches = await search_operators(session, query_search)
+    start = (page - 1) * limit
+    if cursor:
+        last = decode_cursor(cursor)[1]
+        start = next(
+            (i + 1 for i, row in enumerate(matches) if row.registro_ans == last),
+            len(matches),
+        )
+
+    registros = [row.registro_ans for row in matches[start : start + limit]]
+    found = {
+        operator.registro_ans: operator
+        for operator in await session.execute(
+            select(*operator_columns).where(Operadora.registro_ans.in_(registros))
+        )
+    }
+    operators = [found[registro] for registro in registros if registro in found]
+    return operators, len(matches), start + limit < len(matches)
 
-@app.get("/api/operadoras")
-def operators(page: int = 1, limit: int = 10, query_search: str = None):
-    session = Session()
 
+@app.get("/api/operadoras", response_model=OperadorasPage)
+async def operators(
+    page: int = 1,
+    limit: int = 10,
+    query_search: str = None,
+    cursor: str = None,
+    with_total: bool = True,
+    session: AsyncSession = Depends(get_session),
+):
     try:
-        operators = session.query(Operadora)
+        query_search = query_search.strip() if query_search else None
 
-        if query_search and query_search.strip():
-            operators = operators.where(
-                or_(
-                    Operadora.cnpj.ilike(f"%{query_search}%"),
-                    Operadora.razao_social.ilike(f"%{query_search}%"),
+        if query_search:
+            operators, total_operators, has_more = await searched_page(
+                session, query_search, page, limit, cursor
+            )
+        else:
+            total_operators = await count_operators(session) if with_total else None
+
+            operators = select(*operator_columns).order_by(
+                Operadora.razao_social, Operadora.registro_ans
+            )
+            if cursor:
+                operators = operators.where(
+                    tuple_(Operadora.razao_social, Operadora.registro_ans)
+                    > tuple_(*decode_cursor(cursor))
                 )
+            else:
+                operators = operators.offset((page - 1) * limit)
+            operators = (await session.execute(operators.limit(limit + 1))).all()
+            has_more = len(operators) > limit
+            operators = operators[:limit]
+
+        total_pages = None
+        if with_total:
+            total_pages = (
+                (total_operators + limit - 1) // limit if total_operators > 0 else 1
             )
+        else:
+            total_operators = None
 
-        total_operators = operators.count()
-        total_pages = (
-            (total_operators + limit - 1) // limit if total_operators > 0 else 1
+        return json_response(
+            OperadorasPage,
+            {
+                "operators": operators,
+                "total": total_operators,
+                "page": page,
+                "limit": limit,
+                "total_pages": total_pages,
+                "next_cursor": encode_cursor(operators[-1]) if has_more else None,
+            },
         )
-        offset = (page - 1) * limit
-        operators = operators.offset(offset).limit(limit).all()
+    except HTTPException as http_err:
+        print(f"Erro: {http_err}")
+        raise http_err
+    except Exception as err:
+        print(f"Erro: {err}")
+        raise HTTPException(status_code=500, detail=str(err))
+
 
-        return {
-            "operators": operators,
-            "total": total_operators,
-            "page": page,
-            "limit": limit,
-            "total_pages": total_pages,
-        }
+@app.get("/api/operadoras/suggest", response_model=list[SugestaoOut])
+async def operators_suggest(
+    q: str = "", limit: int = 8, session: AsyncSession = Depends(get_session)
+):
+    try:
+        suggestions = await search_operators(session, q, max(1, min(limit, 50)))
+        return json_response(list[SugestaoOut], suggestions)
     except Exception as err:
         print(f"Erro: {err}")
         raise HTTPException(status_code=500, detail=str(err))
-    finally:
-        session.close()
 
 
-@app.get("/api/operadoras/{cnpj}")
-def operator(cnpj: str):
-    session = Session()
+async def load_overviews(session, cnpjs, page, limit):
+    overviews = {cnpj: None for cnpj in cnpjs}
+    operators = (
+        await session.execute(
+            select(*operator_columns)
+            .where(Operadora.cnpj.in_(cnpjs))
+            .order_by(Operadora.registro_ans)
+        )
+    ).all()
+    if not operators:
+        return overviews
+
+    for operator in operators:
+        if overviews[operator.cnpj] is None:
+            overviews[operator.cnpj] = {
+                "operator": [],
+                "despesas": {"items": [], "page": page, "limit": limit, "total": 0},
+                "chart": [],
+            }
+        overviews[operator.cnpj]["operator"].append(operator)
+
+    registro_cnpj = {operator.registro_ans: operator.cnpj for operator in operators}
+    registros = list(registro_cnpj)
+    offset = (page - 1) * limit
+
+    totals = (
+        select(Despesa.registro_ans, func.count().label("total"))
+        .where(Despesa.registro_ans.in_(registros))
+        .group_by(Despesa.registro_ans)
+        .subquery()
+    )
+    ranked = (
+        select(
+            Despesa.id,
+            Despesa.registro_ans,
+            func.row_number()
+            .over(
+                partition_by=Despesa.registro_ans,
+                order_by=(Despesa.ano, Despesa.trimestre, Despesa.id),
+            )
+            .label("posicao"),
+        )
+        .where(Despesa.registro_ans.in_(registros))
+        .subquery()
+    )
+    page_ids = select(ranked).where(ranked.c.posicao <= offset + limit).subquery()
+    expenses = await session.execute(
+        select(
+            totals.c.registro_ans.label("registro"), totals.c.total, *expense_columns
+        )
+        .select_from(totals)
+        .outerjoin(page_ids, page_ids.c.registro_ans == totals.c.registro_ans)
+        .outerjoin(Despesa, Despesa.id == page_ids.c.id)
+        .order_by(totals.c.registro_ans, page_ids.c.posicao)
+    )
+    counted = set()
+    for expense in expenses:
+        despesas = overviews[registro_cnpj[expense.registro]]["despesas"]
+        if expense.registro not in counted:
+            counted.add(expense.registro)
+            despesas["total"] += expense.total
+        if expense.id is not None:
+            despesas["items"].append(expense)
+
+    for overview in overviews.values():
+        if overview is None:
+            continue
+        despesas = overview["despesas"]
+        despesas["items"] = sorted(
+            despesas["items"], key=lambda row: (row.ano, row.trimestre, row.id)
+        )[offset : offset + limit]
+
+    chart = await session.execute(
+        select(
+            ResumoTrimestre.registro_ans,
+            ResumoTrimestre.ano,
+            ResumoTrimestre.trimestre,
+            ResumoTrimestre.total_despesas,
+        )
+        .where(ResumoTrimestre.registro_ans.in_(registros))
+        .order_by(ResumoTrimestre.ano, ResumoTrimestre.trimestre)
+    )
+    quarters = {}
+    for row in chart:
+        key = (registro_cnpj[row.registro_ans], row.ano, row.trimestre)
+        quarters[key] = quarters.get(key, 0) + row.total_despesas
+    for (cnpj, ano, trimestre), total in quarters.items():
+        overviews[cnpj]["chart"].append(
+            {"ano": ano, "trimestre": trimestre, "total": total}
+        )
+
+    return overviews
+
+
+@app.get(
+    "/api/operadoras/overview", response_model=dict[str, VisaoGeralOut | None]
+)
+async def operators_overview(
+    cnpj: list[str] = Query(default=[]),
+    page: int = 1,
+    limit: int = 50,
+    session: AsyncSession = Depends(get_session),
+):
+    cnpjs = list(dict.fromkeys(cnpj))
+    if not cnpjs or len(cnpjs) > MAX_OVERVIEW_BATCH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Informe entre 1 e {MAX_OVERVIEW_BATCH} CNPJs",
+        )
 
     try:
-        operatorX = session.query(Operadora).where(Operadora.cnpj == cnpj).all()
-        if operatorX == []:
+        overviews = await load_overviews(session, cnpjs, page, limit)
+        return json_response(dict[str, VisaoGeralOut | None], overviews)
+    except Exception as err:
+        print(f"Erro: {err}")
+        raise HTTPException(status_code=500, detail=str(err))
+
+
+@app.get("/api/operadoras/{cnpj}/overview", response_model=VisaoGeralOut)
+@cache.cached("overview")
+async def operator_overview(
+    cnpj: str,
+    page: int = 1,
+    limit: int = 50,
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        overview = (await load_overviews(session, [cnpj], page, limit))[cnpj]
+        if overview is None:
             raise HTTPException(status_code=404, detail="Operadora não encontrada")
-        return operatorX
+        return json_response(VisaoGeralOut, overview)
     except HTTPException as http_err:
         print(f"Erro: {http_err}")
         raise http_err
     except Exception as err:
         print(f"Erro: {err}")
         raise HTTPException(status_code=500, detail=str(err))
-    finally:
-        session.close()
 
 
-@app.get("/api/operadoras/{cnpj}/despesas")
-def operator_expenses(cnpj: str):
-    session = Session()
+@app.get("/api/operadoras/{cnpj}", response_model=list[OperadoraOut])
+@cache.cached("operadora")
+async def operator(cnpj: str, session: AsyncSession = Depends(get_session)):
+    try:
+        operatorX = (
+            await session.execute(
+                select(*operator_columns).where(Operadora.cnpj == cnpj)
+            )
+        ).all()
+        if operatorX == []:
+            raise HTTPException(status_code=404, detail="Operadora não encontrada")
+        return json_response(list[OperadoraOut], operatorX)
+    except HTTPException as http_err:
+        print(f"Erro: {http_err}")
+        raise http_err
+    except Exception as err:
+        print(f"Erro: {err}")
+        raise HTTPException(status_code=500, detail=str(err))
+
 
+@app.get("/api/operadoras/{cnpj}/despesas", response_model=list[DespesaOut])
+@cache.cached("despesas")
+async def operator_expenses(cnpj: str, session: AsyncSession = Depends(get_session)):
     try:
-        operatorX_expenses = (
-            session.query(Despesa)
+        operatorX_expenses = await session.execute(
+            select(*expense_columns)
             .join(Operadora)
             .where(Operadora.cnpj == cnpj)
             .order_by(Despesa.ano, Despesa.trimestre)
-            .all()
         )
-        return operatorX_expenses
+        return json_response(list[DespesaOut], operatorX_expenses.all())
     except Exception as err:
         print(f"Erro: {err}")
         raise HTTPException(status_code=500, detail=str(err))
-    finally:
-        session.close()
 
 
-@app.get("/api/operadoras/{cnpj}/despesas/chart")
-def operator_expenses_chart(cnpj: str):
-    session = Session()
-
+@app.get("/api/operadoras/{cnpj}/despesas/chart", response_model=GraficoOut)
+@cache.cached("chart")
+async def operator_expenses_chart(
+    cnpj: str, session: AsyncSession = Depends(get_session)
+):
     try:
-        expensesTrimester = (
-            session.query(
-                Despesa.ano,
-                Despesa.trimestre,
-                func.sum(Despesa.valor_despesas).label("total_despesas_trimestre"),
+        expensesTrimester = await session.execute(
+            select(
+                ResumoTrimestre.ano,
+                ResumoTrimestre.trimestre,
+                func.sum(ResumoTrimestre.total_despesas).label(
+                    "total_despesas_trimestre"
+                ),
             )
-            .join(Operadora)
+            .join(Operadora, Operadora.registro_ans == ResumoTrimestre.registro_ans)
             .where(Operadora.cnpj == cnpj)
-            .group_by(Despesa.ano, Despesa.trimestre)
-            .order_by(Despesa.ano, Despesa.trimestre)
-            .all()
-        )
-
-        return {
-            "chart": [
-                {
-                    "ano": row.ano,
-                    "trimestre": row.trimestre,
-                    "total": row.total_despesas_trimestre,
-                }
-                for row in expensesTrimester
-            ],
-        }
+            .group_by(ResumoTrimestre.ano, ResumoTrimestre.trimestre)
+            .order_by(ResumoTrimestre.ano, ResumoTrimestre.trimestre)
+        )
+
+        return json_response(
+            GraficoOut,
+            {
+                "chart": [
+                    {
+                        "ano": row.ano,
+                        "trimestre": row.trimestre,
+                        "total": row.total_despesas_trimestre,
+                    }
+                    for row in expensesTrimester
+                ],
+            },
+        )
     except Exception as err:
         print(f"Erro: {err}")
         raise HTTPException(status_code=500, detail=str(err))
-    finally:
-        session.close()
 
 
-@app.get("/api/estatisticas")
-def statistcs():
-    session = Session()
+async def export_batches(statement):
+    async with database.async_sessions()() as session:
+        result = await session.stream(
+            statement.execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            yield rows
+
+
+@app.get("/api/export/despesas")
+async def export_expenses(
+    format: str = "csv",
+    gzip: bool = False,
+    ano: int = None,
+    trimestre: int = None,
+    uf: str = None,
+    cnpj: str = None,
+):
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido, use um de: {', '.join(FORMATS)}",
+        )
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=400, detail="Exportação em parquet requer o pyarrow instalado"
+        )
+
+    statement = select(*export_columns).join(Operadora).order_by(Despesa.id)
+    if ano is not None:
+        statement = statement.where(Despesa.ano == ano)
+    if trimestre is not None:
+        statement = statement.where(Despesa.trimestre == trimestre)
+    if uf:
+        statement = statement.where(Operadora.uf == uf.upper())
+    if cnpj:
+        statement = statement.where(Operadora.cnpj == cnpj)
+
+    filename = f"despesas.{format}"
+    media_type = FORMATS[format]
+    if gzip and format != "parquet":
+        filename, media_type = f"{filename}.gz", "application/gzip"
+
+    return StreamingResponse(
+        export_chunks(export_batches(statement), format, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 
+@app.get("/api/estatisticas", response_model=EstatisticasOut)
+@cache.cached("estatisticas")
+async def statistcs(session: AsyncSession = Depends(get_session)):
     try:
-        statistcsTotal, statistcsAvg = session.query(
-            func.sum(Despesa.valor_despesas), func.avg(Despesa.valor_despesas)
-        ).first()
-
-        statistcsTop5Res = (
-            session.query(
-                Operadora.razao_social,
-                func.sum(Despesa.valor_despesas).label("total_despesas"),
+        statistcsTotal, statistcsAvg = (
+            await session.execute(
+                select(ResumoGeral.total_despesas, ResumoGeral.media_despesas)
             )
-            .join(Despesa)
-            .group_by(Operadora.razao_social)
+        ).first() or (None, None)
+
+        statistcsTop5Res = await session.execute(
+            select(
+                ResumoOperadora.razao_social,
+                func.sum(ResumoOperadora.total_despesas).label("total_despesas"),
+            )
+            .group_by(ResumoOperadora.razao_social)
             .order_by(desc("total_despesas"))
             .limit(5)
-            .all()
         )
 
-        statistcsUF = (
-            session.query(
-                Operadora.uf,
-                func.sum(Despesa.valor_despesas).label("total_despesas2"),
-            )
-            .join(Despesa)
-            .group_by(Operadora.uf)
-            .all()
-        )
-        return {
-            "total_geral": statistcsTotal or 0,
-            "media_geral": statistcsAvg or 0,
-            "top_5_operadoras": [
-                {"razao_social": row.razao_social, "total": row.total_despesas}
-                for row in statistcsTop5Res
-            ],
-            "distribuicao_uf": [
-                {"uf": row.uf, "despesas": row.total_despesas2} for row in statistcsUF
-            ],
-        }
+        statistcsUF = await session.execute(
+            select(ResumoUF.uf, ResumoUF.total_despesas.label("total_despesas2"))
+        )
+        return json_response(
+            EstatisticasOut,
+            {
+                "total_geral": statistcsTotal or 0,
+                "media_geral": statistcsAvg or 0,
+                "top_5_operadoras": [
+                    {"razao_social": row.razao_social, "total": row.total_despesas}
+                    for row in statistcsTop5Res
+                ],
+                "distribuicao_uf": [
+                    {"uf": row.uf, "despesas": row.total_despesas2}
+                    for row in statistcsUF
+                ],
+            },
+        )
     except Exception as err:
         print(f"Erro: {err}")
         raise HTTPException(status_code=500, detail=str(err))
-    finally:
-        session.close()
+
+
+@app.get("/api/cache")
+def cache_stats():
+    return cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type=content_type)
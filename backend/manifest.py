@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import shutil
+
+manifest_path = "./files/manifest_etl.json"
+partials_dir = "./files/parciais"
+
+
+def file_hash(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def combine_hashes(*hashes):
+    return hashlib.sha256("|".join(hashes).encode("utf-8")).hexdigest()
+
+
+def load_manifest():
+    if not os.path.exists(manifest_path):
+        return {}
+
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        print("Manifesto do ETL ilegível, todas as etapas serão refeitas.")
+        return {}
+
+
+def save_manifest(manifest):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    path_tmp = manifest_path + ".tmp"
+    with open(path_tmp, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(path_tmp, manifest_path)
+
+
+def is_unchanged(entry, fingerprint):
+    if not entry or entry.get("sha256") != fingerprint:
+        return False
+    return all(os.path.exists(output) for output in entry.get("outputs", []))
+
+
+def partial_path(input_file, prefix=""):
+    return os.path.join(partials_dir, f"{prefix}{os.path.basename(input_file)}.csv")
+
+
+def remove_outputs(entry):
+    for output in entry.get("outputs", []):
+        if os.path.exists(output):
+            os.remove(output)
+
+
+def assemble_csv(partials, path_csv):
+    header_written = False
+
+    with open(path_csv, "wb") as output:
+        output.write(b"\xef\xbb\xbf")
+        for path_partial in partials:
+            with open(path_partial, "rb") as file:
+                header = file.readline()
+                if not header_written:
+                    output.write(header)
+                    header_written = True
+                shutil.copyfileobj(file, output, 1024 * 1024)
+
+    return header_written
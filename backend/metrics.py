@@ -0,0 +1,341 @@
+import asyncio
+import bisect
+import functools
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from sqlalchemy import event
+
+load_dotenv()
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+slow_query_ms = float(os.getenv("API_SLOW_QUERY_MS", "500"))
+slow_query_explain = os.getenv("API_SLOW_QUERY_EXPLAIN", "0") == "1"
+max_statements = int(os.getenv("API_METRICS_MAX_STATEMENTS", "200"))
+content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+placeholder = re.compile(r"(?:\$\d+|%\(\w+\)s|%s|\?)(?:::\w+(?:\[\])?)?")
+placeholder_list = re.compile(r"\?(?:\s*,\s*\?)+")
+case_list = re.compile(r"(?:WHEN \? THEN \? )+")
+blank = re.compile(r"\s+")
+
+
+def label_text(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    return ",".join(f'{name}="{escape(value)}"' for name, value in pairs)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, description, label_names=()):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.series.items()):
+            yield self.name, label_text(self.label_names, labels), value
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self.lock:
+            samples = list(self.samples())
+        for name, labels, value in samples:
+            labels = f"{{{labels}}}" if labels else ""
+            lines.append(f"{name}{labels} {number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set(self, labels, value):
+        with self.lock:
+            self.series[labels] = value
+
+
+class Histogram(Counter):
+    kind = "histogram"
+
+    def __init__(self, name, description, label_names=(), buckets=latency_buckets):
+        super().__init__(name, description, label_names)
+        self.buckets = buckets
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        for labels, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    label_text(self.label_names, labels, le=bound),
+                    cumulative,
+                )
+            yield (
+                f"{self.name}_bucket",
+                label_text(self.label_names, labels, le="+Inf"),
+                series[-1],
+            )
+            yield f"{self.name}_sum", label_text(self.label_names, labels), series[-2]
+            yield f"{self.name}_count", label_text(self.label_names, labels), series[-1]
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds",
+    "Tempo de resposta por rota, até o último byte do corpo.",
+    ("method", "route"),
+)
+requests_total = Counter(
+    "http_requests_total",
+    "Requisições por rota e status.",
+    ("method", "route", "status"),
+)
+requests_in_flight = Gauge("http_requests_in_flight", "Requisições em andamento.")
+statement_latency = Histogram(
+    "db_statement_duration_seconds",
+    "Tempo de execução por instrução SQL (normalizada).",
+    ("engine", "statement"),
+)
+slow_queries = Counter(
+    "db_slow_queries_total",
+    "Instruções SQL acima de API_SLOW_QUERY_MS.",
+    ("engine",),
+)
+pool_usage = Gauge(
+    "db_pool_connections",
+    "Conexões do pool por estado.",
+    ("engine", "state"),
+)
+
+engines = {}
+explain_engines = {}
+explaining = set()
+explain_tasks = set()
+explain_executor = None
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_statement(statement):
+    statement = placeholder.sub("?", blank.sub(" ", statement).strip())
+    statement = case_list.sub("WHEN ? THEN ? ", placeholder_list.sub("?", statement))
+    return statement[:300]
+
+
+def statement_label(engine_name, statement):
+    label = normalize_statement(statement)
+    if (engine_name, label) not in statement_latency.series and (
+        len(statement_latency.series) >= max_statements
+    ):
+        return "outras"
+    return label
+
+
+def explainable(statement, context):
+    return (
+        statement.lstrip()[:6].upper() == "SELECT"
+        and not context.executemany
+        and not context.execution_options.get("stream_results")
+        and not context.execution_options.get("yield_per")
+    )
+
+
+def print_plan(label, rows):
+    print(f"Plano da consulta lenta: {label}\n" + "\n".join(rows))
+
+
+def explain_sync(engine, label, statement, parameters):
+    try:
+        with engine.connect() as connection:
+            connection = connection.execution_options(explain=True)
+            plan = connection.exec_driver_sql("EXPLAIN " + statement, parameters)
+            print_plan(label, plan.scalars().all())
+    except Exception as err:
+        print(f"Erro ao rodar EXPLAIN: {err}")
+    finally:
+        explaining.discard(label)
+
+
+async def explain_async(engine, label, statement, parameters):
+    try:
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(explain=True)
+            plan = await connection.exec_driver_sql("EXPLAIN " + statement, parameters)
+            print_plan(label, plan.scalars().all())
+    except Exception as err:
+        print(f"Erro ao rodar EXPLAIN: {err}")
+    finally:
+        explaining.discard(label)
+
+
+def schedule_explain(name, statement, parameters):
+    global explain_executor
+
+    label = normalize_statement(statement)
+    if label in explaining:
+        return
+    explaining.add(label)
+
+    engine = explain_engines[name]
+    if hasattr(engine, "sync_engine"):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            explaining.discard(label)
+            return
+        task = loop.create_task(explain_async(engine, label, statement, parameters))
+        explain_tasks.add(task)
+        task.add_done_callback(explain_tasks.discard)
+        return
+
+    if explain_executor is None:
+        explain_executor = ThreadPoolExecutor(max_workers=1)
+    explain_executor.submit(explain_sync, engine, label, statement, parameters)
+
+
+def log_slow_query(name, statement, parameters, elapsed, context):
+    details = repr(parameters)
+    if len(details) > 1000:
+        details = details[:1000] + "..."
+    print(
+        f"Consulta lenta ({elapsed * 1000:.0f} ms): {blank.sub(' ', statement)}\n"
+        f"Parâmetros: {details}"
+    )
+    if slow_query_explain and explainable(statement, context):
+        schedule_explain(name, statement, parameters)
+
+
+def instrument_engine(engine, name, log_slow=True):
+    explain_engines[name] = engine
+    engine = getattr(engine, "sync_engine", engine)
+    engines[name] = engine
+
+    def finish(connection, statement, parameters, context, logged=log_slow):
+        started = context.__dict__.pop("metrics_started", None)
+        if started is None:
+            return
+
+        elapsed = time.perf_counter() - started
+        statement_latency.observe((name, statement_label(name, statement)), elapsed)
+        if slow_query_ms > 0 and elapsed * 1000 >= slow_query_ms:
+            slow_queries.inc((name,))
+            if logged:
+                log_slow_query(name, statement, parameters, elapsed, context)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(
+        connection, cursor, statement, parameters, context, executemany
+    ):
+        if not context.execution_options.get("explain"):
+            context.metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(
+        connection, cursor, statement, parameters, context, executemany
+    ):
+        finish(connection, statement, parameters, context)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        if context is not None:
+            finish(
+                exception_context.connection,
+                exception_context.statement,
+                exception_context.parameters,
+                context,
+                False,
+            )
+
+    return engine
+
+
+def update_pool_usage():
+    for name, engine in engines.items():
+        pool = engine.pool
+        for state, getter in (
+            ("size", "size"),
+            ("checked_out", "checkedout"),
+            ("checked_in", "checkedin"),
+            ("overflow", "overflow"),
+        ):
+            if hasattr(pool, getter):
+                pool_usage.set((name, state), getattr(pool, getter)())
+
+
+def render_metrics():
+    update_pool_usage()
+    lines = []
+    for metric in (
+        request_latency,
+        requests_total,
+        requests_in_flight,
+        statement_latency,
+        slow_queries,
+        pool_usage,
+    ):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            route = getattr(scope.get("route"), "path", "desconhecida")
+            method = scope["method"]
+            request_latency.observe((method, route), time.perf_counter() - started)
+            requests_total.inc((method, route, str(status)))
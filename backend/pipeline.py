@@ -0,0 +1,253 @@
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+import pandas as pd
+from dotenv import load_dotenv
+import etapa1_process_file as etapa1
+import etapa2_validatingData as etapa2
+from manifest import combine_hashes, file_hash
+from run_report import run_report, step
+
+load_dotenv()
+
+cache_dir = os.getenv("ETL_PIPELINE_CACHE_DIR", "./files/pipeline")
+cache_version = "1"
+stages = ["download", "consolidate", "validate", "load"]
+inputs = {
+    "download": (),
+    "consolidate": (),
+    "validate": ("consolidate",),
+    "load": ("consolidate", "validate"),
+}
+
+
+def require_cadop():
+    file_cadop = etapa2.find_cadop()
+    if not file_cadop:
+        raise SystemExit("Pipeline interrompido: Relatorio_cadop não encontrado.")
+    return file_cadop
+
+
+def run_download(results, options):
+    import script_download
+
+    statuses = script_download.download_files()
+    failed = [name for name, status in statuses.items() if status == "erro"]
+    if failed:
+        print(f"Falha no download de {', '.join(failed)}: usando os arquivos locais.")
+    return {}
+
+
+def run_consolidate(results, options):
+    df_expenses = etapa1.consolidate()
+    if df_expenses.empty:
+        raise SystemExit("Pipeline interrompido: nenhum dado de sinistro encontrado.")
+    return {"despesas": df_expenses}
+
+
+def run_validate(results, options):
+    df_report, df_aggregated = etapa2.validate_expenses(
+        results["consolidate"]["despesas"], etapa2.read_cadop(require_cadop())
+    )
+    return {"relatorio": df_report, "agregados": df_aggregated}
+
+
+def run_load(results, options):
+    import etapa3_integratingDB as etapa3
+
+    df_cadop = etapa3.read_cadop(require_cadop())
+    if not options["swap"]:
+        etapa3.recreate_tables()
+
+    loaded = etapa3.load_frames(
+        etapa3.expenses_frame(results["consolidate"]["despesas"]),
+        etapa3.aggregated_frame(results["validate"]["agregados"]),
+        df_cadop,
+        options["swap"],
+    )
+    if not loaded:
+        raise SystemExit(
+            "Falha na carga do banco. Rode o pipeline de novo: as etapas anteriores "
+            "serão lidas do cache."
+        )
+
+    if options["queries"]:
+        etapa3.analitics_queriesSQL()
+    return {}
+
+
+def consolidate_fingerprint(fingerprints):
+    files = sorted(
+        {
+            zip_file or member
+            for zip_file, member in etapa1.list_sources()
+            if etapa1.has_needed_columns((zip_file, member))
+        }
+    )
+    return combine_hashes(
+        cache_version, "consolidate", *(f"{path}:{file_hash(path)}" for path in files)
+    )
+
+
+def validate_fingerprint(fingerprints):
+    return combine_hashes(
+        cache_version,
+        "validate",
+        fingerprints["consolidate"],
+        file_hash(require_cadop()),
+    )
+
+
+def write_consolidated(outputs):
+    etapa2.write_csv(outputs["despesas"], "./files/consolidado_despesas.csv")
+    print("Arquivo 'consolidado_despesas.csv' gerado com sucesso!")
+    etapa1.zipFile()
+
+
+def write_validated(outputs):
+    etapa2.write_csv(outputs["relatorio"], "./files/relatorio_final.csv")
+    print("Arquivo 'relatorio_final.csv' gerado com sucesso.")
+    etapa2.write_aggregated(outputs["agregados"])
+
+
+runners = {
+    "download": run_download,
+    "consolidate": run_consolidate,
+    "validate": run_validate,
+    "load": run_load,
+}
+fingerprinters = {
+    "consolidate": consolidate_fingerprint,
+    "validate": validate_fingerprint,
+}
+writers = {
+    "consolidate": write_consolidated,
+    "validate": write_validated,
+}
+
+
+def cache_entry(name):
+    return os.path.join(cache_dir, f"{name}.json")
+
+
+def load_cached(name, fingerprint):
+    path_entry = cache_entry(name)
+    if not os.path.exists(path_entry):
+        return None
+
+    try:
+        with open(path_entry, "r", encoding="utf-8") as file:
+            entry = json.load(file)
+        if entry["fingerprint"] != fingerprint:
+            return None
+        return {
+            output: pd.read_pickle(os.path.join(cache_dir, file_name))
+            for output, file_name in entry["outputs"].items()
+        }
+    except (OSError, ValueError, KeyError, EOFError, pickle.UnpicklingError):
+        print(f"Cache da etapa {name} ilegível, a etapa será refeita.")
+        return None
+
+
+def save_cached(name, fingerprint, outputs):
+    os.makedirs(cache_dir, exist_ok=True)
+    files = {}
+    for output, df in outputs.items():
+        file_name = f"{name}_{output}.pkl"
+        path = os.path.join(cache_dir, file_name)
+        df.to_pickle(path + ".tmp", compression=None)
+        os.replace(path + ".tmp", path)
+        files[output] = file_name
+
+    path_entry = cache_entry(name)
+    with open(path_entry + ".tmp", "w", encoding="utf-8") as file:
+        json.dump({"fingerprint": fingerprint, "outputs": files}, file, indent=2)
+    os.replace(path_entry + ".tmp", path_entry)
+
+
+def required_stages(selected):
+    needed = set(selected)
+    for name in reversed(stages):
+        if name in needed:
+            needed.update(inputs[name])
+    return [name for name in stages if name in needed]
+
+
+def run_stage(name, results, fingerprints, options):
+    fingerprinter = fingerprinters.get(name)
+    fingerprint = fingerprinter(fingerprints) if fingerprinter else None
+    fingerprints[name] = fingerprint
+
+    if fingerprint and options["use_cache"]:
+        cached = load_cached(name, fingerprint)
+        if cached is not None:
+            return cached, "cache"
+
+    outputs = runners[name](results, options)
+    if fingerprint:
+        save_cached(name, fingerprint, outputs)
+    return outputs, "executada"
+
+
+def run_pipeline(
+    selected=None, use_cache=True, write_files=False, swap=False, queries=False
+):
+    options = {
+        "use_cache": use_cache,
+        "write_files": write_files,
+        "swap": swap,
+        "queries": queries,
+    }
+    os.makedirs("./files", exist_ok=True)
+
+    results, fingerprints, statuses = {}, {}, {}
+    with run_report("pipeline"):
+        for name in required_stages(selected or stages):
+            print(f"\n== Etapa {name} ==")
+            started = time.perf_counter()
+            with step(f"stage:{name}"):
+                results[name], statuses[name] = run_stage(
+                    name, results, fingerprints, options
+                )
+                if write_files and name in writers:
+                    writers[name](results[name])
+            elapsed = time.perf_counter() - started
+            print(f"Etapa {name}: {statuses[name]} em {elapsed:.1f}s")
+
+    return results, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Roda download, consolidação, validação e carga em um único "
+        "processo, passando os DataFrames em memória entre as etapas."
+    )
+    parser.add_argument("--stages", default=",".join(stages))
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--write-files", action="store_true")
+    parser.add_argument(
+        "--swap", action="store_true", default=os.getenv("ETAPA3_SWAP", "0") == "1"
+    )
+    parser.add_argument("--queries", action="store_true")
+    args = parser.parse_args()
+
+    selected = [name.strip() for name in args.stages.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in stages]
+    if unknown:
+        parser.error(f"etapas desconhecidas: {', '.join(unknown)}")
+
+    run_pipeline(
+        selected,
+        use_cache=not args.force,
+        write_files=args.write_files,
+        swap=args.swap,
+        queries=args.queries,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
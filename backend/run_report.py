@@ -0,0 +1,271 @@
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from dotenv import load_dotenv
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+load_dotenv()
+
+report_enabled = os.getenv("ETL_REPORT", "1") == "1"
+report_dir = os.getenv("ETL_REPORT_DIR", "./files/relatorios")
+profile_stage = os.getenv("ETL_PROFILE", "")
+config_prefixes = ("ETAPA", "ETL_", "CSV_ENGINE", "BULK_LOAD_", "DOWNLOAD_")
+
+current = None
+
+
+def etl_config():
+    return {
+        key: value
+        for key, value in sorted(os.environ.items())
+        if key.startswith(config_prefixes)
+    }
+
+
+def peak_rss_mb(children=False):
+    if resource is not None:
+        who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+        unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+        return resource.getrusage(who).ru_maxrss / unit
+    if psutil is not None and not children:
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)
+    return None
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm", "rb") as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    return None
+
+
+def round_mb(value):
+    return None if value is None else round(value, 1)
+
+
+def max_mb(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def io_counters():
+    try:
+        with open("/proc/self/io", "rb") as file:
+            fields = dict(line.split(b": ") for line in file.read().splitlines())
+        return int(fields[b"rchar"]), int(fields[b"wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class Step:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_rss_mb = None
+        self.rss_growth_mb = None
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.rows_in += other.rows_in
+        self.rows_out += other.rows_out
+        self.bytes_read += other.bytes_read
+        self.bytes_written += other.bytes_written
+        self.peak_rss_mb = max_mb(self.peak_rss_mb, other.peak_rss_mb)
+        self.rss_growth_mb = max_mb(self.rss_growth_mb, other.rss_growth_mb)
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "wall_seconds": round(self.wall_seconds, 6),
+            "cpu_seconds": round(self.cpu_seconds, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_rss_mb": round_mb(self.peak_rss_mb),
+            "rss_growth_mb": round_mb(self.rss_growth_mb),
+        }
+
+
+class RunReport:
+    def __init__(self, stage):
+        self.stage = stage
+        self.steps = {}
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.result = None
+
+    def step(self, name):
+        with self.lock:
+            return self.steps.setdefault(name, Step(name))
+
+    def merge(self, steps):
+        for name, other in steps.items():
+            record = self.step(name)
+            with self.lock:
+                record.merge(other)
+
+    def finish(self, wall_seconds, cpu_seconds, status, error=None):
+        children = os.times()
+        self.result = {
+            "stage": self.stage,
+            "status": status,
+            "error": error,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "wall_seconds": round(wall_seconds, 6),
+            "cpu_seconds": round(cpu_seconds, 6),
+            "workers_cpu_seconds": round(
+                children.children_user + children.children_system, 6
+            ),
+            "peak_rss_mb": round_mb(peak_rss_mb()),
+            "workers_peak_rss_mb": round_mb(peak_rss_mb(children=True)),
+            "config": etl_config(),
+            "steps": {name: step.to_dict() for name, step in self.steps.items()},
+        }
+        return self.result
+
+    def path(self, extension):
+        timestamp = self.started_at.strftime("%Y%m%d-%H%M%S")
+        name = f"{self.stage}_{timestamp}_{os.getpid()}{extension}"
+        return os.path.join(report_dir, name)
+
+
+@contextmanager
+def step(name, rows_in=0):
+    if current is None:
+        yield Step(name)
+        return
+
+    report = current
+    record = report.step(name)
+    io_start = io_counters()
+    rss_start, high_water = current_rss_mb(), peak_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        io_end = io_counters()
+        rss_end = current_rss_mb()
+        peak = max_mb(rss_start, rss_end)
+        high_water_end = peak_rss_mb()
+        if high_water is not None and high_water_end > high_water:
+            peak = max_mb(peak, high_water_end)
+        with report.lock:
+            record.calls += 1
+            record.wall_seconds += wall
+            record.cpu_seconds += cpu
+            record.rows_in += rows_in
+            if io_start and io_end:
+                record.bytes_read += io_end[0] - io_start[0]
+                record.bytes_written += io_end[1] - io_start[1]
+            record.peak_rss_mb = max_mb(record.peak_rss_mb, peak)
+            if rss_start is not None and rss_end is not None:
+                growth = rss_end - rss_start
+                record.rss_growth_mb = max_mb(record.rss_growth_mb, growth)
+
+
+def timed(name, frames):
+    frames = iter(frames)
+    while True:
+        with step(name) as record:
+            df = next(frames, None)
+            if df is not None:
+                record.rows_out += len(df)
+        if df is None:
+            return
+        yield df
+
+
+def collect_steps(function, *args, **kwargs):
+    global current
+
+    report = RunReport("worker")
+    previous, current = current, report
+    try:
+        return function(*args, **kwargs), report.steps
+    finally:
+        current = previous
+
+
+def merge_steps(steps):
+    if current is not None:
+        current.merge(steps)
+
+
+@contextmanager
+def run_report(stage):
+    global current
+
+    report = RunReport(stage)
+    previous, current = current, report
+    profiler = cProfile.Profile() if profile_stage == stage else None
+    status, error = "ok", None
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        if profiler:
+            profiler.enable()
+        yield report
+    except BaseException as err:
+        status, error = "erro", repr(err)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        current = previous
+        result = report.finish(
+            time.perf_counter() - wall_start,
+            time.process_time() - cpu_start,
+            status,
+            error,
+        )
+        write_report(report, result, profiler)
+
+
+def write_report(report, result, profiler=None):
+    if not report_enabled and not profiler:
+        return
+
+    try:
+        os.makedirs(report_dir, exist_ok=True)
+        if report_enabled:
+            path_report = report.path(".json")
+            with open(path_report, "w", encoding="utf-8") as file:
+                json.dump(result, file, indent=2, ensure_ascii=False)
+            print(f"Relatório de execução salvo em {path_report}")
+
+        if profiler:
+            path_profile = report.path(".prof")
+            profiler.dump_stats(path_profile)
+            print(f"Perfil (cProfile) salvo em {path_profile}")
+    except OSError as err:
+        print(f"Erro ao salvar o relatório de execução: {err}")
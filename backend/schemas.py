@@ -0,0 +1,93 @@
+from datetime import date
+from pydantic import BaseModel, ConfigDict
+
+
+class Schema(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+
+class OperadoraOut(Schema):
+    registro_ans: str
+    cnpj: str
+    razao_social: str
+    nome_fantasia: str | None
+    modalidade: str | None
+    uf: str | None
+    cidade: str | None
+    data_registro_ans: date | None
+
+
+class DespesaOut(Schema):
+    id: int
+    registro_ans: str
+    trimestre: int
+    ano: int
+    valor_despesas: float
+    descricao: str | None
+
+
+class DespesaExportOut(Schema):
+    id: int
+    registro_ans: str
+    cnpj: str
+    razao_social: str
+    uf: str | None
+    ano: int
+    trimestre: int
+    valor_despesas: float
+    descricao: str | None
+
+
+class SugestaoOut(Schema):
+    registro_ans: str
+    razao_social: str
+    cnpj: str
+
+
+class OperadorasPage(Schema):
+    operators: list[OperadoraOut]
+    total: int | None
+    page: int
+    limit: int
+    total_pages: int | None
+    next_cursor: str | None
+
+
+class TrimestreOut(Schema):
+    ano: int
+    trimestre: int
+    total: float
+
+
+class GraficoOut(Schema):
+    chart: list[TrimestreOut]
+
+
+class DespesasPage(Schema):
+    items: list[DespesaOut]
+    page: int
+    limit: int
+    total: int
+
+
+class VisaoGeralOut(Schema):
+    operator: list[OperadoraOut]
+    despesas: DespesasPage
+    chart: list[TrimestreOut]
+
+
+class TopOperadoraOut(Schema):
+    razao_social: str
+    total: float
+
+
+class DistribuicaoUFOut(Schema):
+    uf: str | None
+    despesas: float
+
+
+class EstatisticasOut(Schema):
+    total_geral: float
+    media_geral: float
+    top_5_operadoras: list[TopOperadoraOut]
+    distribuicao_uf: list[DistribuicaoUFOut]
@@ -1,5 +1,13 @@
 import requests
 import os
+import json
+import re
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from run_report import run_report, step
+
+load_dotenv()
 
 base_url_demoContabeis = (
     "https://dadosabertos.ans.gov.br/FTP/PDA/demonstracoes_contabeis/2025/"
@@ -11,54 +19,183 @@ base_url_cadop = (
 year = "2025"
 trimesters = ["1T", "2T", "3T"]
 
+assets_dir = "./assets"
+manifest_name = "manifest_downloads.json"
+max_workers = int(os.getenv("DOWNLOAD_MAX_WORKERS", "4"))
 
-def download_files_fromDemoContabeis():
-    for trimester in trimesters:
-        file_name = f"{trimester}{year}.zip"
-        url_download = f"{base_url_demoContabeis}/{file_name}"
-        path_join = os.path.join("./assets", file_name)
 
-        try:
-            response = requests.get(url_download, stream=True, timeout=30)
+def file_checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
 
-            if response.status_code == 200:
-                with open(path_join, "wb") as file:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        file.write(chunk)
-                print(f"Sucesso: {file_name} salvo em {path_join}")
-            else:
-                print(f"Não encontrado (Erro {response.status_code}): {file_name}")
-        except Exception as err:
-            print(f"Erro de conexão ao tentar baixar {file_name}: {err}")
 
+def load_manifest():
+    path_manifest = os.path.join(assets_dir, manifest_name)
+    if not os.path.exists(path_manifest):
+        return {}
 
-def download_files_fromCadop():
-    file_name = "Relatorio_cadop.csv"
-    url_download = f"{base_url_cadop}{file_name}"
-    path_join = os.path.join("./assets", file_name)
+    try:
+        with open(path_manifest, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        print("Manifesto de downloads ilegível, todos os arquivos serão baixados.")
+        return {}
+
+
+def save_manifest(manifest):
+    path_manifest = os.path.join(assets_dir, manifest_name)
+    path_tmp = path_manifest + ".tmp"
+    with open(path_tmp, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(path_tmp, path_manifest)
+
+
+def read_partial_validator(path_meta):
+    try:
+        with open(path_meta, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def range_start(content_range):
+    match = re.match(r"bytes (\d+)-\d+/(?:\d+|\*)$", (content_range or "").strip())
+    return int(match.group(1)) if match else None
+
+
+def download_file(url_download, file_name, entry=None):
+    path_join = os.path.join(assets_dir, file_name)
+    path_part = path_join + ".part"
+    path_meta = path_part + ".json"
+    entry = entry or {}
+
+    headers = {}
+    resume_from = 0
+    partial_validator = {}
+
+    if os.path.exists(path_part):
+        partial_validator = read_partial_validator(path_meta)
+        validator = partial_validator.get("etag") or partial_validator.get(
+            "last_modified"
+        )
+        if validator:
+            resume_from = os.path.getsize(path_part)
+            headers["Range"] = f"bytes={resume_from}-"
+            headers["If-Range"] = validator
+    elif os.path.exists(path_join):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
 
     try:
-        response = requests.get(url_download, stream=True, timeout=30)
+        with requests.get(
+            url_download, headers=headers, stream=True, timeout=30
+        ) as response:
+            if response.status_code == 304:
+                print(f"Inalterado: {file_name}")
+                return "inalterado", entry
+
+            if response.status_code == 416 and resume_from:
+                os.remove(path_part)
+                return download_file(url_download, file_name, entry)
+
+            if response.status_code not in (200, 206):
+                print(f"Não encontrado (Erro {response.status_code}): {file_name}")
+                return "erro", entry
 
-        if response.status_code == 200:
-            with open(path_join, "wb") as file:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+
+            if response.status_code == 206:
+                if range_start(response.headers.get("Content-Range")) != resume_from:
+                    print(f"Intervalo inesperado, reiniciando o download: {file_name}")
+                    response.close()
+                    os.remove(path_part)
+                    return download_file(url_download, file_name, entry)
+                mode = "ab"
+                print(f"Retomando: {file_name} a partir de {resume_from} bytes")
+            else:
+                mode = "wb"
+                partial_validator = {"etag": etag, "last_modified": last_modified}
+                with open(path_meta, "w", encoding="utf-8") as file:
+                    json.dump(partial_validator, file)
+
+            with open(path_part, mode) as file:
                 for chunk in response.iter_content(chunk_size=8192):
                     file.write(chunk)
-            print(f"Sucesso: {file_name} salvo em {path_join}")
-        else:
-            print(f"Não encontrado (Erro {response.status_code}): {file_name}")
     except Exception as err:
         print(f"Erro de conexão ao tentar baixar {file_name}: {err}")
+        return "erro", entry
+
+    os.replace(path_part, path_join)
+    if os.path.exists(path_meta):
+        os.remove(path_meta)
+
+    new_entry = {
+        "url": url_download,
+        "etag": partial_validator.get("etag"),
+        "last_modified": partial_validator.get("last_modified"),
+        "sha256": file_checksum(path_join),
+        "size": os.path.getsize(path_join),
+    }
+    print(f"Sucesso: {file_name} salvo em {path_join}")
+    return "baixado", new_entry
 
 
-def download_files():
-    if not os.path.exists("./assets"):
-        os.makedirs("./assets")
+def download_all(files, workers=None):
+    if not os.path.exists(assets_dir):
+        os.makedirs(assets_dir)
         print("Pasta de downloads criada")
 
-    download_files_fromDemoContabeis()
-    download_files_fromCadop()
+    manifest = load_manifest()
+    workers = workers or max_workers
+
+    with step("download"), ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            file_name: executor.submit(
+                download_file, url_download, file_name, manifest.get(file_name)
+            )
+            for url_download, file_name in files
+        }
+        results = {}
+        for file_name, future in futures.items():
+            status, entry = future.result()
+            results[file_name] = status
+            if entry:
+                manifest[file_name] = entry
+
+    save_manifest(manifest)
+    return results
+
+
+def files_fromDemoContabeis():
+    return [
+        (f"{base_url_demoContabeis}{trimester}{year}.zip", f"{trimester}{year}.zip")
+        for trimester in trimesters
+    ]
+
+
+def files_fromCadop():
+    file_name = "Relatorio_cadop.csv"
+    return [(f"{base_url_cadop}{file_name}", file_name)]
+
+
+def download_files_fromDemoContabeis(workers=None):
+    return download_all(files_fromDemoContabeis(), workers)
+
+
+def download_files_fromCadop():
+    return download_all(files_fromCadop(), 1)
+
+
+def download_files(workers=None):
+    return download_all(files_fromDemoContabeis() + files_fromCadop(), workers)
 
 
 if __name__ == "__main__":
-    download_files()
+    with run_report("download"):
+        download_files()
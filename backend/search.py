@@ -0,0 +1,115 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize(value):
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join(char for char in value if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^0-9A-Z]+", " ", value.upper()).split())
+
+
+def trigrams(value):
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+def word_starts(value):
+    return {value[i : i + 2] for i in range(len(value) - 1) if value[i] == " "}
+
+
+def query_tokens(query):
+    normalized = normalize(query)
+    if normalized and not re.search(r"[A-Z]", normalized):
+        return [normalized.replace(" ", "")]
+    return normalized.split()
+
+
+class SearchIndex:
+    def __init__(self, rows, cache_size=256):
+        self.rows = sorted(rows, key=lambda row: (row[2], row[0]))
+        self.cache_size = cache_size
+        self.results = OrderedDict()
+        self.lock = threading.Lock()
+        self.names = []
+        self.keys = []
+        self.postings = {}
+
+        for position, (registro_ans, cnpj, razao_social, nome_fantasia) in enumerate(
+            self.rows
+        ):
+            name = normalize(razao_social)
+            key = " " + " ".join(
+                part for part in (name, normalize(nome_fantasia), cnpj or "") if part
+            )
+            self.names.append(name)
+            self.keys.append(key)
+            for gram in trigrams(key) | word_starts(key):
+                self.postings.setdefault(gram, set()).add(position)
+
+    def candidates(self, needles):
+        postings = []
+        for needle in needles:
+            for gram in trigrams(needle) or {needle}:
+                if gram not in self.postings:
+                    return set()
+                postings.append(self.postings[gram])
+        postings.sort(key=len)
+        return postings[0].intersection(*postings[1:])
+
+    def rank(self, position, phrase, first):
+        name = self.names[position]
+        cnpj = self.rows[position][1]
+        if phrase in (name, cnpj):
+            return 0
+        if name.startswith(phrase) or (cnpj or "").startswith(phrase):
+            return 1
+        if f" {phrase}" in f" {name}":
+            return 2
+        if f" {first}" in f" {name}":
+            return 3
+        return 4
+
+    def matches(self, tokens):
+        phrase = " ".join(tokens)
+        with self.lock:
+            if phrase in self.results:
+                self.results.move_to_end(phrase)
+                return self.results[phrase]
+
+        needles = [token if len(token) > 2 else f" {token}" for token in tokens]
+        ranked = sorted(
+            (self.rank(position, phrase, tokens[0]), position)
+            for position in self.candidates(needles)
+            if all(needle in self.keys[position] for needle in needles)
+        )
+        result = [self.rows[position] for _, position in ranked]
+        with self.lock:
+            self.results[phrase] = result
+            if len(self.results) > self.cache_size:
+                self.results.popitem(last=False)
+        return result
+
+    def search(self, query, limit=None):
+        tokens = query_tokens(query)
+        if not tokens:
+            return []
+        return self.matches(tokens)[:limit]
+
+
+class OperatorSearch:
+    def __init__(self, loader):
+        self.loader = loader
+        self.index = None
+        self.version = None
+
+    async def get(self, version, session):
+        if self.index is None or version != self.version:
+            index = SearchIndex(await self.loader(session))
+            self.index, self.version = index, version
+        return self.index
+
+    def clear(self):
+        self.index = None
@@ -0,0 +1,228 @@
+import argparse
+import csv
+import json
+import os
+import zipfile
+import numpy as np
+import pandas as pd
+from etapa2_validatingData import check_digit, firstDigit, secondDigit
+
+ROWS_PER_QUARTER = 700_000
+OPERATORS_PER_QUARTER = 1_100
+CHUNK_OPERATORS = 200
+
+demonstracoes_columns = [
+    "DATA",
+    "REG_ANS",
+    "CD_CONTA_CONTABIL",
+    "DESCRICAO",
+    "VL_SALDO_INICIAL",
+    "VL_SALDO_FINAL",
+]
+expense_accounts = [
+    ("41", "EVENTOS/ SINISTROS CONHECIDOS OU AVISADOS DE ASSISTÊNCIA A SAÚDE"),
+    ("411", "EVENTOS INDENIZÁVEIS LÍQUIDOS / SINISTROS RETIDOS"),
+    ("4111", "Sinistros a liquidar"),
+    ("4112", "EVENTOS/ SINISTROS CONHECIDOS - CONSULTAS MÉDICAS"),
+    ("4113", "EVENTOS/ SINISTROS CONHECIDOS - EXAMES"),
+    ("4114", "EVENTOS/ SINISTROS CONHECIDOS - INTERNAÇÕES"),
+]
+other_accounts = [
+    ("1", "ATIVO"),
+    ("12", "ATIVO CIRCULANTE"),
+    ("121", "DISPONÍVEL"),
+    ("2", "PASSIVO"),
+    ("21", "PASSIVO CIRCULANTE"),
+    ("211", "PROVISÕES TÉCNICAS DE OPERAÇÕES DE ASSISTÊNCIA À SAÚDE"),
+    ("3", "RECEITAS"),
+    ("31", "CONTRAPRESTAÇÕES EFETIVAS DE PLANO DE ASSISTÊNCIA À SAÚDE"),
+    ("311", "RECEITAS COM OPERAÇÕES DE ASSISTÊNCIA À SAÚDE"),
+    ("46", "DESPESAS ADMINISTRATIVAS"),
+    ("461", "DESPESAS COM PESSOAL"),
+    ("47", "DESPESAS FINANCEIRAS"),
+]
+modalidades = [
+    "Cooperativa Médica",
+    "Medicina de Grupo",
+    "Seguradora Especializada em Saúde",
+    "Autogestão",
+    "Filantropia",
+    "Odontologia de Grupo",
+]
+ufs = ["SP", "RJ", "MG", "RS", "PR", "SC", "BA", "PE", "CE", "GO", "DF", "ES"]
+cidades = ["São Paulo", "Rio de Janeiro", "Belo Horizonte", "Porto Alegre"]
+
+
+def quarter_names(quarters, year=2025, quarter=3):
+    names = []
+    for _ in range(quarters):
+        names.append((year, quarter))
+        year, quarter = (year, quarter - 1) if quarter > 1 else (year - 1, 4)
+    return names[::-1]
+
+
+def with_check_digits(bases):
+    digits = np.frombuffer("".join(bases).encode("ascii"), dtype=np.uint8)
+    digits = digits.reshape(-1, 12).astype(np.int64) - ord("0")
+    digit1 = check_digit(digits, firstDigit)
+    digits = np.column_stack([digits, digit1])
+    digit2 = check_digit(digits, secondDigit)
+    digits = np.column_stack([digits, digit2])
+    return ["".join(map(str, row)) for row in digits]
+
+
+def operators_frame(count, rng, invalid_cnpj_rate, missing_cadop_rate):
+    registros = np.sort(rng.choice(np.arange(300_000, 1_000_000), count, replace=False))
+    bases = [f"{base:08d}0001" for base in rng.integers(1, 99_999_999, count)]
+    cnpjs = np.array(with_check_digits(bases), dtype=object)
+
+    invalid = rng.random(count) < invalid_cnpj_rate
+    cnpjs[invalid] = [
+        cnpj[:12] + f"{(int(cnpj[12:]) + 1) % 100:02d}" for cnpj in cnpjs[invalid]
+    ]
+
+    names = [f"OPERADORA SAÚDE {index} LTDA" for index in range(count)]
+    return pd.DataFrame(
+        {
+            "REGISTRO_OPERADORA": [f"{registro:06d}" for registro in registros],
+            "CNPJ": cnpjs,
+            "Razao_Social": names,
+            "Nome_Fantasia": [f"SAÚDE {index}" for index in range(count)],
+            "Modalidade": rng.choice(modalidades, count),
+            "Logradouro": "RUA DAS OPERADORAS",
+            "Numero": rng.integers(1, 3000, count),
+            "Bairro": "CENTRO",
+            "Cidade": rng.choice(cidades, count),
+            "UF": rng.choice(ufs, count),
+            "CEP": rng.integers(1_000_000, 99_999_999, count).astype(str),
+            "Data_Registro_ANS": pd.to_datetime(
+                rng.integers(0, 9_000, count), unit="D", origin="2000-01-01"
+            ).strftime("%Y-%m-%d"),
+            "cnpj_invalido": invalid,
+            "fora_cadop": rng.random(count) < missing_cadop_rate,
+        }
+    )
+
+
+def accounts_plan(rows_per_operator, expense_rate):
+    expenses = max(1, round(rows_per_operator * expense_rate))
+    plan = [expense_accounts[i % len(expense_accounts)] for i in range(expenses)]
+    plan += [
+        other_accounts[i % len(other_accounts)]
+        for i in range(max(0, rows_per_operator - expenses))
+    ]
+    codes = [f"{code}{index:04d}" for index, (code, _) in enumerate(plan)]
+    descriptions = [description for _, description in plan]
+    return np.array(codes, dtype=object), np.array(descriptions, dtype=object)
+
+
+def quarter_chunks(registros, year, quarter, rng, codes, descriptions, negative_rate):
+    date = f"{year}-{3 * (quarter - 1) + 1:02d}-01"
+    for start in range(0, len(registros), CHUNK_OPERATORS):
+        chunk = registros[start : start + CHUNK_OPERATORS]
+        rows = len(chunk) * len(codes)
+        final = np.round(rng.lognormal(11, 2, rows), 2)
+        final[rng.random(rows) < negative_rate] *= -1
+        initial = np.round(final * rng.uniform(0.5, 1.0, rows), 2)
+        yield pd.DataFrame(
+            {
+                "DATA": date,
+                "REG_ANS": np.repeat(chunk, len(codes)),
+                "CD_CONTA_CONTABIL": np.tile(codes, len(chunk)),
+                "DESCRICAO": np.tile(descriptions, len(chunk)),
+                "VL_SALDO_INICIAL": initial,
+                "VL_SALDO_FINAL": final,
+            }
+        )
+
+
+def write_quarter(path_zip, member, chunks, encoding):
+    rows = 0
+    header = ";".join(f'"{column}"' for column in demonstracoes_columns) + "\n"
+    with zipfile.ZipFile(
+        path_zip, "w", zipfile.ZIP_DEFLATED, compresslevel=1
+    ) as zip_ref:
+        with zip_ref.open(member, "w", force_zip64=True) as file:
+            file.write(header.encode(encoding))
+            for df in chunks:
+                content = df.to_csv(
+                    sep=";",
+                    decimal=",",
+                    header=False,
+                    index=False,
+                    quoting=csv.QUOTE_ALL,
+                    float_format="%.2f",
+                )
+                file.write(content.encode(encoding))
+                rows += len(df)
+    return rows
+
+
+def generate(
+    path="./assets",
+    scale=1.0,
+    quarters=3,
+    seed=42,
+    encodings=("utf-8", "latin1"),
+    invalid_cnpj_rate=0.03,
+    missing_cadop_rate=0.02,
+    negative_rate=0.005,
+    expense_rate=0.15,
+):
+    os.makedirs(path, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    operators = max(5, round(OPERATORS_PER_QUARTER * scale))
+    rows_per_operator = max(2, round(ROWS_PER_QUARTER * scale / operators))
+    df_operators = operators_frame(
+        operators, rng, invalid_cnpj_rate, missing_cadop_rate
+    )
+    codes, descriptions = accounts_plan(rows_per_operator, expense_rate)
+    registros = df_operators["REGISTRO_OPERADORA"].to_numpy()
+
+    summary = {
+        "scale": scale,
+        "seed": seed,
+        "operators": operators,
+        "invalid_cnpjs": int(df_operators["cnpj_invalido"].sum()),
+        "missing_cadop": int(df_operators["fora_cadop"].sum()),
+        "files": {},
+        "rows": 0,
+    }
+
+    for index, (year, quarter) in enumerate(quarter_names(quarters)):
+        name = f"{quarter}T{year}"
+        encoding = encodings[index % len(encodings)]
+        chunks = quarter_chunks(
+            registros, year, quarter, rng, codes, descriptions, negative_rate
+        )
+        rows = write_quarter(
+            os.path.join(path, f"{name}.zip"), f"{name}.csv", chunks, encoding
+        )
+        summary["files"][f"{name}.zip"] = {"rows": rows, "encoding": encoding}
+        summary["rows"] += rows
+
+    df_cadop = df_operators[~df_operators["fora_cadop"]].drop(
+        columns=["cnpj_invalido", "fora_cadop"]
+    )
+    df_cadop.to_csv(
+        os.path.join(path, "Relatorio_cadop.csv"),
+        sep=";",
+        index=False,
+        encoding="utf-8",
+    )
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Gera ZIPs de demonstrações contábeis e um CADOP sintéticos."
+    )
+    parser.add_argument("--path", default="./assets")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--quarters", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    summary = generate(args.path, args.scale, args.quarters, args.seed)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
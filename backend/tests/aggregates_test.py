@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+from aggregates import AggregateStore, quarter_totals
+from etapa2_validatingData import aggregate
+
+
+@pytest.fixture
+def expenses():
+    rng = np.random.default_rng(7)
+    registros = rng.integers(0, 40, 5000)
+    return pd.DataFrame(
+        {
+            "RegistroANS": [f"{registro:06d}" for registro in registros],
+            "RazaoSocial": [f"OPERADORA {registro}" for registro in registros],
+            "UF": np.array(["SP", "RJ", "MG"])[registros % 3],
+            "Trimestre": pd.array(rng.integers(1, 5, 5000), dtype="Int64"),
+            "Ano": pd.array(2024 + rng.integers(0, 2, 5000), dtype="Int64"),
+            "ValorDespesas": np.round(rng.uniform(0, 1e6, 5000), 2),
+        }
+    )
+
+
+def groupby_aggregate(df_clean):
+    df_sum = (
+        df_clean.groupby(["RazaoSocial", "UF", "Trimestre"])["ValorDespesas"]
+        .sum()
+        .reset_index()
+    )
+    return (
+        df_sum.groupby(["RazaoSocial", "UF"])["ValorDespesas"]
+        .agg(TotalExpensives="sum", TrimestralMean="mean", Deviation="std")
+        .fillna(0)
+    )
+
+
+def test_aggregate_matches_groupby_to_the_cent(expenses):
+    expected = groupby_aggregate(expenses)
+    result = aggregate(expenses).set_index(["RazaoSocial", "UF"]).loc[expected.index]
+
+    for column in ["TotalExpensives", "TrimestralMean", "Deviation"]:
+        assert np.abs(result[column] - expected[column]).max() <= 0.005 + 1e-6
+    assert list(result.columns) == ["TotalExpensives", "TrimestralMean", "Deviation"]
+    assert aggregate(expenses)["TotalExpensives"].is_monotonic_decreasing
+
+
+def test_folding_quarters_matches_full_recompute(expenses):
+    store = AggregateStore()
+    for ano, df_year in expenses.groupby("Ano"):
+        for trimestre, df_quarter in df_year.groupby("Trimestre"):
+            store.replace(f"{trimestre}T{ano}", "v1", quarter_totals(df_quarter))
+
+    pd.testing.assert_frame_equal(store.to_frame(), aggregate(expenses))
+
+
+def test_replacing_and_removing_inputs_matches_full_recompute(expenses, tmp_path):
+    first, second = expenses.iloc[:3000], expenses.iloc[3000:]
+    store = AggregateStore()
+    store.replace("a", "v1", quarter_totals(first))
+    store.replace("b", "v1", quarter_totals(second))
+
+    changed = second.assign(ValorDespesas=second["ValorDespesas"] * 2)
+    store.replace("b", "v2", quarter_totals(changed))
+    path = str(tmp_path / "estado.json")
+    store.save(path)
+    store = AggregateStore.load(path)
+
+    assert store.contains("b", "v2") and not store.contains("b", "v1")
+    pd.testing.assert_frame_equal(
+        store.to_frame(), aggregate(pd.concat([first, changed]))
+    )
+
+    store.remove("b")
+    pd.testing.assert_frame_equal(store.to_frame(), aggregate(first))
+    store.remove("a")
+    assert store.operators == {}
+
+
+def test_mean_is_rounded_from_exact_cents():
+    df = pd.DataFrame(
+        {
+            "RegistroANS": ["000001"] * 2,
+            "RazaoSocial": ["OPERADORA A"] * 2,
+            "UF": ["SP"] * 2,
+            "Trimestre": [1, 2],
+            "ValorDespesas": [0.01, 0.04],
+        }
+    )
+
+    row = aggregate(df).iloc[0]
+    assert row["TotalExpensives"] == 0.05
+    assert row["TrimestralMean"] == 0.02
+    assert row["Deviation"] == 0.02
@@ -1,11 +1,16 @@
 import pandas as pd
+import pytest
 from fastapi.testclient import TestClient
 from main import app
 
-client = TestClient(app)
 
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
 
-def test_api_list_operadoras():
+
+def test_api_list_operadoras(client):
     response = client.get("/api/operadoras")
     assert response.status_code == 200
     data = response.json()
@@ -14,7 +19,7 @@ def test_api_list_operadoras():
     assert data["limit"] == 10
 
 
-def test_api_estatisticas():
+def test_api_estatisticas(client):
     response = client.get("/api/estatisticas")
     assert response.status_code == 200
     data = response.json()
@@ -22,7 +27,7 @@ def test_api_estatisticas():
     assert "distribuicao_uf" in data
 
 
-def test_api_operadora_nao_encontrada():
+def test_api_operadora_nao_encontrada(client):
     response = client.get("/api/operadoras/00000000000000")
     assert response.status_code == 404
     assert response.json()["detail"] == "Operadora não encontrada"
@@ -0,0 +1,53 @@
+import json
+import benchmark
+
+
+def results(seconds, rss):
+    return {
+        "scale": 0.01,
+        "quarters": 1,
+        "config": {},
+        "stages": {"etapa1": {"seconds": seconds, "peak_rss_mb": rss}},
+    }
+
+
+def test_compare_flags_regressions_above_tolerance(capsys):
+    baseline = results(1.0, 100.0)
+
+    assert benchmark.compare(results(1.05, 100.0), baseline, 0.1) == []
+    assert benchmark.compare(results(1.2, 130.0), baseline, 0.1) == [
+        "etapa1.seconds",
+        "etapa1.peak_rss_mb",
+    ]
+    assert "REGRESSÃO" in capsys.readouterr().out
+
+
+def test_benchmark_runs_stages_and_saves_baseline(tmp_path, monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    baseline = tmp_path / "baseline.json"
+    monkeypatch.setattr(
+        "sys.argv",
+        [
+            "benchmark.py",
+            "--scale",
+            "0.01",
+            "--quarters",
+            "1",
+            "--stages",
+            "etapa1,etapa2",
+            "--workdir",
+            str(tmp_path / "work"),
+            "--baseline",
+            str(baseline),
+            "--save-baseline",
+        ],
+    )
+
+    assert benchmark.main() == 0
+    saved = json.loads(baseline.read_text(encoding="utf-8"))["0.01x1t"]
+    assert set(saved["stages"]) == {"etapa1", "etapa2"}
+    etapa1, etapa2 = saved["stages"]["etapa1"], saved["stages"]["etapa2"]
+    synthetic = json.loads((tmp_path / "work" / "synthetic.json").read_text())
+    assert etapa1["rows"] == synthetic["rows"]
+    assert 0 < etapa2["rows"] < etapa1["rows"]
+    assert etapa1["peak_rss_mb"] > 0 and etapa1["rows_per_second"] > 0
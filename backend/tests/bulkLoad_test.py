@@ -0,0 +1,74 @@
+import pandas as pd
+import pytest
+from sqlalchemy import Column, Date, Integer, MetaData, Numeric, String, Table, text
+from bulk_load import copy_table
+
+
+@pytest.fixture
+def despesas(engine):
+    table = Table(
+        "despesas",
+        MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("registro_ans", String(6), nullable=False),
+        Column("trimestre", Integer, nullable=False),
+        Column("valor_despesas", Numeric(30, 2), nullable=False),
+        Column("descricao", String),
+        Column("data", Date),
+    )
+    table.create(engine)
+    return table
+
+
+def expenses(rows):
+    return pd.DataFrame(
+        {
+            "registro_ans": [f"{i:06d}" for i in range(rows)],
+            "trimestre": pd.array([1 + i % 4 for i in range(rows)], dtype="Int64"),
+            "valor_despesas": [i + 0.25 for i in range(rows)],
+            "descricao": ['EVENTOS; "AÇÃO"' if i % 2 else None for i in range(rows)],
+            "data": pd.to_datetime(["2025-01-01"] * (rows - 1) + [None]),
+        }
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_copy_table_keeps_values_and_order(engine, despesas, workers):
+    df = expenses(250)
+
+    with engine.begin() as connection:
+        assert copy_table(connection, despesas, df, workers) == 250
+
+    with engine.connect() as connection:
+        loaded = pd.read_sql(text("SELECT * FROM despesas ORDER BY id"), connection)
+
+    assert loaded["registro_ans"].tolist() == df["registro_ans"].tolist()
+    assert loaded["valor_despesas"].astype(float).tolist() == [
+        i + 0.25 for i in range(250)
+    ]
+    assert loaded["descricao"].isna().tolist()[:2] == [True, False]
+    assert loaded["descricao"][1] == 'EVENTOS; "AÇÃO"'
+    assert loaded["data"].isna().tolist()[-2:] == [False, True]
+
+
+def test_parallel_copy_advances_the_sequence(engine, despesas):
+    with engine.begin() as connection:
+        copy_table(connection, despesas, expenses(100), 3)
+        connection.execute(
+            despesas.insert(),
+            {"registro_ans": "000999", "trimestre": 1, "valor_despesas": 1},
+        )
+
+    with engine.connect() as connection:
+        ids = connection.execute(text("SELECT id FROM despesas ORDER BY id")).scalars()
+        assert list(ids) == list(range(1, 102))
+
+
+def test_copy_table_rolls_back_with_transaction(engine, despesas):
+    with pytest.raises(RuntimeError):
+        with engine.begin() as connection:
+            copy_table(connection, despesas, expenses(10))
+            raise RuntimeError("falha depois da carga")
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM despesas")).scalar() == 0
@@ -0,0 +1,119 @@
+import asyncio
+import cache
+from cache import ResponseCache
+from fastapi.responses import Response
+
+
+def test_lru_evicts_least_recently_used():
+    response_cache = ResponseCache(maxsize=2)
+    response_cache.set("a", 1)
+    response_cache.set("b", 2)
+    response_cache.get("a")
+    response_cache.set("c", 3)
+
+    assert response_cache.get("b") == (False, None)
+    assert response_cache.get("a") == (True, 1)
+    assert response_cache.get("c") == (True, 3)
+    assert response_cache.stats()["evictions"] == 1
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    response_cache = ResponseCache(ttl=30)
+    response_cache.set("a", 1)
+
+    now[0] += 29
+    assert response_cache.get("a") == (True, 1)
+    now[0] += 2
+    assert response_cache.get("a") == (False, None)
+    assert response_cache.stats()["size"] == 0
+
+
+def test_dataset_version_invalidates_once_per_reload():
+    version = [1]
+    calls = []
+    response_cache = ResponseCache(
+        version_loader=lambda: version[0], version_interval=0
+    )
+
+    @response_cache.cached("estatisticas")
+    def statistcs(uf=None):
+        calls.append(uf)
+        return {"versao": version[0], "uf": uf}
+
+    assert statistcs(uf="SP") == {"versao": 1, "uf": "SP"}
+    assert statistcs(uf="SP") == {"versao": 1, "uf": "SP"}
+    assert statistcs(uf="RJ") == {"versao": 1, "uf": "RJ"}
+
+    version[0] = 2
+    assert statistcs(uf="SP") == {"versao": 2, "uf": "SP"}
+    assert statistcs(uf="SP") == {"versao": 2, "uf": "SP"}
+
+    stats = response_cache.stats()
+    assert calls == ["SP", "RJ", "SP"]
+    assert (stats["hits"], stats["misses"]) == (2, 3)
+    assert stats["invalidations"] == 1
+    assert stats["dataset_version"] == 2
+
+
+def test_version_is_checked_at_most_once_per_interval(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    loads = []
+    response_cache = ResponseCache(
+        version_loader=lambda: loads.append(now[0]) or 1, version_interval=2
+    )
+
+    for step in range(5):
+        now[0] = step
+        response_cache.current_version()
+
+    assert loads == [0.0, 2.0, 4.0]
+
+
+def test_cached_coroutine_ignores_session_and_awaits_version():
+    version = [1]
+    calls = []
+
+    async def load_version():
+        return version[0]
+
+    response_cache = ResponseCache(version_loader=load_version, version_interval=0)
+
+    @response_cache.cached("operadora")
+    async def operator(cnpj, session=None):
+        calls.append(cnpj)
+        return {"cnpj": cnpj, "versao": version[0]}
+
+    async def requests():
+        first = await operator(cnpj="1", session=object())
+        second = await operator(cnpj="1", session=object())
+        version[0] = 2
+        third = await operator(cnpj="1", session=object())
+        return first, second, third
+
+    assert asyncio.run(requests()) == (
+        {"cnpj": "1", "versao": 1},
+        {"cnpj": "1", "versao": 1},
+        {"cnpj": "1", "versao": 2},
+    )
+    assert calls == ["1", "1"]
+
+
+def test_cached_response_keeps_serialized_body():
+    calls = []
+    response_cache = ResponseCache()
+
+    @response_cache.cached("despesas")
+    def expenses(cnpj):
+        calls.append(cnpj)
+        return Response(content=b'{"items":[]}', media_type="application/json")
+
+    first = expenses(cnpj="1")
+    second = expenses(cnpj="1")
+
+    assert calls == ["1"]
+    assert first is not second
+    assert second.body == b'{"items":[]}'
+    assert second.media_type == "application/json"
@@ -0,0 +1,90 @@
+import os
+from contextlib import ExitStack
+import pytest
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+
+@pytest.fixture
+def engine():
+    if not os.getenv("DATABASE_URL"):
+        pytest.skip("DATABASE_URL não configurada")
+
+    engine = create_engine(
+        os.getenv("DATABASE_URL"),
+        connect_args={"options": "-csearch_path=teste_etl"},
+    )
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("DROP SCHEMA IF EXISTS teste_etl CASCADE"))
+            connection.execute(text("CREATE SCHEMA teste_etl"))
+    except OperationalError:
+        pytest.skip("PostgreSQL indisponível")
+
+    yield engine
+
+    with engine.begin() as connection:
+        connection.execute(text("DROP SCHEMA teste_etl CASCADE"))
+    engine.dispose()
+
+
+@pytest.fixture
+def async_sessions(engine, monkeypatch):
+    import database
+
+    async_db = database.create_async_db(engine.url, search_path="teste_etl")
+    monkeypatch.setattr(database, "async_db", async_db)
+    monkeypatch.setattr(
+        database,
+        "AsyncSessionLocal",
+        async_sessionmaker(async_db, expire_on_commit=False),
+    )
+    return async_db
+
+
+@pytest.fixture
+def api_client(engine, async_sessions, monkeypatch):
+    import database
+    import etapa3_integratingDB
+    import main
+    from fastapi.testclient import TestClient
+
+    database.Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(main.cache, "version_loader", None)
+    main.cache.clear()
+    main.operator_search.clear()
+
+    def seed(operadoras, despesas=0, registros=None, anos=2, summaries=False):
+        operadoras = list(operadoras)
+        if registros is None:
+            registros = [operadora["registro_ans"] for operadora in operadoras]
+
+        with engine.begin() as connection:
+            connection.execute(insert(database.Operadora), operadoras)
+            if despesas:
+                connection.execute(
+                    text(
+                        """
+                    INSERT INTO despesas (registro_ans, trimestre, ano,
+                                          valor_despesas, descricao)
+                    SELECT (CAST(:registros AS varchar[]))[1 + i % :n],
+                           1 + (i / :n) % 4, 2024 + (i / (4 * :n)) % :anos,
+                           i * 10.5, 'Despesa ' || i
+                    FROM generate_series(1, :despesas) AS i
+                    """
+                    ),
+                    {
+                        "registros": registros,
+                        "n": len(registros),
+                        "anos": anos,
+                        "despesas": despesas,
+                    },
+                )
+            if summaries:
+                etapa3_integratingDB.refresh_summaries(connection)
+
+        return stack.enter_context(TestClient(main.app))
+
+    with ExitStack() as stack:
+        yield seed
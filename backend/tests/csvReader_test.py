@@ -0,0 +1,83 @@
+import io
+import pandas as pd
+import pytest
+import csv_reader
+
+header = '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_FINAL"\n'
+
+
+def write_demonstracoes(path, rows, encoding):
+    lines = [header] + [
+        f'"2025-01-01";"{reg}";"41";"{desc}";"{value}"\n' for reg, desc, value in rows
+    ]
+    path.write_bytes("".join(lines).encode(encoding))
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "encoding, detected",
+    [("utf-8-sig", "utf-8"), ("utf-8", "utf-8"), ("latin1", "latin1")],
+)
+def test_encoding_is_decided_while_reading(tmp_path, encoding, detected):
+    ascii_start = "A;B\n" + "1;2\n" * 400000 + "3;AÇÃO\n"
+    path = tmp_path / "dados.csv"
+    path.write_bytes(ascii_start.encode(encoding))
+
+    with csv_reader.open_csv(str(path)) as file:
+        assert file.header() == ["A", "B"]
+        assert file.read().decode("utf-8") == ascii_start
+        assert file.source_encoding == detected
+
+
+class Trickle(io.BytesIO):
+    def read(self, size=-1):
+        return super().read(3)
+
+
+def test_fallback_keeps_characters_split_between_reads():
+    raw = Trickle("A;B\nÇÃO;1\n".encode("utf-8") + "ç;2\n".encode("latin1"))
+
+    with csv_reader.open_csv(raw) as file:
+        assert file.read().decode("utf-8") == "A;B\nÇÃO;1\nç;2\n"
+        assert file.source_encoding == "latin1"
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "latin1"])
+def test_read_demonstracoes_applies_schema(tmp_path, encoding):
+    rows = [("012345", "EVENTOS INDENIZÁVEIS", "1.234,50"), ("344800", "OUTROS", "-10")]
+    path = write_demonstracoes(tmp_path / "1T2025.csv", rows, encoding)
+
+    df = csv_reader.read_csv(path, csv_reader.schema_demonstracoes)
+
+    assert list(df.columns) == ["DATA", "REG_ANS", "DESCRICAO", "VL_SALDO_FINAL"]
+    assert df["REG_ANS"].tolist() == ["012345", "344800"]
+    assert df["DESCRICAO"].tolist()[0] == "EVENTOS INDENIZÁVEIS"
+    assert df["VL_SALDO_FINAL"].tolist() == [1234.5, -10.0]
+
+
+def test_engines_agree(tmp_path):
+    pytest.importorskip("pyarrow")
+    rows = [("012345", "SINISTROS", "2.000.000,01"), ("000001", "AÇÃO", "")]
+    path = write_demonstracoes(tmp_path / "2T2025.csv", rows, "latin1")
+
+    df_c = csv_reader.read_csv(path, csv_reader.schema_demonstracoes, engine="c")
+    df_arrow = csv_reader.read_csv(
+        path, csv_reader.schema_demonstracoes, engine="pyarrow"
+    )
+
+    pd.testing.assert_frame_equal(df_c, df_arrow)
+
+
+def test_chunks_match_full_read(tmp_path):
+    rows = [(f"{i:06d}", "EVENTOS", f"{i},5") for i in range(25)]
+    path = write_demonstracoes(tmp_path / "3T2025.csv", rows, "utf-8")
+
+    chunks = list(
+        csv_reader.read_csv_chunks(path, csv_reader.schema_demonstracoes, 10)
+    )
+
+    assert len(chunks) == 3
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks, ignore_index=True),
+        csv_reader.read_csv(path, csv_reader.schema_demonstracoes),
+    )
@@ -0,0 +1,136 @@
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import script_download
+
+CONTENT = {
+    "1T2025.zip": b"primeiro trimestre " * 5000,
+    "Relatorio_cadop.csv": b"REGISTRO_OPERADORA;CNPJ\n344800;00366982000130\n",
+}
+
+
+class FakeANSHandler(BaseHTTPRequestHandler):
+    requests_log = []
+    range_from_start = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        file_name = self.path.rsplit("/", 1)[-1]
+        body = CONTENT.get(file_name)
+        FakeANSHandler.requests_log.append((file_name, dict(self.headers)))
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        etag = f'"{len(body)}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == etag:
+            start = int(range_header.split("=")[1].rstrip("-"))
+            if FakeANSHandler.range_from_start:
+                start = 0
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+            body = body[start:]
+        else:
+            self.send_response(200)
+
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def fake_ans(tmp_path, monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeANSHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(script_download, "base_url_demoContabeis", base_url)
+    monkeypatch.setattr(script_download, "base_url_cadop", base_url)
+    monkeypatch.setattr(script_download, "trimesters", ["1T", "2T"])
+    FakeANSHandler.requests_log = []
+    FakeANSHandler.range_from_start = False
+
+    yield tmp_path
+
+    server.shutdown()
+
+
+def test_download_writes_files_and_manifest(fake_ans):
+    results = script_download.download_files()
+
+    assert results == {
+        "1T2025.zip": "baixado",
+        "2T2025.zip": "erro",
+        "Relatorio_cadop.csv": "baixado",
+    }
+    assert (fake_ans / "assets" / "1T2025.zip").read_bytes() == CONTENT["1T2025.zip"]
+
+    manifest = json.loads((fake_ans / "assets" / "manifest_downloads.json").read_text())
+    assert set(manifest) == {"1T2025.zip", "Relatorio_cadop.csv"}
+    assert manifest["1T2025.zip"]["sha256"] == script_download.file_checksum(
+        os.path.join("assets", "1T2025.zip")
+    )
+
+
+def test_download_skips_unchanged_files(fake_ans):
+    script_download.download_files()
+    results = script_download.download_files()
+
+    assert results["1T2025.zip"] == "inalterado"
+    assert results["Relatorio_cadop.csv"] == "inalterado"
+
+
+def test_download_resumes_partial_file(fake_ans):
+    body = CONTENT["1T2025.zip"]
+    os.makedirs("assets")
+    with open("assets/1T2025.zip.part", "wb") as file:
+        file.write(body[:1000])
+    with open("assets/1T2025.zip.part.json", "w") as file:
+        json.dump({"etag": f'"{len(body)}"', "last_modified": None}, file)
+
+    results = script_download.download_files_fromDemoContabeis()
+
+    assert results["1T2025.zip"] == "baixado"
+    assert (fake_ans / "assets" / "1T2025.zip").read_bytes() == body
+    assert not (fake_ans / "assets" / "1T2025.zip.part").exists()
+    sent_headers = [h for name, h in FakeANSHandler.requests_log if name == "1T2025.zip"]
+    assert sent_headers[0]["Range"] == "bytes=1000-"
+
+
+def test_download_restarts_when_range_does_not_match(fake_ans):
+    body = CONTENT["1T2025.zip"]
+    os.makedirs("assets")
+    with open("assets/1T2025.zip.part", "wb") as file:
+        file.write(body[:1000])
+    with open("assets/1T2025.zip.part.json", "w") as file:
+        json.dump({"etag": f'"{len(body)}"', "last_modified": None}, file)
+    FakeANSHandler.range_from_start = True
+
+    results = script_download.download_files_fromDemoContabeis()
+
+    assert results["1T2025.zip"] == "baixado"
+    assert (fake_ans / "assets" / "1T2025.zip").read_bytes() == body
+    sent_headers = [h for name, h in FakeANSHandler.requests_log if name == "1T2025.zip"]
+    assert sent_headers[0]["Range"] == "bytes=1000-"
+    assert "Range" not in sent_headers[1]
+
+
+def test_range_start():
+    assert script_download.range_start("bytes 1000-4999/5000") == 1000
+    assert script_download.range_start("bytes 0-99/*") == 0
+    assert script_download.range_start("bytes */5000") is None
+    assert script_download.range_start(None) is None
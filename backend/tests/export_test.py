@@ -0,0 +1,76 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+
+
+@pytest.fixture
+def client(api_client, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 7)
+    return api_client(
+        [
+            {
+                "registro_ans": "000001",
+                "cnpj": "11222333000181",
+                "razao_social": "OPERADORA A",
+                "uf": "SP",
+            },
+            {
+                "registro_ans": "000002",
+                "cnpj": "19131243000197",
+                "razao_social": "OPERADORA B",
+                "uf": "RJ",
+            },
+        ],
+        despesas=40,
+    )
+
+
+def test_export_csv_streams_filtered_rows(client):
+    response = client.get("/api/export/despesas?ano=2024&uf=sp")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="despesas.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text), delimiter=";"))
+    assert [int(row["id"]) for row in rows] == [
+        i for i in range(2, 41, 2) if i // 8 % 2 == 0
+    ]
+    assert {(row["uf"], row["ano"]) for row in rows} == {("SP", "2024")}
+    assert rows[0]["valor_despesas"] == "21,00"
+    assert rows[0]["razao_social"] == "OPERADORA A"
+
+
+def test_export_ndjson_gzip_matches_expenses_endpoint(client):
+    response = client.get(
+        "/api/export/despesas?format=ndjson&gzip=true&cnpj=11222333000181"
+    )
+
+    assert response.headers["content-type"] == "application/gzip"
+    lines = gzip.decompress(response.content).decode().splitlines()
+    exported = [json.loads(line) for line in lines]
+    expenses = client.get("/api/operadoras/11222333000181/despesas").json()
+    fields = ["id", "registro_ans", "ano", "trimestre", "valor_despesas", "descricao"]
+    key = lambda row: row["id"]
+    assert [{f: row[f] for f in fields} for row in exported] == sorted(
+        ({f: row[f] for f in fields} for row in expenses), key=key
+    )
+
+
+def test_export_parquet(client):
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = client.get("/api/export/despesas?format=parquet&trimestre=2")
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 10
+    assert set(table.column("trimestre").to_pylist()) == {2}
+    assert str(table.schema.field("valor_despesas").type) == "decimal128(30, 2)"
+
+
+def test_export_rejects_unknown_format(client):
+    response = client.get("/api/export/despesas?format=xlsx")
+
+    assert response.status_code == 400
@@ -1,5 +1,15 @@
 import pytest
-from etapa2_validatingData import cnpj_validation, general_validation
+from etapa2_validatingData import (
+    FLAG_CNPJ_AUSENTE,
+    FLAG_CNPJ_INVALIDO,
+    FLAG_RAZAO_VAZIA,
+    FLAG_VALOR_NEGATIVO,
+    cnpj_validation,
+    cnpj_validation_batch,
+    general_validation,
+    render_status,
+    validation_flags,
+)
 import pandas as pd
 
 
@@ -79,3 +89,41 @@ def test_general_validation_errors():
     assert "CNPJ Inválido" in resultado
     assert "Razão Social Vazia" in resultado
     assert "Valor Negativo" in resultado
+
+
+def test_cnpj_validation_batch():
+    cnpjs = [
+        "00366982000130",
+        "00.366.982/0001-30",
+        "366982000130",
+        "123",
+        "11111111111111",
+        "87827689000104",
+        "00366982000130",
+    ]
+    resultado = cnpj_validation_batch(cnpjs)
+    assert resultado.tolist() == [cnpj_validation(cnpj) for cnpj in cnpjs]
+    assert resultado.tolist() == [True, True, True, False, False, False, True]
+
+
+def test_validation_flags_bitmask():
+    df = pd.DataFrame(
+        {
+            "CNPJ": ["00366982000130", None, "11111111111111", ""],
+            "RazaoSocial": ["ADM LIFE", "ADM LIFE", "  ", None],
+            "ValorDespesas": [10.5, 3.0, -1.0, 0.0],
+        }
+    )
+    flags = validation_flags(df)
+    assert flags.tolist() == [
+        0,
+        FLAG_CNPJ_AUSENTE,
+        FLAG_CNPJ_INVALIDO | FLAG_RAZAO_VAZIA | FLAG_VALOR_NEGATIVO,
+        FLAG_CNPJ_AUSENTE | FLAG_RAZAO_VAZIA,
+    ]
+    assert render_status(flags).tolist() == [
+        "Válido",
+        "Inválido: CNPJ Ausente",
+        "Inválido: CNPJ Inválido, Razão Social Vazia, Valor Negativo",
+        "Inválido: CNPJ Ausente, Razão Social Vazia",
+    ]
@@ -0,0 +1,159 @@
+import pandas as pd
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def etapa3(engine, monkeypatch):
+    import etapa3_integratingDB
+
+    monkeypatch.setattr(etapa3_integratingDB, "db", engine)
+    return etapa3_integratingDB
+
+
+def dataset(rows):
+    df_cadop = pd.DataFrame(
+        {
+            "registro_ans": ["000001", "000002"],
+            "cnpj": ["11222333000181", "19131243000197"],
+            "razao_social": ["OPERADORA A", "OPERADORA B"],
+            "uf": ["SP", "RJ"],
+        }
+    )
+    df_expenses = pd.DataFrame(
+        {
+            "registro_ans": ["000001", "000002"] * rows,
+            "trimestre": [1, 2] * rows,
+            "ano": [2025, 2025] * rows,
+            "valor_despesas": [10.5, 20.25] * rows,
+        }
+    )
+    df_aggregated = pd.DataFrame(
+        {"razao_social": ["OPERADORA A"], "uf": ["SP"], "valorTotal_despesas": [1.0]}
+    )
+    return df_expenses, df_aggregated, df_cadop
+
+
+def count(engine, table):
+    with engine.connect() as connection:
+        return connection.execute(text(f"SELECT count(*) FROM {table}")).scalar()
+
+
+def staging_objects(engine):
+    with engine.connect() as connection:
+        relations = connection.execute(
+            text("SELECT relname FROM pg_class WHERE relname LIKE '%staging%'")
+        ).scalars()
+        constraints = connection.execute(
+            text("SELECT conname FROM pg_constraint WHERE conname LIKE '%staging%'")
+        ).scalars()
+        return list(relations) + list(constraints)
+
+
+def test_swap_replaces_tables_and_keeps_names(engine, etapa3):
+    etapa3.swap_to_db(*dataset(3))
+    etapa3.swap_to_db(*dataset(5))
+
+    assert count(engine, "despesas") == 10
+    assert count(engine, "operadoras") == 2
+    assert staging_objects(engine) == []
+    with engine.connect() as connection:
+        constraints = connection.execute(
+            text(
+                "SELECT conname FROM pg_constraint "
+                "WHERE conrelid = CAST('despesas' AS regclass) ORDER BY conname"
+            )
+        ).scalars()
+        assert list(constraints) == ["despesas_pkey", "despesas_registro_ans_fkey"]
+
+
+def test_swap_keeps_serving_previous_data(engine, etapa3, monkeypatch):
+    etapa3.swap_to_db(*dataset(3))
+    seen = []
+    validate = etapa3.validate_staging
+
+    def read_during_load(connection, metadata, frames):
+        with engine.connect() as reader:
+            reader.execute(text("SET statement_timeout = '2s'"))
+            seen.append(reader.execute(text("SELECT count(*) FROM despesas")).scalar())
+        validate(connection, metadata, frames)
+
+    monkeypatch.setattr(etapa3, "validate_staging", read_during_load)
+    etapa3.swap_to_db(*dataset(5))
+
+    assert seen == [6]
+    assert count(engine, "despesas") == 10
+
+
+def test_failed_validation_keeps_previous_data(engine, etapa3):
+    etapa3.swap_to_db(*dataset(3))
+
+    df_expenses, df_aggregated, df_cadop = dataset(0)
+    etapa3.swap_to_db(df_expenses, df_aggregated, df_cadop)
+
+    assert count(engine, "despesas") == 6
+    assert staging_objects(engine) == []
+
+
+def test_parallel_swap_loads_staging_directly(engine, etapa3, monkeypatch):
+    monkeypatch.setattr(etapa3, "load_workers", 3)
+    etapa3.swap_to_db(*dataset(3))
+    df_expenses, df_aggregated, df_cadop = dataset(4)
+    df_expenses.loc[7, "registro_ans"] = "999999"
+    etapa3.swap_to_db(df_expenses, df_aggregated, df_cadop)
+
+    assert count(engine, "despesas") == 6
+    assert staging_objects(engine) == []
+
+    etapa3.swap_to_db(*dataset(5))
+    with engine.connect() as connection:
+        loaded = connection.execute(
+            text("SELECT id, registro_ans FROM despesas ORDER BY id")
+        ).all()
+    assert [registro for _, registro in loaded] == ["000001", "000002"] * 5
+    assert [id_ for id_, _ in loaded] == list(range(1, 11))
+    assert staging_objects(engine) == []
+
+
+def test_summaries_match_loaded_despesas(engine, etapa3):
+    df_expenses, df_aggregated, df_cadop = dataset(1)
+    df_expenses = pd.DataFrame(
+        {
+            "registro_ans": ["000001", "000001", "000001", "000002", "000002"],
+            "trimestre": [1, 2, 3, 1, 3],
+            "ano": [2025] * 5,
+            "valor_despesas": [100.0, 50.0, 150.0, 40.0, 10.0],
+        }
+    )
+    etapa3.swap_to_db(df_expenses, df_aggregated, df_cadop)
+
+    with engine.connect() as connection:
+        geral = connection.execute(
+            text("SELECT total_despesas, qtd_despesas FROM resumo_geral")
+        ).one()
+        operadoras = connection.execute(
+            text(
+                "SELECT registro_ans, total_despesas, qtd_acima_media "
+                "FROM resumo_operadoras ORDER BY registro_ans"
+            )
+        ).all()
+        uf = connection.execute(
+            text("SELECT uf, qtd_operadoras FROM resumo_uf ORDER BY uf")
+        ).all()
+        crescimento = connection.execute(
+            text(
+                "SELECT registro_ans, crescimento_percentual "
+                "FROM resumo_crescimento ORDER BY registro_ans"
+            )
+        ).all()
+
+    assert (float(geral[0]), geral[1]) == (350.0, 5)
+    assert [(reg, float(total), acima) for reg, total, acima in operadoras] == [
+        ("000001", 300.0, 2),
+        ("000002", 50.0, 0),
+    ]
+    assert uf == [("RJ", 1), ("SP", 1)]
+    assert [(reg, float(pct)) for reg, pct in crescimento] == [
+        ("000001", 50.0),
+        ("000002", -75.0),
+    ]
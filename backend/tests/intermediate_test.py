@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+import intermediate
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_columnar_round_trip_keeps_dtypes(tmp_path, monkeypatch, fmt):
+    monkeypatch.setattr(intermediate, "intermediate_format", fmt)
+    path_csv = str(tmp_path / "consolidado_despesas.csv")
+
+    chunks = [
+        pd.DataFrame(
+            {
+                "RegistroANS": ["012345", "344800"],
+                "Ano": pd.array([2025, None], dtype="Int64"),
+                "ValorDespesas": [10.5, -3.25],
+                "DESCRICAO": ["EVENTOS", "SINISTROS"],
+            }
+        ),
+        pd.DataFrame(
+            {
+                "RegistroANS": ["419761"],
+                "Ano": pd.array([2024], dtype="Int64"),
+                "ValorDespesas": [1.0],
+                "DESCRICAO": ["EVENTOS INDENIZÁVEIS"],
+            }
+        ),
+    ]
+    with intermediate.ColumnarWriter(path_csv) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+
+    df = intermediate.read_columnar(path_csv)
+
+    assert df["RegistroANS"].tolist() == ["012345", "344800", "419761"]
+    assert str(df["Ano"].dtype) == "Int64"
+    assert df["Ano"].isna().tolist() == [False, True, False]
+    assert isinstance(df["DESCRICAO"].dtype, pd.CategoricalDtype)
+    assert df["DESCRICAO"].astype(str).tolist()[-1] == "EVENTOS INDENIZÁVEIS"
+
+
+def test_read_columnar_ignores_stale_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(intermediate, "intermediate_format", "parquet")
+    path_csv = tmp_path / "despesas_agregadas.csv"
+
+    intermediate.write_columnar(pd.DataFrame({"UF": ["SP"]}), str(path_csv))
+    path_csv.write_text("UF\nRJ\n")
+
+    assert intermediate.read_columnar(str(path_csv)) is None
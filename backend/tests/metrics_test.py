@@ -0,0 +1,125 @@
+import time
+import pytest
+from sqlalchemy import text
+import metrics
+from metrics import Histogram, normalize_statement
+
+
+@pytest.fixture
+def client(api_client):
+    return api_client(
+        [
+            {
+                "registro_ans": "000001",
+                "cnpj": "11222333000181",
+                "razao_social": "OPERADORA A",
+                "uf": "SP",
+            }
+        ]
+    )
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latencia", "Teste.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(("/a",), value)
+
+    assert histogram.render() == [
+        "# HELP latencia Teste.",
+        "# TYPE latencia histogram",
+        'latencia_bucket{route="/a",le="0.1"} 2',
+        'latencia_bucket{route="/a",le="1.0"} 3',
+        'latencia_bucket{route="/a",le="+Inf"} 4',
+        'latencia_sum{route="/a"} 3.65',
+        'latencia_count{route="/a"} 4',
+    ]
+
+
+def test_statements_are_normalized_to_bounded_labels():
+    assert (
+        normalize_statement(
+            "SELECT a\n  FROM t WHERE x IN ($1, $2, $3) AND y = %(y_1)s"
+        )
+        == "SELECT a FROM t WHERE x IN (?) AND y = ?"
+    )
+    assert (
+        normalize_statement("SELECT a FROM t WHERE x IN ($1::VARCHAR, $2::VARCHAR)")
+        == "SELECT a FROM t WHERE x IN (?)"
+    )
+    assert normalize_statement(
+        "SELECT CASE t.x WHEN $1 THEN $2 WHEN $3 THEN $4 END FROM t"
+    ) == normalize_statement("SELECT CASE t.x WHEN $1 THEN $2 END FROM t")
+
+
+def test_metrics_endpoint_reports_routes_pool_and_statements(client):
+    assert client.get("/api/operadoras/11222333000181").status_code == 200
+    assert client.get("/api/operadoras/00000000000000").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_requests_total{method="GET",route="/api/operadoras/{cnpj}",'
+        'status="404"} '
+    ) in body
+    assert (
+        'http_request_duration_seconds_count{method="GET",'
+        'route="/api/operadoras/{cnpj}"}'
+    ) in body
+    assert "http_requests_in_flight 1" in body
+    assert 'db_pool_connections{engine="api",state="size"}' in body
+    assert 'db_statement_duration_seconds_count{engine="api",' in body
+    assert "FROM operadoras WHERE operadoras.cnpj = ?" in body
+
+
+def wait_for_plan(capsys, timeout=5):
+    output = ""
+    deadline = time.monotonic() + timeout
+    while "Plano da consulta lenta" not in output and time.monotonic() < deadline:
+        time.sleep(0.05)
+        output += capsys.readouterr().out
+    return output
+
+
+def test_slow_queries_are_logged_with_explain(client, monkeypatch, capsys):
+    monkeypatch.setattr(metrics, "slow_query_ms", 1e-9)
+    monkeypatch.setattr(metrics, "slow_query_explain", True)
+
+    response = client.get("/api/operadoras/11222333000181")
+
+    assert response.status_code == 200
+    assert response.json()[0]["razao_social"] == "OPERADORA A"
+    output = wait_for_plan(capsys)
+    assert "Consulta lenta" in output
+    assert "'11222333000181'" in output
+    assert "Plano da consulta lenta: SELECT" in output
+    assert "Scan" in output
+    assert "Execution Time" not in output
+    assert "Erro ao rodar EXPLAIN" not in output
+
+
+def test_explain_runs_on_a_separate_connection(engine, monkeypatch, capsys):
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE lenta (id integer)"))
+    monkeypatch.setattr(metrics, "slow_query_ms", 1e-9)
+    monkeypatch.setattr(metrics, "slow_query_explain", True)
+    monkeypatch.setitem(metrics.engines, "teste", engine)
+    monkeypatch.setitem(metrics.explain_engines, "teste", engine)
+    metrics.instrument_engine(engine, "teste")
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        assert connection.execute(text("SELECT 1 AS um")).scalar() == 1
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO lenta VALUES (1)"))
+        assert connection.execute(text("SELECT count(*) FROM lenta")).scalar() == 1
+        connection.execute(text("INSERT INTO lenta VALUES (2)"))
+    metrics.explain_executor.submit(lambda: None).result()
+    monkeypatch.setattr(metrics, "slow_query_ms", 0)
+
+    output = capsys.readouterr().out
+    assert output.count("Plano da consulta lenta") == 2
+    assert "Seq Scan on lenta" in output
+    assert "Erro ao rodar EXPLAIN" not in output
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT count(*) FROM lenta")).scalar() == 2
@@ -0,0 +1,133 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from metrics import normalize_statement
+
+
+def operator(registro_ans, cnpj, razao_social, uf):
+    return {
+        "registro_ans": registro_ans,
+        "cnpj": cnpj,
+        "razao_social": razao_social,
+        "uf": uf,
+    }
+
+
+@pytest.fixture
+def client(api_client):
+    return api_client(
+        [
+            operator("000001", "11222333000181", "OPERADORA A", "SP"),
+            operator("000002", "19131243000197", "OPERADORA B", "RJ"),
+            operator("000003", "19131243000197", "OPERADORA B FILIAL", "RJ"),
+            operator("000004", "44555666000177", "OPERADORA SEM DESPESAS", "MG"),
+        ],
+        despesas=30,
+        registros=["000001", "000002", "000003"],
+        summaries=True,
+    )
+
+
+def test_overview_matches_detail_endpoints(client):
+    for cnpj in ["11222333000181", "19131243000197"]:
+        overview = client.get(f"/api/operadoras/{cnpj}/overview?limit=100").json()
+        expenses = client.get(f"/api/operadoras/{cnpj}/despesas").json()
+        chart = client.get(f"/api/operadoras/{cnpj}/despesas/chart").json()
+        operator = client.get(f"/api/operadoras/{cnpj}").json()
+
+        key = lambda row: row["id"]
+        assert sorted(overview["operator"], key=str) == sorted(operator, key=str)
+        assert sorted(overview["despesas"]["items"], key=key) == sorted(
+            expenses, key=key
+        )
+        assert overview["despesas"]["total"] == len(expenses)
+        assert overview["chart"] == chart["chart"]
+
+
+def test_overview_pages_expenses(client):
+    url = "/api/operadoras/19131243000197/overview?limit=8"
+    first = client.get(f"{url}&page=1").json()["despesas"]
+    second = client.get(f"{url}&page=2").json()["despesas"]
+    third = client.get(f"{url}&page=3").json()["despesas"]
+
+    items = first["items"] + second["items"] + third["items"]
+    assert [len(page["items"]) for page in (first, second, third)] == [8, 8, 4]
+    assert first["total"] == 20
+    assert items == sorted(
+        items, key=lambda row: (row["ano"], row["trimestre"], row["id"])
+    )
+
+
+def test_overview_sums_operators_sharing_cnpj(client):
+    cnpj = "19131243000197"
+    overview = client.get(f"/api/operadoras/{cnpj}/overview?limit=5").json()
+    expenses = client.get(f"/api/operadoras/{cnpj}/despesas").json()
+
+    quarters = {}
+    for row in expenses:
+        key = (row["ano"], row["trimestre"])
+        quarters[key] = quarters.get(key, 0) + row["valor_despesas"]
+    assert {row["registro_ans"] for row in expenses} == {"000002", "000003"}
+    assert overview["despesas"]["total"] == 20
+    assert overview["chart"] == [
+        {"ano": ano, "trimestre": trimestre, "total": total}
+        for (ano, trimestre), total in sorted(quarters.items())
+    ]
+    assert overview["despesas"]["items"] == sorted(
+        expenses, key=lambda row: (row["ano"], row["trimestre"], row["id"])
+    )[:5]
+
+
+def test_overview_batch(client):
+    response = client.get(
+        "/api/operadoras/overview",
+        params=[
+            ("cnpj", "11222333000181"),
+            ("cnpj", "44555666000177"),
+            ("cnpj", "00000000000000"),
+            ("limit", 3),
+        ],
+    ).json()
+
+    assert list(response) == ["11222333000181", "44555666000177", "00000000000000"]
+    assert len(response["11222333000181"]["despesas"]["items"]) == 3
+    assert response["11222333000181"]["despesas"]["total"] == 10
+    assert response["44555666000177"]["despesas"] == {
+        "items": [],
+        "page": 1,
+        "limit": 3,
+        "total": 0,
+    }
+    assert response["44555666000177"]["chart"] == []
+    assert response["00000000000000"] is None
+
+
+def test_overview_errors(client):
+    assert client.get("/api/operadoras/00000000000000/overview").status_code == 404
+    assert client.get("/api/operadoras/overview").status_code == 400
+
+
+def overview_statements(client, cnpjs):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append(normalize_statement(statement))
+
+    event.listen(Engine, "before_cursor_execute", capture)
+    try:
+        params = [("cnpj", cnpj) for cnpj in cnpjs]
+        assert client.get("/api/operadoras/overview", params=params).status_code == 200
+    finally:
+        event.remove(Engine, "before_cursor_execute", capture)
+    return statements
+
+
+def test_overview_batch_statements_do_not_depend_on_cnpjs(client):
+    single = overview_statements(client, ["11222333000181"])
+    batch = overview_statements(
+        client, ["11222333000181", "19131243000197", "44555666000177"]
+    )
+
+    assert len(single) == 3
+    assert batch == single
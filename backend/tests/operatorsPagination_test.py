@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def client(api_client):
+    return api_client(
+        {
+            "registro_ans": f"{i:06d}",
+            "cnpj": f"{i:014d}",
+            "razao_social": f"OPERADORA {i % 7}",
+            "uf": "SP",
+        }
+        for i in range(1, 54)
+    )
+
+
+def registros(response):
+    return [operator["registro_ans"] for operator in response["operators"]]
+
+
+def test_cursor_walks_same_rows_as_pages(client):
+    by_page = []
+    for page in range(1, 7):
+        response = client.get(f"/api/operadoras?page={page}&limit=10").json()
+        by_page += registros(response)
+    assert response["total"] == 53
+    assert response["total_pages"] == 6
+    assert response["next_cursor"] is None
+
+    by_cursor = []
+    url = "/api/operadoras?limit=10&with_total=false"
+    response = client.get(url).json()
+    while True:
+        assert response["total"] is None
+        by_cursor += registros(response)
+        if response["next_cursor"] is None:
+            break
+        response = client.get(f"{url}&cursor={response['next_cursor']}").json()
+
+    assert by_cursor == by_page
+    assert sorted(by_cursor) == [f"{i:06d}" for i in range(1, 54)]
+
+
+def test_cursor_keeps_search_filter(client):
+    first = client.get("/api/operadoras?limit=3&query_search=OPERADORA 3").json()
+    second = client.get(
+        f"/api/operadoras?limit=3&query_search=OPERADORA 3&cursor={first['next_cursor']}"
+    ).json()
+
+    assert first["total"] == 8
+    assert registros(first) + registros(second)[:3] == [
+        "000003",
+        "000010",
+        "000017",
+        "000024",
+        "000031",
+        "000038",
+    ]
+
+
+def test_invalid_cursor(client):
+    assert client.get("/api/operadoras?cursor=invalido").status_code == 400
+
+
+def test_search_and_suggest_fold_accents(engine, client):
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "INSERT INTO operadoras (registro_ans, cnpj, razao_social, uf) "
+                "VALUES ('000099', '19131243000197', 'SÃO LUCAS SAÚDE', 'SP')"
+            )
+        )
+
+    assert client.get("/api/operadoras/suggest?q=sao luc").json() == [
+        {
+            "registro_ans": "000099",
+            "razao_social": "SÃO LUCAS SAÚDE",
+            "cnpj": "19131243000197",
+        }
+    ]
+    response = client.get("/api/operadoras?query_search=saude").json()
+    assert registros(response) == ["000099"]
+    assert response["total"] == 1
@@ -0,0 +1,106 @@
+import shutil
+import pandas as pd
+import pytest
+from sqlalchemy import text
+import etapa1_process_file
+import etapa2_validatingData
+import pipeline
+from synthetic_data import generate
+
+outputs = [
+    "consolidado_despesas.csv",
+    "relatorio_final.csv",
+    "despesas_agregadas.csv",
+]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    generate(str(tmp_path / "assets"), scale=0.002, quarters=2)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ETL_INCREMENTAL", "0")
+    monkeypatch.setattr(pipeline, "cache_dir", str(tmp_path / "files" / "pipeline"))
+    return tmp_path
+
+
+def fail(*args, **kwargs):
+    raise AssertionError("etapa deveria vir do cache")
+
+
+def test_pipeline_outputs_match_stage_scripts(workdir, tmp_path_factory, monkeypatch):
+    scripts_dir = tmp_path_factory.mktemp("scripts")
+    shutil.copytree(workdir / "assets", scripts_dir / "assets")
+
+    results, statuses = pipeline.run_pipeline(
+        ["consolidate", "validate"], write_files=True
+    )
+    assert statuses == {"consolidate": "executada", "validate": "executada"}
+
+    monkeypatch.chdir(scripts_dir)
+    etapa1_process_file.read_files()
+    etapa2_validatingData.enrichmentData()
+
+    for name in outputs:
+        assert (workdir / "files" / name).read_bytes() == (
+            scripts_dir / "files" / name
+        ).read_bytes()
+    assert len(results["consolidate"]["despesas"]) == len(
+        pd.read_csv(scripts_dir / "files" / "consolidado_despesas.csv", sep=";")
+    )
+
+
+def test_files_are_optional_and_stages_are_cached(workdir, monkeypatch):
+    first, _ = pipeline.run_pipeline(["validate"])
+    assert not any((workdir / "files" / name).exists() for name in outputs)
+
+    monkeypatch.setattr(etapa1_process_file, "consolidate", fail)
+    monkeypatch.setattr(etapa2_validatingData, "validate_expenses", fail)
+    second, statuses = pipeline.run_pipeline(["validate"])
+
+    assert statuses == {"consolidate": "cache", "validate": "cache"}
+    for stage, frames in first.items():
+        for name, df in frames.items():
+            pd.testing.assert_frame_equal(second[stage][name], df)
+
+
+def test_changed_cadop_reruns_only_validation(workdir, monkeypatch):
+    pipeline.run_pipeline(["validate"])
+    path_cadop = workdir / "assets" / "Relatorio_cadop.csv"
+    lines = path_cadop.read_text(encoding="utf-8").splitlines(keepends=True)
+    path_cadop.write_text("".join(lines[:-5]), encoding="utf-8")
+
+    monkeypatch.setattr(etapa1_process_file, "consolidate", fail)
+    _, statuses = pipeline.run_pipeline(["validate"])
+
+    assert statuses == {"consolidate": "cache", "validate": "executada"}
+
+
+def test_failed_load_restarts_from_cache(workdir, engine, monkeypatch):
+    import etapa3_integratingDB
+
+    monkeypatch.setattr(etapa3_integratingDB, "db", engine)
+    monkeypatch.setattr(etapa3_integratingDB, "add_to_db", lambda *args: False)
+    with pytest.raises(SystemExit, match="cache"):
+        pipeline.run_pipeline(["load"])
+
+    monkeypatch.undo()
+    monkeypatch.chdir(workdir)
+    monkeypatch.setattr(pipeline, "cache_dir", str(workdir / "files" / "pipeline"))
+    monkeypatch.setattr(etapa3_integratingDB, "db", engine)
+    monkeypatch.setattr(etapa1_process_file, "consolidate", fail)
+    monkeypatch.setattr(etapa2_validatingData, "validate_expenses", fail)
+    results, statuses = pipeline.run_pipeline(["load"])
+
+    assert statuses == {
+        "consolidate": "cache",
+        "validate": "cache",
+        "load": "executada",
+    }
+    df_expenses = results["consolidate"]["despesas"]
+    df_cadop = pd.read_csv(workdir / "assets" / "Relatorio_cadop.csv", sep=";")
+    registros = set(df_cadop["REGISTRO_OPERADORA"].astype(str).str.zfill(6))
+    with engine.connect() as connection:
+        loaded = connection.execute(text("SELECT count(*) FROM despesas")).scalar()
+        aggregated = connection.execute(text("SELECT count(*) FROM agregados")).scalar()
+    assert loaded == df_expenses["RegistroANS"].isin(registros).sum()
+    assert aggregated == len(results["validate"]["agregados"])
@@ -0,0 +1,165 @@
+import zipfile
+import pytest
+import etapa1_process_file
+
+HEADER = '"DATA";"REG_ANS";"CD_CONTA_CONTABIL";"DESCRICAO";"VL_SALDO_INICIAL";"VL_SALDO_FINAL"\n'
+
+
+def quarter_csv(month, rows, late_description="EVENTOS/ SINISTROS AVISADOS"):
+    lines = [HEADER]
+    for i in range(rows):
+        description = "EVENTOS/ SINISTROS CONHECIDOS" if i % 3 else "RECEITAS"
+        if i == rows - 1:
+            description = late_description
+        lines.append(
+            f'"2025-{month:02d}-01";"{344800 + i % 7}";"41";"{description}";"0";"{i * 10},5{i % 10}"\n'
+        )
+    return "".join(lines)
+
+
+@pytest.fixture
+def ans_assets(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "assets").mkdir()
+
+    files = [
+        ("1T2025", quarter_csv(1, 500), "utf-8"),
+        ("2T2025", quarter_csv(4, 500, "EVENTOS INDENIZÁVEIS LÍQUIDOS"), "latin1"),
+    ]
+    for name, content, encoding in files:
+        with zipfile.ZipFile(tmp_path / "assets" / f"{name}.zip", "w") as zip_ref:
+            zip_ref.writestr(f"{name}.csv", content.encode(encoding))
+
+    return tmp_path
+
+
+def test_read_files_streams_without_extracting(ans_assets):
+    etapa1_process_file.read_files()
+
+    files = sorted(path.name for path in (ans_assets / "files").iterdir())
+    assert files == ["consolidado_despesas.csv", "consolidado_despesas.zip"]
+
+
+def test_read_files_chunked_is_byte_identical(ans_assets):
+    etapa1_process_file.read_files()
+    expected = (ans_assets / "files" / "consolidado_despesas.csv").read_bytes()
+
+    etapa1_process_file.read_files(max_memory_mb=0.01)
+    chunked = (ans_assets / "files" / "consolidado_despesas.csv").read_bytes()
+
+    assert chunked == expected
+    assert "INDENIZÁVEIS".encode("utf-8") in chunked
+
+
+def test_read_files_parallel_is_byte_identical(ans_assets):
+    etapa1_process_file.read_files()
+    expected = (ans_assets / "files" / "consolidado_despesas.csv").read_bytes()
+
+    etapa1_process_file.read_files(workers=2, max_memory_mb=0.01)
+    parallel = (ans_assets / "files" / "consolidado_despesas.csv").read_bytes()
+
+    assert parallel == expected
+
+
+@pytest.mark.parametrize("max_memory_mb", [None, 0.01])
+def test_each_source_is_opened_once(ans_assets, monkeypatch, max_memory_mb):
+    opened = []
+    open_source = etapa1_process_file.open_source
+
+    def counting(source):
+        opened.append(source)
+        return open_source(source)
+
+    monkeypatch.setattr(etapa1_process_file, "open_source", counting)
+    etapa1_process_file.read_files(max_memory_mb=max_memory_mb)
+
+    assert sorted(opened) == [
+        ("./assets/1T2025.zip", "1T2025.csv"),
+        ("./assets/2T2025.zip", "2T2025.csv"),
+    ]
+
+
+def test_split_tasks_cover_every_line_once(ans_assets):
+    (ans_assets / "1T2025.csv").write_bytes(quarter_csv(1, 500).encode("utf-8"))
+    source = (None, "1T2025.csv")
+    tasks = etapa1_process_file.split_tasks([source], 997)
+
+    lines = []
+    for _, start, end in tasks:
+        header, data = etapa1_process_file.read_range(source, start, end)
+        lines.extend(data.splitlines())
+
+    assert len(tasks) > 1
+    assert lines == quarter_csv(1, 500).encode("utf-8").splitlines()[1:]
+
+
+def test_zip_members_are_not_split(ans_assets):
+    source = ("assets/1T2025.zip", "1T2025.csv")
+
+    assert etapa1_process_file.split_tasks([source], 997) == [(source, 0, None)]
+
+
+class InlineExecutor:
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.in_flight = 0
+        self.peak = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def submit(self, fn, *args):
+        executor = self
+        executor.in_flight += 1
+        executor.peak = max(executor.peak, executor.in_flight)
+
+        class Done:
+            def result(self):
+                executor.in_flight -= 1
+                return fn(*args)
+
+        return Done()
+
+
+def test_parallel_keeps_at_most_workers_tasks_in_flight(ans_assets, monkeypatch):
+    for name in ("1T2025", "2T2025"):
+        with zipfile.ZipFile(ans_assets / "assets" / f"{name}.zip") as zip_ref:
+            zip_ref.extractall(ans_assets)
+        (ans_assets / "assets" / f"{name}.zip").unlink()
+    etapa1_process_file.read_files()
+    expected = (ans_assets / "files" / "consolidado_despesas.csv").read_bytes()
+
+    executors = []
+
+    def executor(max_workers):
+        executors.append(InlineExecutor(max_workers))
+        return executors[-1]
+
+    monkeypatch.setattr(etapa1_process_file, "ProcessPoolExecutor", executor)
+    monkeypatch.setattr(etapa1_process_file, "split_mb", 0.002)
+    etapa1_process_file.read_files(workers=2)
+
+    assert executors[0].peak == 2
+    assert executors[0].in_flight == 0
+    assert (ans_assets / "files" / "consolidado_despesas.csv").read_bytes() == expected
+
+
+def test_read_files_incremental_only_reprocesses_changed_inputs(ans_assets, capsys):
+    etapa1_process_file.read_files(incremental=True)
+    capsys.readouterr()
+
+    with zipfile.ZipFile(ans_assets / "assets" / "2T2025.zip", "w") as zip_ref:
+        zip_ref.writestr("2T2025.csv", quarter_csv(4, 200).encode("utf-8"))
+    etapa1_process_file.read_files(incremental=True)
+    output = capsys.readouterr().out
+    incremental = (ans_assets / "files" / "consolidado_despesas.csv").read_bytes()
+
+    assert "Inalterado: ./assets/1T2025.zip" in output
+    assert "Lendo: ./assets/2T2025.zip:2T2025.csv" in output
+
+    etapa1_process_file.read_files()
+    full = (ans_assets / "files" / "consolidado_despesas.csv").read_bytes()
+    assert incremental == full
@@ -0,0 +1,157 @@
+import re
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+operadoras = 1500
+despesas = 300000
+cnpj = f"{7 * 7919:014d}"
+
+endpoints = [
+    "/api/operadoras/suggest?q=SAUDE",
+    "/api/operadoras",
+    "/api/operadoras?query_search=SAUDE",
+    "/api/operadoras?with_total=false&cursor=WyJPUEVSQURPUkEgNTAwIFNBVURFIExUREEiLCAiMDAwNTAwIl0=",
+    f"/api/operadoras/{cnpj}",
+    f"/api/operadoras/{cnpj}/despesas",
+    f"/api/operadoras/{cnpj}/despesas/chart",
+    f"/api/operadoras/{cnpj}/overview",
+    f"/api/operadoras/overview?cnpj={cnpj}&cnpj={11 * 7919:014d}",
+    "/api/estatisticas",
+    f"/api/export/despesas?cnpj={cnpj}",
+    "/api/export/despesas?ano=2025&trimestre=2&format=ndjson",
+]
+no_queries = {"cache_stats"}
+full_scans = [
+    (re.compile(r"SELECT count\(\*\) AS count_1 FROM operadoras$"), {"operadoras"}),
+    (
+        re.compile(
+            r"SELECT operadoras\.registro_ans, operadoras\.cnpj, "
+            r"operadoras\.razao_social, operadoras\.nome_fantasia FROM operadoras$"
+        ),
+        {"operadoras"},
+    ),
+    (
+        re.compile(
+            r"FROM despesas JOIN operadoras "
+            r"ON operadoras\.registro_ans = despesas\.registro_ans"
+            r"( WHERE despesas\.\w+ = \S+( AND despesas\.\w+ = \S+)*)? "
+            r"ORDER BY despesas\.id$"
+        ),
+        {"operadoras"},
+    ),
+    (
+        re.compile(r"FROM resumo_(geral|operadoras|uf)\b"),
+        {"resumo_geral", "resumo_operadoras", "resumo_uf"},
+    ),
+]
+page_index = "ix_operadoras_razao_social_registro_ans"
+
+
+@pytest.fixture
+def client(api_client, engine, monkeypatch):
+    import main
+
+    client = api_client(
+        (
+            {
+                "registro_ans": f"{i:06d}",
+                "cnpj": f"{i * 7919:014d}",
+                "razao_social": f"OPERADORA {i} SAUDE LTDA",
+                "nome_fantasia": f"FANTASIA {i}",
+                "modalidade": "Medicina de Grupo",
+                "uf": ["SP", "RJ", "MG", "RS", "PR"][i % 5],
+                "cidade": "Cidade",
+            }
+            for i in range(1, operadoras + 1)
+        ),
+        despesas=despesas,
+        anos=6,
+        summaries=True,
+    )
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE operadoras"))
+        connection.execute(text("VACUUM ANALYZE despesas"))
+        connection.execute(text("VACUUM ANALYZE resumo_trimestres"))
+
+    monkeypatch.setattr(main.cache, "maxsize", 0)
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 100)
+    return client
+
+
+def seq_scans(plan):
+    scans = set()
+    if plan["Node Type"] == "Seq Scan":
+        scans.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans |= seq_scans(child)
+    return scans
+
+
+def indexes_used(plan):
+    indexes = {plan["Index Name"]} if "Index Name" in plan else set()
+    for child in plan.get("Plans", []):
+        indexes |= indexes_used(child)
+    return indexes
+
+
+def allowed_scans(statement):
+    statement = " ".join(statement.split())
+    allowed = set()
+    for pattern, tables in full_scans:
+        if pattern.search(statement):
+            allowed |= tables
+    return allowed
+
+
+def captured_queries(client, url):
+    queries = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statement = re.sub(r"\$(\d+)", r"%(\1)s", statement.replace("%", "%%"))
+            parameters = {str(i): value for i, value in enumerate(parameters, 1)}
+            queries.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", capture)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(Engine, "before_cursor_execute", capture)
+    return queries
+
+
+def test_endpoints_cover_every_route():
+    from main import app
+
+    paths = [url.split("?")[0] for url in endpoints]
+    for route in app.routes:
+        if "GET" not in getattr(route, "methods", ()) or route.name in no_queries:
+            continue
+        if route.path.startswith("/api"):
+            assert any(route.path_regex.match(path) for path in paths), route.path
+
+
+def test_endpoint_queries_use_indexes(engine, client):
+    failures = []
+    pages = 0
+
+    for url in endpoints:
+        queries = captured_queries(client, url)
+        assert queries, url
+
+        with engine.connect() as connection:
+            for statement, parameters in queries:
+                plan = connection.exec_driver_sql(
+                    f"EXPLAIN (FORMAT JSON) {statement}", parameters
+                ).scalar()
+                unexpected = seq_scans(plan[0]["Plan"]) - allowed_scans(statement)
+                if unexpected:
+                    failures.append(f"{url}: seq scan em {unexpected}\n{statement}")
+                if "ORDER BY operadoras.razao_social" in statement:
+                    pages += 1
+                    if page_index not in indexes_used(plan[0]["Plan"]):
+                        failures.append(f"{url}: página sem {page_index}\n{statement}")
+
+    assert pages == 2
+    assert not failures, "\n\n".join(failures)
@@ -0,0 +1,157 @@
+import json
+import pstats
+import pandas as pd
+import pytest
+import etapa1_process_file
+import etapa2_validatingData
+import run_report
+from run_report import step, timed
+from synthetic_data import generate
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    path = tmp_path / "relatorios"
+    monkeypatch.setattr(run_report, "report_dir", str(path))
+    return path
+
+
+def load_reports(path, pattern="*.json"):
+    return [json.loads(file.read_text(encoding="utf-8")) for file in path.glob(pattern)]
+
+
+def test_steps_are_aggregated_by_name(reports):
+    with run_report.run_report("teste") as report:
+        for size in (3, 5):
+            with step("filter", rows_in=size) as record:
+                record.rows_out += size - 1
+        frames = list(timed("parse", [pd.DataFrame({"a": range(4)})] * 2))
+
+    assert len(frames) == 2
+    (saved,) = load_reports(reports)
+    assert saved == report.result
+    assert saved["stage"] == "teste" and saved["status"] == "ok"
+    assert saved["steps"]["filter"]["calls"] == 2
+    assert saved["steps"]["filter"]["rows_in"] == 8
+    assert saved["steps"]["filter"]["rows_out"] == 6
+    assert saved["steps"]["parse"]["calls"] == 3
+    assert saved["steps"]["parse"]["rows_out"] == 8
+    assert saved["wall_seconds"] >= saved["steps"]["filter"]["wall_seconds"]
+    assert saved["peak_rss_mb"] > 0
+
+
+def test_step_without_report_is_a_noop(reports):
+    with step("filter", rows_in=10) as record:
+        record.rows_out += 1
+
+    assert run_report.current is None
+    assert not reports.exists()
+
+
+def test_failed_run_is_reported_and_reraised(reports):
+    with pytest.raises(ValueError):
+        with run_report.run_report("teste"):
+            with step("parse"):
+                raise ValueError("arquivo inválido")
+
+    (saved,) = load_reports(reports)
+    assert saved["status"] == "erro"
+    assert "arquivo inválido" in saved["error"]
+    assert saved["steps"]["parse"]["calls"] == 1
+    assert run_report.current is None
+
+
+def test_profile_is_dumped_for_the_chosen_stage(reports, monkeypatch):
+    monkeypatch.setattr(run_report, "profile_stage", "etapa2")
+
+    with run_report.run_report("etapa1"):
+        pass
+    with run_report.run_report("etapa2"):
+        sorted(range(1000), key=str)
+
+    (profile,) = reports.glob("etapa2_*.prof")
+    assert pstats.Stats(str(profile)).total_calls > 0
+    assert not list(reports.glob("etapa1_*.prof"))
+
+
+def test_report_disabled_still_measures(reports, monkeypatch):
+    monkeypatch.setattr(run_report, "report_enabled", False)
+
+    with run_report.run_report("teste") as report:
+        with step("write"):
+            pass
+
+    assert report.result["steps"]["write"]["calls"] == 1
+    assert not reports.exists()
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_etl_reports_row_counts_per_step(tmp_path, monkeypatch, reports, workers):
+    summary = generate(str(tmp_path / "assets"), scale=0.002, quarters=2)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("ETL_INCREMENTAL", "0")
+
+    with run_report.run_report("etapa1"):
+        etapa1_process_file.read_files(workers=workers)
+    with run_report.run_report("etapa2"):
+        etapa2_validatingData.enrichmentData()
+
+    saved = {report["stage"]: report["steps"] for report in load_reports(reports)}
+    etapa1, etapa2 = saved["etapa1"], saved["etapa2"]
+    consolidated = pd.read_csv("./files/consolidado_despesas.csv", sep=";")
+
+    assert etapa1["parse"]["rows_out"] == summary["rows"]
+    assert etapa1["filter"]["rows_in"] == summary["rows"]
+    assert etapa1["filter"]["rows_out"] == len(consolidated)
+    assert etapa1["write"]["rows_out"] == len(consolidated)
+    assert etapa1["zip"]["calls"] == 1
+    assert etapa1["write"]["bytes_written"] > 0
+
+    assert etapa2["merge"]["rows_in"] == len(consolidated)
+    assert etapa2["validate"]["rows_in"] == len(consolidated)
+    assert 0 < etapa2["validate"]["rows_out"] < len(consolidated)
+    assert etapa2["aggregate"]["rows_in"] == etapa2["validate"]["rows_out"]
+
+
+def test_peak_rss_without_resource_module(reports, monkeypatch):
+    monkeypatch.setattr(run_report, "resource", None)
+    monkeypatch.setattr(run_report, "psutil", None)
+    monkeypatch.setattr(run_report, "current_rss_mb", lambda: None)
+
+    with run_report.run_report("teste") as report:
+        with step("parse"):
+            pass
+
+    assert report.result["peak_rss_mb"] is None
+    assert report.result["workers_peak_rss_mb"] is None
+    assert report.result["steps"]["parse"]["peak_rss_mb"] is None
+    assert report.result["steps"]["parse"]["rss_growth_mb"] is None
+    (saved,) = load_reports(reports)
+    assert saved["peak_rss_mb"] is None
+
+
+def test_step_rss_is_measured_per_step(reports):
+    with run_report.run_report("teste") as report:
+        with step("big"):
+            data = b"x" * (200 * 1024 * 1024)
+        del data
+        with step("small"):
+            pass
+
+    steps = report.result["steps"]
+    assert steps["big"]["rss_growth_mb"] > 150
+    assert steps["small"]["rss_growth_mb"] < 50
+    assert steps["small"]["peak_rss_mb"] < steps["big"]["peak_rss_mb"] - 150
+
+
+def test_peak_rss_is_scaled_by_platform(monkeypatch):
+    import resource
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    monkeypatch.setattr(run_report.sys, "platform", "darwin")
+    darwin = run_report.peak_rss_mb()
+    monkeypatch.setattr(run_report.sys, "platform", "linux")
+    linux = run_report.peak_rss_mb()
+
+    assert linux >= usage / 1024
+    assert darwin < linux / 1000
@@ -0,0 +1,42 @@
+from search import SearchIndex, normalize
+
+rows = [
+    ("000001", "11222333000181", "SÃO PAULO SAÚDE LTDA", None),
+    ("000002", "19131243000197", "UNIMED DE SÃO PAULO", "UNIMED SP"),
+    ("000003", "33000167000101", "SAUDE BRADESCO S.A.", None),
+    ("000004", "44555666000177", "ASSOCIAÇÃO AUXILIADORA", "SAÚDE AUXILIADORA"),
+]
+
+
+def registros(matches):
+    return [row[0] for row in matches]
+
+
+def test_normalize_folds_accents_and_punctuation():
+    assert normalize("  Associação  São-João/ltda. ") == "ASSOCIACAO SAO JOAO LTDA"
+    assert normalize(None) == ""
+
+
+def test_search_is_accent_insensitive_and_ranked():
+    index = SearchIndex(rows)
+
+    assert registros(index.search("saude")) == ["000003", "000001", "000004"]
+    assert registros(index.search("são paulo")) == ["000001", "000002"]
+    assert registros(index.search("paulo unimed")) == ["000002"]
+    assert registros(index.search("saude", limit=1)) == ["000003"]
+
+
+def test_search_by_cnpj_with_punctuation():
+    index = SearchIndex(rows)
+
+    assert registros(index.search("19.131.243/0001-97")) == ["000002"]
+    assert registros(index.search("000")) == ["000004", "000003", "000001", "000002"]
+
+
+def test_short_and_missing_terms():
+    index = SearchIndex(rows)
+
+    assert registros(index.search("au")) == ["000004"]
+    assert registros(index.search("sp")) == ["000002"]
+    assert index.search("xyz") == []
+    assert index.search("  ") == []
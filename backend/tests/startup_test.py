@@ -0,0 +1,45 @@
+import json
+import os
+import subprocess
+import sys
+
+backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+max_import_seconds = 3.0
+max_rss_mb = 120
+etl_modules = ["pandas", "numpy", "pyarrow", "etapa3_integratingDB", "csv_reader"]
+
+probe = """
+import json, sys, time
+start = time.perf_counter()
+import main
+seconds = time.perf_counter() - start
+try:
+    with open("/proc/self/status") as status:
+        peak = next(line for line in status if line.startswith("VmHWM:"))
+    rss_mb = int(peak.split()[1]) / 1024
+except OSError:
+    rss_mb = None
+print(json.dumps({"seconds": seconds, "rss_mb": rss_mb, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_api():
+    env = {key: value for key, value in os.environ.items() if key != "DATABASE_URL"}
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=backend,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def test_api_cold_start_stays_light():
+    startup = min((import_api() for _ in range(3)), key=lambda run: run["seconds"])
+
+    assert [module for module in etl_modules if module in startup["modules"]] == []
+    assert startup["seconds"] < max_import_seconds, startup["seconds"]
+    if startup["rss_mb"] is not None:
+        assert startup["rss_mb"] < max_rss_mb, startup["rss_mb"]
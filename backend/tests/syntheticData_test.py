@@ -0,0 +1,39 @@
+import zipfile
+import pandas as pd
+from etapa2_validatingData import cnpj_validation_batch
+from synthetic_data import generate, quarter_names
+
+
+def test_quarter_names_are_consecutive():
+    assert quarter_names(3) == [(2025, 1), (2025, 2), (2025, 3)]
+    assert quarter_names(5)[:2] == [(2024, 3), (2024, 4)]
+
+
+def test_generate_is_reproducible_and_mixes_encodings(tmp_path):
+    summary = generate(tmp_path / "a", scale=0.01, quarters=2, seed=1)
+    again = generate(tmp_path / "b", scale=0.01, quarters=2, seed=1)
+
+    assert summary == again
+    assert summary["rows"] == sum(entry["rows"] for entry in summary["files"].values())
+    for name, entry in summary["files"].items():
+        first, second = tmp_path / "a" / name, tmp_path / "b" / name
+        assert first.read_bytes() == second.read_bytes()
+        with zipfile.ZipFile(tmp_path / "a" / name) as zip_ref:
+            content = zip_ref.read(name.replace(".zip", ".csv"))
+        assert content.decode(entry["encoding"]).count("\n") == entry["rows"] + 1
+    assert [entry["encoding"] for entry in summary["files"].values()] == [
+        "utf-8",
+        "latin1",
+    ]
+
+
+def test_generate_cadop_has_invalid_and_missing_operators(tmp_path):
+    summary = generate(
+        tmp_path, scale=0.1, quarters=1, invalid_cnpj_rate=0.2, missing_cadop_rate=0.1
+    )
+    df_cadop = pd.read_csv(tmp_path / "Relatorio_cadop.csv", sep=";", dtype=str)
+
+    assert len(df_cadop) == summary["operators"] - summary["missing_cadop"]
+    assert summary["missing_cadop"] > 0
+    invalid = ~cnpj_validation_batch(df_cadop["CNPJ"])
+    assert 0 < invalid.sum() <= summary["invalid_cnpjs"]